@@ -22,16 +22,82 @@ class Settings(BaseSettings):
     
     # Optional: Override auth endpoint if using different instance
     aa_auth_endpoint: Optional[str] = "https://automationanywhere-be-prod.automationanywhere.com/v2/authentication"
+    # Token lifetime when the token carries no exp claim, and how long
+    # before expiry to refresh it
+    aa_token_ttl_seconds: int = 900
+    aa_token_refresh_margin_seconds: int = 60
+    # Deploy scheduler: deploy starts per second (0 disables), concurrent
+    # deploys, and the most users a coalesced digest may carry (0 disables
+    # coalescing)
+    aa_deploy_rate_per_second: float = 1.0
+    aa_max_in_flight_deploys: int = 3
+    aa_coalesce_max_users: int = 50
+    
+    # Digest delivery: concurrent sends per channel, and a per-digest
+    # timeout covering the bot deploy including its retries
+    digest_email_concurrency: int = 4
+    digest_teams_concurrency: int = 2
+    digest_send_timeout_seconds: float = 120.0
+    # Write-behind status updates (events processed, digests sent): flush
+    # after this many ids or this long after the first pending one
+    status_batch_max_size: int = 500
+    status_batch_max_delay_ms: int = 500
+    # Month-end reports: rows fetched per round trip from the server-side
+    # cursor, and whether to gzip the CSV (report_YYYY-MM.csv.gz)
+    report_fetch_size: int = 2000
+    report_compress_csv: bool = False
+    # Pending reports picked up per run, and processes generating months in
+    # parallel (one month per task)
+    report_pending_limit: int = 24
+    report_workers: int = 4
+    # Digest packing (DigestBuilder): max rendered message bytes and users
+    # per digest. Gmail clips emails over ~102KB; Teams rejects messages
+    # over ~28KB.
+    digest_email_max_bytes: int = 100_000
+    digest_email_max_users: int = 250
+    digest_teams_max_bytes: int = 24_000
+    digest_teams_max_users: int = 50
+    # Validate digest payloads from the outbox with pydantic instead of
+    # trusting the JSONB our builders wrote
+    digest_strict_validation: bool = False
+    # Outbox leases: claimed digests are renewed while sending and become
+    # claimable again if the sender stops renewing
+    digest_claim_limit: int = 10
+    digest_lease_seconds: int = 300
+    worker_id: Optional[str] = None  # Defaults to hostname:pid
     
     # Community Platform API
     community_api_url: Optional[str] = None
     community_api_key: Optional[str] = None
     
+    # User metadata cache
+    metadata_cache_ttl_seconds: int = 3600
+    metadata_negative_ttl_seconds: int = 300
+    metadata_cache_max_entries: int = 10000
+    metadata_prefetch_concurrency: int = 16
+    metadata_rate_limit_per_second: float = 50.0
+    metadata_latency_budget_seconds: float = 1.5
+    
+    # Community API circuit breaker
+    community_breaker_failure_rate: float = 0.5
+    community_breaker_slow_call_seconds: float = 1.0
+    community_breaker_slow_call_rate: float = 0.5
+    community_breaker_window_size: int = 20
+    community_breaker_min_calls: int = 10
+    community_breaker_open_seconds: float = 30.0
+    community_breaker_half_open_calls: int = 3
+    
     # Application Settings
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     log_level: str = "INFO"
     
+    # Webhook admission control (/webhooks/community)
+    webhook_max_in_flight: int = 32
+    webhook_max_queue: int = 64
+    webhook_queue_timeout_seconds: float = 2.0
+    webhook_retry_after_seconds: int = 5
+    
     # Supabase Storage (for reports)
     supabase_storage_url: Optional[str] = None
     supabase_storage_bucket: str = "reports"
@@ -39,7 +105,26 @@ class Settings(BaseSettings):
     
     # Processing
     batch_size: int = 100
-    max_retries: int = 3
+    max_retries: int = 3  # Failed attempts before an event is dead-lettered
+    retry_base_delay_seconds: float = 30.0  # Doubles per failed attempt
+    retry_max_delay_seconds: float = 3600.0
+    
+    # Event drainer (LISTEN/NOTIFY consumer for events_raw)
+    run_event_drainer: bool = False  # Run the drainer inside the API process
+    drain_sweep_interval_seconds: float = 30.0
+    drain_coalesce_ms: int = 20
+    drain_reconnect_seconds: float = 5.0
+    # Adaptive claim size: starts at batch_size, held within these bounds
+    drain_min_batch_size: int = 10
+    drain_max_batch_size: int = 1000
+    drain_target_batch_latency_ms: int = 500
+    # Events the webhook classifies inline are stored not due for this long,
+    # so the drainer/SQL poller leave them alone; if the webhook dies
+    # mid-event, they become claimable once it passes
+    inline_processing_lease_seconds: float = 60.0
+    
+    # In-process user_state mirror (needs migrations/007_user_state_notify.sql)
+    seniority_mirror_enabled: bool = True
     
     class Config:
         env_file = ".env"
@@ -7,8 +7,10 @@ from psycopg.rows import dict_row
 from contextlib import contextmanager
 from typing import Generator
 import logging
+import time
 
 from .config import get_settings
+from .utils.metrics import LatencyTracker
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,24 @@ class Database:
         self.settings = get_settings()
         self.connection_string = self.settings.supabase_db_url
         self._pool = None
+        self.connect_latency = LatencyTracker()
     
     def get_connection(self) -> psycopg.Connection:
         """Get a new database connection."""
-        return psycopg.connect(
+        start = time.monotonic()
+        conn = psycopg.connect(
             self.connection_string,
             row_factory=dict_row,
             autocommit=False
         )
+        self.connect_latency.observe(time.monotonic() - start)
+        return conn
+    
+    def stats(self) -> dict:
+        """Return connection acquisition metrics."""
+        return {
+            "connect_latency": self.connect_latency.summary()
+        }
     
     @contextmanager
     def get_cursor(self) -> Generator[psycopg.Cursor, None, None]:
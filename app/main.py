@@ -4,16 +4,25 @@ CaptPathfinder - Senior Executive Detection System
 FastAPI application for processing community profile updates and detecting senior executives.
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 
 from .models import WebhookEvent
 from .config import get_settings
+from .database import get_db
+from .utils.admission import AdmissionController, AdmissionMiddleware
+from .utils.rendering import get_renderer
 from .services.event_processor import get_event_processor
-from .services.digest_builder import get_digest_sender
+from .services.event_drainer import get_event_drainer
+from .services.seniority_mirror import get_seniority_mirror
+from .services.aa_integration import get_aa_client
+from .services.digest_builder import get_digest_builder, get_digest_sender
 from .services.report_builder import get_report_builder
+from .services.status_batcher import flush_status_batchers, status_batcher_stats
 
 # Setup logging
 logging.basicConfig(
@@ -32,10 +41,43 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting CaptPathfinder on {settings.api_host}:{settings.api_port}")
     logger.info(f"Database: {settings.supabase_db_url.split('@')[1] if '@' in settings.supabase_db_url else 'configured'}")
     
+    # Compile digest/report templates once, failing fast on template errors
+    get_renderer().warm()
+    
+    background_stop = asyncio.Event()
+    background_tasks = []
+    if settings.seniority_mirror_enabled:
+        background_tasks.append(asyncio.create_task(get_seniority_mirror().run(background_stop)))
+    if settings.run_event_drainer:
+        background_tasks.append(asyncio.create_task(get_event_drainer().run(background_stop)))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down CaptPathfinder")
+    background_stop.set()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    flush_status_batchers()
+    await get_event_processor().close()
+    await get_aa_client().close()
+
+
+# Admission control for the webhook route (singleton)
+_webhook_admission: Optional[AdmissionController] = None
+
+
+def get_webhook_admission() -> AdmissionController:
+    """Get webhook admission controller (singleton)."""
+    global _webhook_admission
+    if _webhook_admission is None:
+        settings = get_settings()
+        _webhook_admission = AdmissionController(
+            max_in_flight=settings.webhook_max_in_flight,
+            max_queue=settings.webhook_max_queue,
+            queue_timeout_seconds=settings.webhook_queue_timeout_seconds,
+            retry_after_seconds=settings.webhook_retry_after_seconds
+        )
+    return _webhook_admission
 
 
 # Create FastAPI app
@@ -46,6 +88,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(
+    AdmissionMiddleware,
+    get_controller=get_webhook_admission,
+    paths={"/webhooks/community"}
+)
+
 
 @app.get("/")
 async def root():
@@ -77,6 +125,10 @@ async def receive_webhook(event: WebhookEvent, background_tasks: BackgroundTasks
     Note: For production with Supabase Edge Functions, webhooks go to
     the Edge Function first, which stores in events_raw table.
     This endpoint can still be used for direct webhook integration.
+    
+    Admission control (see AdmissionMiddleware) runs before this handler:
+    over capacity, requests get 429 (queue full) or 503 (queued too long)
+    with a Retry-After header so the platform retries later.
     """
     logger.info(f"Received webhook for user {event.userId}, field: {event.profileField}")
     
@@ -144,17 +196,16 @@ async def process_queued_event(event_id: int):
             oldValue=event_data['old_value']
         )
         
-        # Process event
+        # The event is already stored: classify it directly (process_event
+        # would store it again and stop at the duplicate check)
         processor = get_event_processor()
-        result = await processor.process_event(event)
+        if event.profileField.lower() == "job title":
+            result = await processor.process_stored_event(event)
+        else:
+            result = {"status": "skipped", "reason": "not_job_title", "user_id": event.userId}
         
-        # Mark as processed
-        with db.get_cursor() as cur:
-            cur.execute("""
-                UPDATE events_raw
-                SET processed = TRUE, processed_at = NOW()
-                WHERE id = %s
-            """, (event_id,))
+        # Mark as processed (write-behind, batched)
+        processor.processed_batcher.add(event_id)
         
         logger.info(f"Queued event {event_id} processed: {result}")
         
@@ -169,6 +220,10 @@ async def process_queued_event(event_id: int):
         
     except Exception as e:
         logger.error(f"Error processing queued event {event_id}: {e}", exc_info=True)
+        try:
+            get_event_processor().record_event_failure(event_id, e)
+        except Exception as record_error:
+            logger.error(f"Could not record failure for event {event_id}: {record_error}")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing event: {str(e)}"
@@ -205,18 +260,48 @@ async def send_digests():
         )
 
 
+@app.post("/admin/build-digests")
+async def build_digests():
+    """
+    Build this week's digests, packed by message size.
+    
+    The weekly build (also run by worker.py --build-digests); reports how
+    many bot deploys the packing saved versus fixed 10-user digests.
+    """
+    logger.info("Manual digest build triggered")
+    
+    try:
+        results = get_digest_builder().build_weekly_digest()
+        
+        return JSONResponse(
+            status_code=200,
+            content={
+                "status": "completed",
+                "results": results
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error building digests: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error building digests: {str(e)}"
+        )
+
+
 @app.post("/admin/generate-reports")
-async def generate_reports():
+async def generate_reports(force: bool = False):
     """
     Manually trigger generation of pending reports.
     
-    Generates CSV and HTML reports for months that need them.
+    Generates CSV and HTML reports for months that need them. Months whose
+    data is unchanged reuse their cached files unless force=true.
     """
-    logger.info("Manual report generation triggered")
+    logger.info(f"Manual report generation triggered (force={force})")
     
     try:
         builder = get_report_builder()
-        results = builder.process_pending_reports()
+        results = builder.process_pending_reports(force=force)
         
         return JSONResponse(
             status_code=200,
@@ -242,6 +327,7 @@ async def get_stats():
     Returns counts of users, detections, pending digests, etc.
     """
     from .database import get_db
+    from .services.rollups import current_month_label, month_start, summarize_rollups
     
     db = get_db()
     stats = {}
@@ -264,13 +350,28 @@ async def get_stats():
             cur.execute("SELECT COUNT(*) as count FROM digests WHERE NOT sent")
             stats['pending_digests'] = cur.fetchone()['count']
             
-            # Count total detections
-            cur.execute("SELECT COUNT(*) as count FROM detections")
-            stats['total_detections'] = cur.fetchone()['count']
+            # Detection counts from the monthly rollups (no detections scan)
+            cur.execute("SELECT COALESCE(SUM(detection_count), 0) as count FROM monthly_rollups")
+            stats['total_detections'] = int(cur.fetchone()['count'])
+            
+            month_label = current_month_label()
+            cur.execute("""
+                SELECT seniority_level, country, detection_count
+                FROM monthly_rollups
+                WHERE month = %s
+            """, (month_start(month_label),))
+            stats['this_month'] = summarize_rollups(month_label, cur.fetchall())
             
             # Count unprocessed events
             cur.execute("SELECT COUNT(*) as count FROM events_raw WHERE NOT processed")
             stats['unprocessed_events'] = cur.fetchone()['count']
+            
+            # Count events waiting on a retry, and dead-lettered events
+            cur.execute("SELECT COUNT(*) as count FROM events_raw WHERE NOT processed AND attempts > 0")
+            stats['retrying_events'] = cur.fetchone()['count']
+            
+            cur.execute("SELECT COUNT(*) as count FROM events_dead_letter")
+            stats['dead_letter_events'] = cur.fetchone()['count']
         
         return JSONResponse(
             status_code=200,
@@ -285,6 +386,38 @@ async def get_stats():
         )
 
 
+@app.get("/admin/metrics")
+async def get_metrics():
+    """
+    Get in-process runtime metrics.
+
+    Unlike /admin/stats this does not touch the database; values are
+    per worker process and reset on restart.
+    """
+    processor = get_event_processor()
+    
+    metrics = {
+        "metadata_cache": processor.metadata_cache.stats(),
+        "metadata_rate_limiter": processor.metadata_rate_limiter.stats(),
+        "community_breaker": processor.community_breaker.stats(),
+        "seniority_mirror": processor.seniority_mirror.stats(),
+        "aa_token": get_aa_client().token_manager.stats(),
+        "aa_deploys": get_aa_client().scheduler.stats(),
+        "status_batchers": status_batcher_stats(),
+        "report_cache": get_report_builder().stats(),
+        "webhook_admission": get_webhook_admission().stats(),
+        "database": get_db().stats()
+    }
+    
+    if get_settings().run_event_drainer:
+        metrics["event_drainer"] = get_event_drainer().stats()
+    
+    return JSONResponse(
+        status_code=200,
+        content={"metrics": metrics}
+    )
+
+
 @app.get("/admin/recent-detections")
 async def get_recent_detections(limit: int = 10):
     """
@@ -327,6 +460,51 @@ async def get_recent_detections(limit: int = 10):
         )
 
 
+@app.get("/admin/dead-letter")
+async def get_dead_letter_events(limit: int = 50):
+    """
+    Get events that exhausted their retries.
+    
+    Events move here after max_retries failed processing attempts and
+    are no longer picked up by the drainer or process_pending_events().
+    """
+    db = get_db()
+    
+    try:
+        with db.get_cursor() as cur:
+            cur.execute("SELECT COUNT(*) as count FROM events_dead_letter")
+            total = cur.fetchone()['count']
+            
+            cur.execute("""
+                SELECT 
+                    id, user_id, username, profile_field, value,
+                    received_at, attempts, last_error, dead_lettered_at
+                FROM events_dead_letter
+                ORDER BY dead_lettered_at DESC
+                LIMIT %s
+            """, (limit,))
+            
+            events = cur.fetchall()
+        
+        # Convert datetime to string for JSON serialization
+        for e in events:
+            for key in ('received_at', 'dead_lettered_at'):
+                if e[key]:
+                    e[key] = e[key].isoformat()
+        
+        return JSONResponse(
+            status_code=200,
+            content={"total": total, "events": events}
+        )
+        
+    except Exception as e:
+        logger.error(f"Error fetching dead-letter events: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching dead-letter events: {str(e)}"
+        )
+
+
 # Entry point for running with uvicorn
 if __name__ == "__main__":
     import uvicorn
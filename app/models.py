@@ -2,8 +2,9 @@
 Pydantic models for request/response validation.
 """
 
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 
 
@@ -50,12 +51,30 @@ class DigestEntry(BaseModel):
     detected_at: datetime
 
 
+@dataclass(slots=True)
+class DigestEntryRecord:
+    """
+    Digest entry hydrated from the digests outbox without validation.
+    
+    Same fields as DigestEntry; the outbox JSONB is written by our own
+    builders, so the send path trusts it (see DIGEST_STRICT_VALIDATION).
+    """
+    user_id: str
+    username: str
+    title: str
+    seniority_level: str
+    country: Optional[str]
+    company: Optional[str]
+    joined_at: Optional[datetime]
+    detected_at: datetime
+
+
 class DigestPayload(BaseModel):
     """Payload for sending digest to Automation Anywhere."""
     week_start: str
     week_end: str
     channel: str
-    users: list[DigestEntry]
+    users: list[Union[DigestEntry, DigestEntryRecord]]
     total_count: int
 
 
@@ -4,20 +4,393 @@ Automation Anywhere Integration
 Integrates with Automation Anywhere Control Room using Bot Deploy API v4.
 Deploys bots with input variables for email and Teams notifications.
 
+Deploys go through a DeployScheduler: a token bucket and a cap on
+in-flight deploys protect the Control Room, higher-priority digests
+(anything with a C-suite detection) are deployed first, and digests still
+queued for the same channel and week are coalesced into one deploy.
+
 API Documentation: https://docs.automationanywhere.com/bundle/enterprise-v2019/page/deploy-api-supported-v4.html
 """
 
+import asyncio
+import base64
+import heapq
+import itertools
+import json
+import time
 import httpx
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Awaitable, Callable, Hashable, Optional, Dict, Any, List, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..config import get_settings
 from ..models import DigestPayload
+from ..utils.metrics import LatencyTracker
+from ..utils.rate_limit import TokenBucket
+from ..utils.rendering import get_renderer
 
 logger = logging.getLogger(__name__)
 
 
+def parse_token_expiry(token: str) -> Optional[float]:
+    """
+    Read the expiry (epoch seconds) from a JWT's exp claim.
+    
+    Returns None if the token is not a JWT or has no exp claim.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenManager:
+    """
+    Caches an auth token and refreshes it before it expires.
+    
+    Refreshes are single-flight: concurrent callers needing a new token
+    wait on one authentication instead of each logging in.
+    """
+    
+    def __init__(
+        self,
+        authenticate: Callable[[], Awaitable[Tuple[str, Optional[float]]]],
+        default_ttl_seconds: float,
+        refresh_margin_seconds: float,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize manager.
+        
+        authenticate returns (token, expires_at); expires_at is epoch
+        seconds, or None to use default_ttl_seconds.
+        """
+        self._authenticate = authenticate
+        self.default_ttl_seconds = default_ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refreshes = 0
+        self.forced_refreshes = 0
+    
+    def _is_fresh(self) -> bool:
+        return (
+            self.token is not None
+            and self._clock() < self.expires_at - self.refresh_margin_seconds
+        )
+    
+    async def get_token(self) -> str:
+        """Return a token that is not about to expire, refreshing if needed."""
+        if self._is_fresh():
+            return self.token
+        return await self.refresh()
+    
+    async def refresh(self, rejected_token: Optional[str] = None) -> str:
+        """
+        Authenticate and cache a new token.
+        
+        Pass the token the server rejected (401) to force a refresh even
+        if it has not expired yet; if another caller already replaced it,
+        the newer token is returned without authenticating again.
+        """
+        async with self._lock:
+            if self.token is not None and self.token != rejected_token and self._is_fresh():
+                return self.token
+            
+            token, expires_at = await self._authenticate()
+            if expires_at is None:
+                expires_at = self._clock() + self.default_ttl_seconds
+            self.token = token
+            self.expires_at = expires_at
+            self.refreshes += 1
+            if rejected_token is not None:
+                self.forced_refreshes += 1
+            return token
+    
+    def stats(self) -> dict:
+        """Return token metrics."""
+        return {
+            "has_token": self.token is not None,
+            "expires_in_seconds": round(max(0.0, self.expires_at - self._clock()), 1),
+            "refreshes": self.refreshes,
+            "forced_refreshes": self.forced_refreshes
+        }
+
+
+# Scheduler priority classes (lower runs first) and their AA automationPriority
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+AA_PRIORITIES = {
+    PRIORITY_HIGH: "PRIORITY_HIGH",
+    PRIORITY_NORMAL: "PRIORITY_MEDIUM",
+    PRIORITY_LOW: "PRIORITY_LOW"
+}
+
+# Template rendered into each channel's bot message
+CHANNEL_TEMPLATES = {
+    "email": "digest_email.html",
+    "teams": "digest_teams.md"
+}
+
+
+class DeployCancelledError(Exception):
+    """The coalesced deploy was abandoned because its owning caller was cancelled."""
+
+
+class _DeployJob:
+    """A queued deploy and the future its (possibly coalesced) callers await."""
+    
+    __slots__ = ("priority", "seq", "key", "payload", "future", "enqueued_at", "state", "merged")
+    
+    def __init__(self, priority: int, seq: int, key: Optional[Hashable], payload: Any, enqueued_at: float):
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.payload = payload
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Consume exceptions nobody else awaits, so they are not logged as unretrieved
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.enqueued_at = enqueued_at
+        self.state = "queued"
+        self.merged = 0
+
+
+class DeployScheduler:
+    """
+    Orders and throttles bot deploys.
+    
+    Queued deploys start in priority order (FIFO within a class) once an
+    in-flight slot is free, and each start takes a token from the bucket.
+    A deploy submitted with the key of one still queued is merged into it
+    when the merge function accepts, and all callers get the one result.
+    
+    The first caller owns the job. If it is cancelled (e.g. by a send
+    timeout) the job is abandoned and coalesced callers get
+    DeployCancelledError: the merged payload includes the owner's part,
+    which its caller now treats as unsent, so running it anyway could
+    deliver it twice.
+    """
+    
+    def __init__(
+        self,
+        rate_per_second: float,
+        max_in_flight: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize scheduler; a rate of 0 or less disables the token bucket."""
+        self.rate_limiter = TokenBucket(rate_per_second, clock=clock)
+        self.max_in_flight = max(1, max_in_flight)
+        self._clock = clock
+        self._seq = itertools.count()
+        self._queue: List[Tuple[int, int, _DeployJob]] = []
+        self._queued_by_key: Dict[Hashable, _DeployJob] = {}
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        self.queued = 0
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_by_priority: Dict[int, int] = {p: 0 for p in AA_PRIORITIES}
+        self.queue_wait = LatencyTracker()
+        self.run_latency = LatencyTracker()
+    
+    def _condition(self) -> asyncio.Condition:
+        """Condition bound to the running loop (recreated for a new loop)."""
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+        return self._cond
+    
+    def _head(self) -> Optional[_DeployJob]:
+        """Next job to start, dropping stale heap entries."""
+        while self._queue:
+            priority, _, job = self._queue[0]
+            if job.state == "queued" and priority == job.priority:
+                return job
+            heapq.heappop(self._queue)
+        return None
+    
+    def _dequeue(self, job: _DeployJob, state: str):
+        """Take a job out of the queue (its heap entry goes stale)."""
+        job.state = state
+        self.queued -= 1
+        if job.key is not None and self._queued_by_key.get(job.key) is job:
+            del self._queued_by_key[job.key]
+    
+    async def _notify(self):
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+    
+    async def submit(
+        self,
+        run: Callable[[Any, int], Awaitable[Any]],
+        payload: Any,
+        priority: int = PRIORITY_NORMAL,
+        key: Optional[Hashable] = None,
+        merge: Optional[Callable[[Any, Any], Optional[Any]]] = None
+    ) -> Any:
+        """
+        Queue a deploy and wait for its result.
+        
+        Args:
+            run: Performs the deploy as run(payload, priority)
+            payload: What to deploy
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+            key: Coalescing key; None never coalesces
+            merge: merge(queued_payload, payload) returns the combined
+                payload, or None to queue this deploy separately
+        """
+        cond = self._condition()
+        self.submitted += 1
+        
+        job = self._queued_by_key.get(key) if key is not None and merge is not None else None
+        if job is not None:
+            merged = merge(job.payload, payload)
+            if merged is not None:
+                job.payload = merged
+                job.merged += 1
+                self.coalesced += 1
+                if priority < job.priority:
+                    # Old heap entry goes stale; the job moves up a class
+                    job.priority = priority
+                    heapq.heappush(self._queue, (priority, job.seq, job))
+                    await self._notify()
+                return await asyncio.shield(job.future)
+        
+        job = _DeployJob(priority, next(self._seq), key, payload, self._clock())
+        heapq.heappush(self._queue, (priority, job.seq, job))
+        if key is not None:
+            self._queued_by_key[key] = job
+        self.queued += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queued)
+        
+        try:
+            async with cond:
+                await cond.wait_for(
+                    lambda: job.state != "queued"
+                    or (self._head() is job and self.in_flight < self.max_in_flight)
+                )
+                if job.state != "queued":
+                    return await asyncio.shield(job.future)
+                self._dequeue(job, "running")
+                self.in_flight += 1
+                # The next job may be startable too
+                cond.notify_all()
+        except BaseException as e:
+            if job.state == "queued":
+                self._dequeue(job, "cancelled")
+                self._abandon(job, e)
+                asyncio.get_running_loop().create_task(self._notify())
+            raise
+        
+        self.queue_wait.observe(self._clock() - job.enqueued_at)
+        self.started_by_priority[job.priority] = self.started_by_priority.get(job.priority, 0) + 1
+        try:
+            await self.rate_limiter.acquire()
+            start = self._clock()
+            result = await run(job.payload, job.priority)
+            self.run_latency.observe(self._clock() - start)
+        except BaseException as e:
+            self.failed += 1
+            self._abandon(job, e)
+            raise
+        else:
+            self.completed += 1
+            job.future.set_result(result)
+            return result
+        finally:
+            self.in_flight -= 1
+            job.state = "done"
+            await self._notify()
+    
+    def _abandon(self, job: _DeployJob, error: BaseException):
+        """
+        Fail a job's coalesced callers with an ordinary exception.
+        
+        Cancellation is the owner's alone; followers must not see
+        CancelledError, which their callers' `except Exception` would miss.
+        """
+        if job.future.done():
+            return
+        if isinstance(error, Exception):
+            job.future.set_exception(error)
+        else:
+            job.future.set_exception(
+                DeployCancelledError(f"deploy abandoned: owning caller cancelled ({job.merged} coalesced)")
+            )
+    
+    def stats(self) -> dict:
+        """Return queue and throughput metrics."""
+        return {
+            "queue_depth": self.queued,
+            "peak_queue_depth": self.peak_queue_depth,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "started_by_priority": {
+                AA_PRIORITIES[p]: count for p, count in self.started_by_priority.items()
+            },
+            "queue_wait": self.queue_wait.summary(),
+            "run_latency": self.run_latency.summary(),
+            "rate_limiter": self.rate_limiter.stats()
+        }
+
+
+def digest_priority(digest: DigestPayload) -> int:
+    """C-suite detections are urgent; everything else is a routine digest."""
+    if any(user.seniority_level == "csuite" for user in digest.users):
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def digest_message_bytes(digest: DigestPayload) -> int:
+    """Size of the message the channel's bot is given for a digest."""
+    return len(get_renderer().render(CHANNEL_TEMPLATES[digest.channel], digest=digest).encode("utf-8"))
+
+
+def merge_digests(
+    queued: DigestPayload,
+    new: DigestPayload,
+    max_users: int,
+    max_bytes: Optional[int] = None
+) -> Optional[DigestPayload]:
+    """
+    Combine two digests for the same channel and week.
+    
+    Returns None (not merged) if the result would have more than max_users
+    users or, with max_bytes, a rendered message larger than that.
+    """
+    if len(queued.users) + len(new.users) > max_users:
+        return None
+    merged = DigestPayload(
+        week_start=queued.week_start,
+        week_end=queued.week_end,
+        channel=queued.channel,
+        users=queued.users + new.users,
+        total_count=queued.total_count + new.total_count
+    )
+    if max_bytes is not None and digest_message_bytes(merged) > max_bytes:
+        return None
+    return merged
+
+
 class AutomationAnywhereClient:
     """
     Client for deploying Automation Anywhere bots via Control Room API v4.
@@ -41,13 +414,33 @@ class AutomationAnywhereClient:
         # API endpoints
         self.deploy_endpoint = f"{self.control_room_url}/v3/automations/deploy"
         
-        # Token will be set after authentication
-        self.auth_token = None
         self.headers = {
             "Content-Type": "application/json"
         }
+        self.token_manager = TokenManager(
+            self._authenticate,
+            default_ttl_seconds=self.settings.aa_token_ttl_seconds,
+            refresh_margin_seconds=self.settings.aa_token_refresh_margin_seconds
+        )
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.scheduler = DeployScheduler(
+            rate_per_second=self.settings.aa_deploy_rate_per_second,
+            max_in_flight=self.settings.aa_max_in_flight_deploys
+        )
     
-    async def _authenticate(self) -> str:
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client shared by auth and deploy calls."""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=30.0)
+        return self._http_client
+    
+    async def close(self):
+        """Close pooled HTTP connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
+    async def _authenticate(self) -> Tuple[str, Optional[float]]:
         """
         Authenticate with AA Control Room to get access token.
         
@@ -55,7 +448,9 @@ class AutomationAnywhereClient:
         https://docs.automationanywhere.com/bundle/enterprise-v2019/page/auth-api-supported-v2.html
         
         Returns:
-            Authentication token for use in X-Authorization header
+            (token, expires_at): token for the X-Authorization header and its
+            expiry in epoch seconds, read from the JWT exp claim (None if
+            absent, in which case AA_TOKEN_TTL_SECONDS applies)
         """
         auth_payload = {
             "username": self.username,
@@ -65,30 +460,53 @@ class AutomationAnywhereClient:
         
         logger.info(f"Authenticating user {self.username} with AA Control Room")
         
-        async with httpx.AsyncClient() as client:
+        client = self._get_http_client()
+        response = await client.post(
+            self.auth_endpoint,
+            json=auth_payload,
+            headers={"Content-Type": "application/json"}
+        )
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        # Extract token from response
+        token = result.get("token")
+        if not token:
+            raise ValueError("Authentication response did not contain token")
+        
+        logger.info("Successfully authenticated with AA Control Room")
+        return token, parse_token_expiry(token)
+    
+    async def _ensure_authenticated(self) -> str:
+        """Return a valid authentication token, refreshing it if near expiry."""
+        return await self.token_manager.get_token()
+    
+    async def _post_authenticated(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        POST with the current token, re-authenticating once on a 401.
+        
+        The re-auth happens inside a single attempt, so an expired or
+        revoked token does not use up the caller's retries.
+        """
+        client = self._get_http_client()
+        token = await self._ensure_authenticated()
+        response = await client.post(
+            url,
+            json=payload,
+            headers={**self.headers, "X-Authorization": token}
+        )
+        
+        if response.status_code == 401:
+            logger.info("AA token rejected, re-authenticating")
+            token = await self.token_manager.refresh(rejected_token=token)
             response = await client.post(
-                self.auth_endpoint,
-                json=auth_payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30.0
+                url,
+                json=payload,
+                headers={**self.headers, "X-Authorization": token}
             )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            # Extract token from response
-            token = result.get("token")
-            if not token:
-                raise ValueError("Authentication response did not contain token")
-            
-            logger.info("Successfully authenticated with AA Control Room")
-            return token
-    
-    async def _ensure_authenticated(self):
-        """Ensure we have a valid authentication token."""
-        if not self.auth_token:
-            self.auth_token = await self._authenticate()
-            self.headers["X-Authorization"] = self.auth_token
+        
+        return response
     
     def _prepare_email_bot_inputs(self, digest: DigestPayload) -> Dict[str, Any]:
         """
@@ -115,60 +533,8 @@ class AutomationAnywhereClient:
         return bot_inputs
     
     def _build_email_html(self, digest: DigestPayload) -> str:
-        """Build HTML email body."""
-        html = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; }}
-                table {{ border-collapse: collapse; width: 100%; }}
-                th {{ background-color: #007bff; color: white; padding: 12px; text-align: left; }}
-                td {{ padding: 10px; border-bottom: 1px solid #ddd; }}
-                tr:hover {{ background-color: #f8f9fa; }}
-                .header {{ background-color: #007bff; color: white; padding: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h2>Weekly Senior Executive Detections</h2>
-            </div>
-            <p><strong>Period:</strong> {digest.week_start} to {digest.week_end}</p>
-            <p><strong>Total detections:</strong> {digest.total_count}</p>
-            
-            <table>
-                <thead>
-                    <tr>
-                        <th>Name</th>
-                        <th>Title</th>
-                        <th>Level</th>
-                        <th>Country</th>
-                        <th>Company</th>
-                        <th>Detected</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-        
-        for user in digest.users:
-            html += f"""
-                    <tr>
-                        <td>{user.username}</td>
-                        <td>{user.title}</td>
-                        <td>{user.seniority_level.upper()}</td>
-                        <td>{user.country or 'N/A'}</td>
-                        <td>{user.company or 'N/A'}</td>
-                        <td>{user.detected_at.strftime('%Y-%m-%d')}</td>
-                    </tr>
-            """
-        
-        html += """
-                </tbody>
-            </table>
-        </body>
-        </html>
-        """
-        
-        return html
+        """Build HTML email body (user fields are HTML-escaped)."""
+        return get_renderer().render(CHANNEL_TEMPLATES["email"], digest=digest)
     
     def _prepare_teams_bot_inputs(self, digest: DigestPayload) -> Dict[str, Any]:
         """
@@ -178,20 +544,7 @@ class AutomationAnywhereClient:
         Customize based on your bot's input variable names.
         """
         # Build Teams message text (markdown format)
-        message_text = f"""**Weekly Senior Executive Detections**
-
-**Period:** {digest.week_start} to {digest.week_end}  
-**Total detections:** {digest.total_count}
-
-"""
-        
-        for user in digest.users:
-            message_text += f"""
-- **{user.username}** - {user.title} ({user.seniority_level.upper()})  
-  {user.company or 'Company N/A'} | {user.country or 'Country N/A'}  
-  Detected: {user.detected_at.strftime('%Y-%m-%d')}
-
-"""
+        message_text = get_renderer().render(CHANNEL_TEMPLATES["teams"], digest=digest)
         
         # Prepare bot input variables
         # IMPORTANT: Variable names must match your bot's input variable names
@@ -214,7 +567,8 @@ class AutomationAnywhereClient:
         self,
         bot_id: str,
         bot_inputs: Dict[str, Any],
-        bot_name: str = "Bot"
+        bot_name: str = "Bot",
+        priority: int = PRIORITY_NORMAL
     ) -> Dict[str, Any]:
         """
         Deploy an Automation Anywhere bot using the Bot Deploy API v3.
@@ -225,13 +579,11 @@ class AutomationAnywhereClient:
             bot_id: The file ID/bot ID of the bot in Control Room
             bot_inputs: Dictionary of input variable names and values
             bot_name: Name for logging purposes
+            priority: Scheduler priority class, sent as automationPriority
             
         Returns:
             API response with deployment ID and status
         """
-        # Ensure we're authenticated
-        await self._ensure_authenticated()
-        
         # Convert bot inputs to AA API format
         # Input variables as nested dictionary structure
         formatted_inputs = {}
@@ -247,7 +599,7 @@ class AutomationAnywhereClient:
             "automationName": bot_name,
             "description": f"Deployed by CaptPathfinder - {bot_name}",
             "botInput": formatted_inputs,
-            "automationPriority": "PRIORITY_MEDIUM",
+            "automationPriority": AA_PRIORITIES.get(priority, "PRIORITY_MEDIUM"),
             "runElevated": False,
             "hideBotAgentUi": False
         }
@@ -255,20 +607,34 @@ class AutomationAnywhereClient:
         logger.info(f"Deploying {bot_name} (Bot ID: {bot_id})")
         logger.debug(f"Deployment payload: {payload}")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.deploy_endpoint,
-                json=payload,
-                headers=self.headers,
-                timeout=30.0
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            deployment_id = result.get('deploymentId') or result.get('automationId')
-            logger.info(f"{bot_name} deployed successfully. Deployment ID: {deployment_id}")
-            return result
+        response = await self._post_authenticated(self.deploy_endpoint, payload)
+        response.raise_for_status()
+        result = response.json()
+        
+        deployment_id = result.get('deploymentId') or result.get('automationId')
+        logger.info(f"{bot_name} deployed successfully. Deployment ID: {deployment_id}")
+        return result
+    
+    async def _schedule_digest(
+        self,
+        deploy: Callable[[DigestPayload, int], Awaitable[Dict[str, Any]]],
+        digest: DigestPayload
+    ) -> Dict[str, Any]:
+        """Run a digest deploy through the scheduler, coalescing by channel and week."""
+        max_users = self.settings.aa_coalesce_max_users
+        # Merged digests must still fit the channel's message size, like
+        # the digests DigestBuilder packs
+        max_bytes = {
+            "email": self.settings.digest_email_max_bytes,
+            "teams": self.settings.digest_teams_max_bytes
+        }.get(digest.channel)
+        return await self.scheduler.submit(
+            deploy,
+            digest,
+            priority=digest_priority(digest),
+            key=(digest.channel, digest.week_start, digest.week_end) if max_users > 0 else None,
+            merge=lambda queued, new: merge_digests(queued, new, max_users, max_bytes)
+        )
     
     async def send_email_digest(self, digest: DigestPayload) -> bool:
         """
@@ -281,15 +647,15 @@ class AutomationAnywhereClient:
                 f"Sending email digest for week {digest.week_start} - {digest.week_end}"
             )
             
-            # Prepare bot input variables
-            bot_inputs = self._prepare_email_bot_inputs(digest)
+            async def deploy(payload: DigestPayload, priority: int) -> Dict[str, Any]:
+                return await self._deploy_bot(
+                    bot_id=self.email_bot_id,
+                    bot_inputs=self._prepare_email_bot_inputs(payload),
+                    bot_name="Email Bot",
+                    priority=priority
+                )
             
-            # Deploy the email bot
-            result = await self._deploy_bot(
-                bot_id=self.email_bot_id,
-                bot_inputs=bot_inputs,
-                bot_name="Email Bot"
-            )
+            result = await self._schedule_digest(deploy, digest)
             
             logger.info(f"Email digest sent successfully: {result}")
             return True
@@ -309,15 +675,15 @@ class AutomationAnywhereClient:
                 f"Sending Teams digest for week {digest.week_start} - {digest.week_end}"
             )
             
-            # Prepare bot input variables
-            bot_inputs = self._prepare_teams_bot_inputs(digest)
+            async def deploy(payload: DigestPayload, priority: int) -> Dict[str, Any]:
+                return await self._deploy_bot(
+                    bot_id=self.teams_bot_id,
+                    bot_inputs=self._prepare_teams_bot_inputs(payload),
+                    bot_name="Teams Bot",
+                    priority=priority
+                )
             
-            # Deploy the Teams bot
-            result = await self._deploy_bot(
-                bot_id=self.teams_bot_id,
-                bot_inputs=bot_inputs,
-                bot_name="Teams Bot"
-            )
+            result = await self._schedule_digest(deploy, digest)
             
             logger.info(f"Teams digest sent successfully: {result}")
             return True
@@ -1,19 +1,176 @@
 """
 Digest Builder Service
 ======================
-Handles sending of pending digests to stakeholders via Automation Anywhere.
+Builds weekly digests and sends pending digests to stakeholders via
+Automation Anywhere.
+
+DigestBuilder packs each channel's users into as few digests as fit the
+channel's rendered message size and user limits, so a busy week needs
+fewer bot deploys than fixed 10-user chunks (build_weekly_digest() in
+scripts/create_functions.sql).
+
+The digests table is used as an outbox: a sender claims rows with a lease
+(claimed_by / lease_expires_at), renews it while sends are in flight and
+releases it on failure, so several workers can send in parallel and a
+crashed worker's digests are picked up once its lease expires.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Optional
+import math
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 
+from ..config import get_settings
 from ..database import get_db
-from ..models import DigestPayload, DigestEntry
-from .aa_integration import get_aa_client
+from ..models import DigestPayload, DigestEntry, DigestEntryRecord
+from ..utils.rendering import get_renderer
+from .aa_integration import CHANNEL_TEMPLATES, get_aa_client
+from .status_batcher import get_digest_sent_batcher
 
 logger = logging.getLogger(__name__)
 
+# Users per digest in the fixed-size SQL builder, for the savings report
+LEGACY_CHUNK_SIZE = 10
+
+
+def pack_sizes(sizes: Sequence[int], base_bytes: int, max_bytes: int, max_users: int) -> List[Tuple[int, int]]:
+    """
+    Greedily pack consecutive items into chunks.
+    
+    A chunk holds at most max_users items and base_bytes plus its items'
+    sizes stays within max_bytes; an item too large on its own gets a chunk
+    to itself. Returns (start, end) index ranges in order.
+    """
+    chunks = []
+    start = 0
+    used = base_bytes
+    for i, size in enumerate(sizes):
+        count = i - start
+        if count and (count >= max_users or used + size > max_bytes):
+            chunks.append((start, i))
+            start = i
+            used = base_bytes
+        used += size
+    if start < len(sizes):
+        chunks.append((start, len(sizes)))
+    return chunks
+
+
+class DigestBuilder:
+    """Builds the week's digests, packed by message size."""
+    
+    def __init__(self):
+        """Initialize digest builder."""
+        self.db = get_db()
+        self.settings = get_settings()
+        self.renderer = get_renderer()
+    
+    def channel_limits(self) -> Dict[str, Tuple[int, int]]:
+        """(max rendered message bytes, max users) per channel."""
+        return {
+            "email": (self.settings.digest_email_max_bytes, max(1, self.settings.digest_email_max_users)),
+            "teams": (self.settings.digest_teams_max_bytes, max(1, self.settings.digest_teams_max_users))
+        }
+    
+    def _message_bytes(self, channel: str, users: List[DigestEntry], total_count: int) -> int:
+        digest = DigestPayload(
+            week_start="0000-00-00", week_end="0000-00-00", channel=channel,
+            users=users, total_count=total_count
+        )
+        return len(self.renderer.render(CHANNEL_TEMPLATES[channel], digest=digest).encode("utf-8"))
+    
+    def measure(self, channel: str, users: List[DigestEntry], max_users: int) -> Tuple[int, List[int]]:
+        """
+        Rendered size of a digest: (fixed bytes, bytes per user).
+        
+        The message is the fixed frame plus one repeated block per user, so
+        sizes add up; the frame is measured with the widest total count.
+        """
+        base = self._message_bytes(channel, [], max_users)
+        return base, [self._message_bytes(channel, [user], max_users) - base for user in users]
+    
+    def pack(self, channel: str, users: List[DigestEntry]) -> List[List[DigestEntry]]:
+        """Split users into as few digests as the channel's limits allow."""
+        max_bytes, max_users = self.channel_limits()[channel]
+        base, sizes = self.measure(channel, users, max_users)
+        return [users[a:b] for a, b in pack_sizes(sizes, base, max_bytes, max_users)]
+    
+    def build_weekly_digest(self) -> dict:
+        """
+        Claim the week's undigested detections and write packed digests.
+        
+        The claim (UPDATE ... RETURNING) and the insert of every channel's
+        digests run in one transaction, so detections are marked
+        included_in_digest only together with the digests carrying them.
+        
+        Returns counts per channel and the deploys saved versus
+        LEGACY_CHUNK_SIZE-user digests.
+        """
+        channels = list(CHANNEL_TEMPLATES)
+        
+        with self.db.transaction() as cur:
+            cur.execute("""
+                UPDATE detections
+                SET included_in_digest = TRUE
+                WHERE detected_at >= CURRENT_DATE - 7
+                  AND detected_at <= CURRENT_DATE
+                  AND NOT included_in_digest
+                RETURNING id, user_id, username, title, seniority_level,
+                          country, company, joined_at, detected_at,
+                          CURRENT_DATE - 7 AS week_start, CURRENT_DATE AS week_end
+            """)
+            rows = sorted(cur.fetchall(), key=lambda r: (r['detected_at'], r['id']), reverse=True)
+            
+            users = [
+                DigestEntry(
+                    user_id=r['user_id'],
+                    username=r['username'] or r['user_id'],
+                    title=r['title'] or '',
+                    seniority_level=r['seniority_level'],
+                    country=r['country'],
+                    company=r['company'],
+                    joined_at=r['joined_at'],
+                    detected_at=r['detected_at']
+                )
+                for r in rows
+            ]
+            
+            digest_channels = []
+            digest_payloads = []
+            by_channel = {}
+            for channel in channels:
+                chunks = self.pack(channel, users) if users else []
+                by_channel[channel] = len(chunks)
+                for chunk in chunks:
+                    digest_channels.append(channel)
+                    digest_payloads.append(json.dumps({
+                        "users": [user.model_dump(mode="json") for user in chunk]
+                    }))
+            
+            if digest_payloads:
+                cur.execute("""
+                    INSERT INTO digests (week_start, week_end, channel, payload)
+                    SELECT %s, %s, t.channel, t.payload::jsonb
+                    FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS t(channel, payload, n)
+                    ORDER BY t.n
+                """, (rows[0]['week_start'], rows[0]['week_end'], digest_channels, digest_payloads))
+        
+        legacy = len(channels) * math.ceil(len(users) / LEGACY_CHUNK_SIZE)
+        results = {
+            "detections": len(users),
+            "digests_created": len(digest_payloads),
+            "by_channel": by_channel,
+            "legacy_digests": legacy,
+            "deploys_saved": legacy - len(digest_payloads)
+        }
+        logger.info(f"Built weekly digests: {results}")
+        return results
+
 
 class DigestSender:
     """Sends pending digests via Automation Anywhere."""
@@ -22,56 +179,123 @@ class DigestSender:
         """Initialize digest sender."""
         self.db = get_db()
         self.aa_client = get_aa_client()
+        self.settings = get_settings()
+        self.worker_id = self.settings.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = self.settings.digest_lease_seconds
+        self.sent_batcher = get_digest_sent_batcher()
     
     def get_pending_digests(self) -> List[dict]:
         """
-        Get pending digests that need to be sent.
+        Claim pending digests that need to be sent.
         
-        Uses SELECT FOR UPDATE SKIP LOCKED for concurrent processing safety.
+        Claims unsent digests that are unclaimed or whose lease has expired,
+        in one UPDATE ... RETURNING, so the claim outlives this statement's
+        transaction (unlike a row lock) and no two senders get the same row.
         """
         with self.db.get_cursor() as cur:
             cur.execute("""
-                SELECT 
-                    id, week_start, week_end, channel, payload, created_at
-                FROM digests
-                WHERE NOT sent
-                ORDER BY created_at ASC
-                LIMIT 10
-                FOR UPDATE SKIP LOCKED
-            """)
+                UPDATE digests d
+                SET claimed_by = %s,
+                    lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE d.id IN (
+                    SELECT id
+                    FROM digests
+                    WHERE NOT sent
+                      AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+                    ORDER BY created_at ASC
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING 
+                    d.id, d.week_start, d.week_end, d.channel, d.payload, d.created_at
+            """, (self.worker_id, self.lease_seconds, self.settings.digest_claim_limit))
             
-            digests = cur.fetchall()
-            logger.info(f"Found {len(digests)} pending digests")
+            digests = sorted(cur.fetchall(), key=lambda d: (d['created_at'] is None, d['created_at'], d['id']))
+            logger.info(f"Claimed {len(digests)} pending digests as {self.worker_id}")
             return digests
     
-    def mark_digest_sent(self, digest_id: int):
-        """Mark a digest as sent."""
+    def renew_leases(self, digest_ids: List[int]) -> List[int]:
+        """
+        Extend the lease on digests this sender still holds.
+        
+        Returns the ids still held; any missing id's lease was lost
+        (expired and reclaimed by another sender).
+        """
+        if not digest_ids:
+            return []
         with self.db.get_cursor() as cur:
             cur.execute("""
                 UPDATE digests
-                SET sent = TRUE, sent_at = NOW()
-                WHERE id = %s
-            """, (digest_id,))
-            logger.info(f"Marked digest {digest_id} as sent")
+                SET lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE id = ANY(%s) AND claimed_by = %s AND NOT sent
+                RETURNING id
+            """, (self.lease_seconds, list(digest_ids), self.worker_id))
+            held = [row['id'] for row in cur.fetchall()]
+        
+        lost = set(digest_ids) - set(held)
+        if lost:
+            logger.warning(f"Lost digest leases: {sorted(lost)}")
+        return held
+    
+    def release_digest(self, digest_id: int):
+        """Give up the claim on an unsent digest so it can be retried."""
+        with self.db.get_cursor() as cur:
+            cur.execute("""
+                UPDATE digests
+                SET claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = %s AND claimed_by = %s AND NOT sent
+            """, (digest_id, self.worker_id))
+    
+    def mark_digest_sent(self, digest_id: int):
+        """
+        Mark a digest as sent.
+        
+        Write-behind: the update is batched with other sent digests and
+        applied within STATUS_BATCH_MAX_DELAY_MS, or when
+        send_pending_digests finishes; until then send_pending_digests keeps
+        renewing the digest's lease. Only the first mark for a digest takes
+        effect.
+        """
+        self.sent_batcher.add(digest_id)
+        logger.info(f"Marked digest {digest_id} as sent")
+    
+    def _channel_limits(self) -> Dict[str, int]:
+        """Max concurrent sends per channel."""
+        return {
+            "email": max(1, self.settings.digest_email_concurrency),
+            "teams": max(1, self.settings.digest_teams_concurrency)
+        }
     
     def _build_digest_payload(self, digest_row: dict) -> DigestPayload:
-        """Build DigestPayload from database row."""
+        """
+        Build DigestPayload from database row.
+        
+        The payload JSONB is written by our own builders (psycopg has
+        already decoded it), so by default entries are plain slotted
+        records built without validation; only timestamps are parsed, for
+        the templates. Set DIGEST_STRICT_VALIDATION to validate every entry
+        with pydantic instead.
+        """
         payload_json = digest_row['payload']
         users_data = payload_json.get('users', [])
         
-        users = [
-            DigestEntry(
-                user_id=u['user_id'],
-                username=u['username'],
-                title=u['title'],
-                seniority_level=u['seniority_level'],
-                country=u.get('country'),
-                company=u.get('company'),
-                joined_at=datetime.fromisoformat(u['joined_at']) if u.get('joined_at') else None,
-                detected_at=datetime.fromisoformat(u['detected_at'])
-            )
-            for u in users_data
-        ]
+        if self.settings.digest_strict_validation:
+            users = [DigestEntry.model_validate(u) for u in users_data]
+        else:
+            parse = datetime.fromisoformat
+            users = [
+                DigestEntryRecord(
+                    u['user_id'],
+                    u['username'],
+                    u['title'],
+                    u['seniority_level'],
+                    u.get('country'),
+                    u.get('company'),
+                    parse(u['joined_at']) if u.get('joined_at') else None,
+                    parse(u['detected_at'])
+                )
+                for u in users_data
+            ]
         
         return DigestPayload(
             week_start=str(digest_row['week_start']),
@@ -85,6 +309,14 @@ class DigestSender:
         """
         Send all pending digests.
         
+        Digests are sent concurrently, bounded per channel, and each send is
+        capped by digest_send_timeout_seconds. Leases on claimed digests are
+        renewed while sends are in flight and, for sent digests, until their
+        write-behind sent mark is written, so no other sender reclaims a
+        digest that was delivered. A digest is marked sent only after a
+        successful send; failed or timed-out digests are released for the
+        next run.
+        
         Returns summary of results.
         """
         digests = self.get_pending_digests()
@@ -93,44 +325,117 @@ class DigestSender:
             "total": len(digests),
             "sent": 0,
             "failed": 0,
+            "timed_out": 0,
             "errors": []
         }
         
-        for digest_row in digests:
+        limits = self._channel_limits()
+        semaphores = {channel: asyncio.Semaphore(limit) for channel, limit in limits.items()}
+        claimed = [digest_row['id'] for digest_row in digests]
+        outstanding = set(claimed)
+        start = time.monotonic()
+        
+        def leased_ids() -> List[int]:
+            # In flight, or sent with the sent mark not yet written
+            return sorted(
+                digest_id for digest_id in claimed
+                if digest_id in outstanding or digest_id in self.sent_batcher
+            )
+        
+        async def renew_until_done():
+            # Renew well before expiry, so one slow renewal doesn't lose the lease
+            while leased_ids():
+                await asyncio.sleep(self.lease_seconds / 3)
+                try:
+                    self.renew_leases(leased_ids())
+                except Exception as e:
+                    logger.error(f"Error renewing digest leases: {e}")
+        
+        async def send_one(digest_row: dict):
             digest_id = digest_row['id']
-            try:
-                # Build payload
-                payload = self._build_digest_payload(digest_row)
-                
-                # Send via AA
-                success = await self.aa_client.send_digest(payload)
-                
-                if success:
-                    # Mark as sent
-                    self.mark_digest_sent(digest_id)
-                    results["sent"] += 1
-                    logger.info(
-                        f"Successfully sent digest {digest_id} via {payload.channel}"
+            semaphore = semaphores.setdefault(digest_row['channel'], asyncio.Semaphore(1))
+            sent = False
+            async with semaphore:
+                try:
+                    # Build payload
+                    payload = self._build_digest_payload(digest_row)
+                    
+                    # Send via AA
+                    success = await asyncio.wait_for(
+                        self.aa_client.send_digest(payload),
+                        timeout=self.settings.digest_send_timeout_seconds
                     )
-                else:
+                    
+                    if success:
+                        # Mark as sent (no-op if another sender got there first)
+                        self.mark_digest_sent(digest_id)
+                        sent = True
+                        results["sent"] += 1
+                        logger.info(
+                            f"Successfully sent digest {digest_id} via {payload.channel}"
+                        )
+                    else:
+                        results["failed"] += 1
+                        results["errors"].append(
+                            f"Digest {digest_id}: Send failed (see logs)"
+                        )
+                
+                except asyncio.TimeoutError:
                     results["failed"] += 1
+                    results["timed_out"] += 1
                     results["errors"].append(
-                        f"Digest {digest_id}: Send failed (see logs)"
+                        f"Digest {digest_id}: Timed out after "
+                        f"{self.settings.digest_send_timeout_seconds}s"
                     )
-                    
+                    logger.error(f"Timed out sending digest {digest_id}")
+                except Exception as e:
+                    results["failed"] += 1
+                    results["errors"].append(f"Digest {digest_id}: {str(e)}")
+                    logger.error(f"Error processing digest {digest_id}: {e}", exc_info=True)
+                finally:
+                    outstanding.discard(digest_id)
+                    if not sent:
+                        try:
+                            self.release_digest(digest_id)
+                        except Exception as e:
+                            # The lease expires on its own
+                            logger.error(f"Error releasing digest {digest_id}: {e}")
+        
+        renewer = asyncio.create_task(renew_until_done())
+        try:
+            await asyncio.gather(*(send_one(digest_row) for digest_row in digests))
+        finally:
+            renewer.cancel()
+            await asyncio.gather(renewer, return_exceptions=True)
+            try:
+                self.sent_batcher.flush()
             except Exception as e:
-                results["failed"] += 1
-                results["errors"].append(f"Digest {digest_id}: {str(e)}")
-                logger.error(f"Error processing digest {digest_id}: {e}", exc_info=True)
+                # Still pending; retried on the batcher's next flush, so
+                # give those digests a full lease to get there
+                logger.error(f"Error flushing sent digests: {e}")
+                try:
+                    self.renew_leases(leased_ids())
+                except Exception as renew_error:
+                    logger.error(f"Error renewing digest leases: {renew_error}")
+        results["elapsed_seconds"] = round(time.monotonic() - start, 3)
         
         logger.info(f"Digest sending complete: {results}")
         return results
 
 
-# Singleton instance
+# Singleton instances
+_digest_builder: Optional[DigestBuilder] = None
 _digest_sender: Optional[DigestSender] = None
 
 
+def get_digest_builder() -> DigestBuilder:
+    """Get digest builder instance (singleton)."""
+    global _digest_builder
+    if _digest_builder is None:
+        _digest_builder = DigestBuilder()
+    return _digest_builder
+
+
 def get_digest_sender() -> DigestSender:
     """Get digest sender instance (singleton)."""
     global _digest_sender
@@ -0,0 +1,266 @@
+"""
+Event Drainer Service
+=====================
+Long-running consumer for the events_raw queue.
+
+An insert trigger on events_raw issues NOTIFY (see
+migrations/004_event_notify.sql). The drainer LISTENs on a dedicated
+connection and, when woken, claims unprocessed events in micro-batches
+with FOR UPDATE SKIP LOCKED, so several drainers can run side by side.
+A periodic sweep picks up anything whose notification was missed (e.g.
+while the listener was reconnecting).
+
+The claim size adapts per batch (see AdaptiveBatchSizer) from the batch
+latency and the remaining backlog. Batches are timed from when their
+connection is open, so connect time (see Database.stats()) does not
+shrink them.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import psycopg
+
+from ..config import get_settings
+from ..database import get_db
+from ..models import WebhookEvent
+from ..utils.batch_sizer import AdaptiveBatchSizer
+from ..utils.metrics import LatencyTracker
+from .event_processor import get_event_processor
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "events_raw_inserted"
+
+
+class EventDrainer:
+    """Drains events_raw on NOTIFY with a fallback periodic sweep."""
+
+    def __init__(self):
+        """Initialize drainer."""
+        self.db = get_db()
+        self.settings = get_settings()
+        self.processor = get_event_processor()
+
+        self.sizer = AdaptiveBatchSizer(
+            initial_size=self.settings.batch_size,
+            min_size=self.settings.drain_min_batch_size,
+            max_size=self.settings.drain_max_batch_size,
+            target_latency_seconds=self.settings.drain_target_batch_latency_ms / 1000
+        )
+        self.sweep_interval = self.settings.drain_sweep_interval_seconds
+        self.coalesce_seconds = self.settings.drain_coalesce_ms / 1000
+
+        self._wake = asyncio.Event()
+        self.listening = False
+
+        self.notifications = 0
+        self.sweeps = 0
+        self.batches = 0
+        self.processed = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.detection_latency = LatencyTracker()
+        self.batch_latency = LatencyTracker()
+        self.claim_latency = LatencyTracker()
+
+    async def _listen(self, stop: asyncio.Event):
+        """Hold a LISTEN connection, waking the drain loop on each NOTIFY."""
+        while not stop.is_set():
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    self.settings.supabase_db_url,
+                    autocommit=True
+                )
+                async with conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    self.listening = True
+                    logger.info(f"Listening on channel {NOTIFY_CHANNEL}")
+
+                    # Events may have arrived while we were not listening
+                    self._wake.set()
+
+                    async for _ in conn.notifies():
+                        self.notifications += 1
+                        self._wake.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Listener connection lost: {e}")
+            finally:
+                self.listening = False
+
+            await asyncio.sleep(self.settings.drain_reconnect_seconds)
+
+    async def drain_batch(self) -> int:
+        """
+        Claim and process one batch of unprocessed events.
+
+        Row locks are held until the batch commits, so concurrent drainers
+        and the SQL process_pending_events() skip these rows. Only events
+        that are due are claimed; one whose processing raises is rescheduled
+        with backoff, or dead-lettered after max_retries attempts.
+
+        Returns number of events claimed.
+        """
+        limit = self.sizer.batch_size
+
+        with self.db.transaction() as cur:
+            # Timed from here: connection setup is not batch work
+            start = time.monotonic()
+            cur.execute("""
+                SELECT id, user_id, username, profile_field, value, old_value
+                FROM events_raw
+                WHERE NOT processed
+                  AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (limit,))
+            rows = cur.fetchall()
+            claim_time = time.monotonic() - start
+            self.claim_latency.observe(claim_time)
+
+            if not rows:
+                self.sizer.observe(0, claim_time, claim_time, 0)
+                return 0
+
+            # Due rows left behind this claim (capped, so the count stays cheap)
+            cur.execute("""
+                SELECT COUNT(*) AS backlog FROM (
+                    SELECT 1 FROM events_raw
+                    WHERE NOT processed
+                      AND next_attempt_at <= NOW()
+                    LIMIT %s
+                ) due
+            """, (len(rows) + self.sizer.max_size,))
+            backlog = cur.fetchone()['backlog'] - len(rows)
+
+            events = {
+                row['id']: WebhookEvent(
+                    userId=row['user_id'],
+                    username=row['username'] or "Unknown",
+                    profileField=row['profile_field'] or "",
+                    value=row['value'] or "",
+                    oldValue=row['old_value']
+                )
+                for row in rows
+            }
+
+            # Overlap metadata lookups before any classification writes
+            await self.processor.prefetch_user_metadata(
+                event.userId for event in events.values()
+                if event.profileField.lower() == "job title"
+            )
+
+            done_ids = []
+            for event_id, event in events.items():
+                try:
+                    if event.profileField.lower() == "job title":
+                        await self.processor.process_stored_event(event)
+                    done_ids.append(event_id)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Error processing event {event_id}: {e}", exc_info=True)
+                    outcome = self.processor.record_event_failure(event_id, e, cur)
+                    if outcome == "dead_letter":
+                        self.dead_lettered += 1
+
+            if done_ids:
+                cur.execute("""
+                    UPDATE events_raw
+                    SET processed = TRUE, processed_at = NOW()
+                    WHERE id = ANY(%s)
+                    RETURNING EXTRACT(EPOCH FROM clock_timestamp() - received_at) AS latency
+                """, (done_ids,))
+                for row in cur.fetchall():
+                    self.detection_latency.observe(float(row['latency']))
+
+        latency = time.monotonic() - start
+        self.batches += 1
+        self.processed += len(done_ids)
+        self.batch_latency.observe(latency)
+        next_size = self.sizer.observe(len(rows), latency, claim_time, backlog)
+        logger.info(
+            f"Drained batch of {len(rows)} events ({len(done_ids)} processed), "
+            f"next batch size {next_size}"
+        )
+        return len(rows)
+
+    async def drain(self) -> int:
+        """Drain batches until the queue is empty. Returns events claimed."""
+        total = 0
+        while True:
+            limit = self.sizer.batch_size
+            claimed = await self.drain_batch()
+            total += claimed
+            # Failed events are rescheduled, so a full batch means more is due
+            if claimed < limit:
+                return total
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Run until stop is set: drain on NOTIFY, sweep on a timer."""
+        stop = stop or asyncio.Event()
+        listener = asyncio.create_task(self._listen(stop))
+        logger.info("Event drainer started")
+
+        try:
+            while not stop.is_set():
+                woken = asyncio.create_task(self._wake.wait())
+                stopped = asyncio.create_task(stop.wait())
+                done, pending = await asyncio.wait(
+                    {woken, stopped},
+                    timeout=self.sweep_interval,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in pending:
+                    task.cancel()
+
+                if stop.is_set():
+                    break
+                if woken in done:
+                    # Let a burst of inserts accumulate into one batch
+                    await asyncio.sleep(self.coalesce_seconds)
+                else:
+                    self.sweeps += 1
+
+                self._wake.clear()
+                try:
+                    await self.drain()
+                except Exception as e:
+                    logger.error(f"Error draining events: {e}", exc_info=True)
+                    await asyncio.sleep(self.settings.drain_reconnect_seconds)
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            logger.info(f"Event drainer stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Return drainer metrics."""
+        return {
+            "listening": self.listening,
+            "notifications": self.notifications,
+            "sweeps": self.sweeps,
+            "batches": self.batches,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "batch_latency": self.batch_latency.summary(),
+            "claim_latency": self.claim_latency.summary(),
+            "batch_sizer": self.sizer.stats(),
+            "detection_latency": self.detection_latency.summary()
+        }
+
+
+# Singleton instance
+_drainer: Optional[EventDrainer] = None
+
+
+def get_event_drainer() -> EventDrainer:
+    """Get event drainer instance (singleton)."""
+    global _drainer
+    if _drainer is None:
+        _drainer = EventDrainer()
+    return _drainer
@@ -5,16 +5,23 @@ Handles processing of webhook events from the community platform.
 Classifies job titles and updates user state accordingly.
 """
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Iterable, List, Optional, Tuple, Union
 import httpx
 
 from ..models import WebhookEvent, UserMetadata
 from ..database import get_db
 from ..classification import classify_title, get_classifier
 from ..utils.helpers import generate_idempotency_key
+from ..utils.rate_limit import TokenBucket
+from ..utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..utils.metrics import NULL_TIMER, StageTimer
 from ..config import get_settings
+from .metadata_cache import UserMetadataCache
+from .seniority_mirror import get_seniority_mirror
+from .status_batcher import get_processed_batcher
 
 logger = logging.getLogger(__name__)
 
@@ -27,54 +34,267 @@ class EventProcessor:
         self.db = get_db()
         self.classifier = get_classifier()
         self.settings = get_settings()
+        self.metadata_cache = UserMetadataCache(
+            self._guarded_load_user_metadata,
+            ttl_seconds=self.settings.metadata_cache_ttl_seconds,
+            negative_ttl_seconds=self.settings.metadata_negative_ttl_seconds,
+            max_entries=self.settings.metadata_cache_max_entries
+        )
+        self.metadata_rate_limiter = TokenBucket(
+            self.settings.metadata_rate_limit_per_second
+        )
+        self.community_breaker = CircuitBreaker(
+            "community_api",
+            failure_rate_threshold=self.settings.community_breaker_failure_rate,
+            slow_call_seconds=self.settings.community_breaker_slow_call_seconds,
+            slow_call_rate_threshold=self.settings.community_breaker_slow_call_rate,
+            window_size=self.settings.community_breaker_window_size,
+            minimum_calls=self.settings.community_breaker_min_calls,
+            open_seconds=self.settings.community_breaker_open_seconds,
+            half_open_max_calls=self.settings.community_breaker_half_open_calls
+        )
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.seniority_mirror = get_seniority_mirror()
+        self.processed_batcher = get_processed_batcher()
     
-    async def fetch_user_metadata(self, user_id: str) -> Optional[UserMetadata]:
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client for community API calls."""
+        if self._http_client is None:
+            concurrency = self.settings.metadata_prefetch_concurrency
+            self._http_client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency
+                )
+            )
+        return self._http_client
+    
+    async def close(self):
+        """Close pooled HTTP connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
+    async def _load_user_metadata(self, user_id: str) -> Optional[UserMetadata]:
+        """
+        Load user metadata from the community API (cache loader).
+        
+        Returns None if the user does not exist upstream (404) so the cache
+        can store a negative entry. Raises on any other failure.
+        """
+        client = self._get_http_client()
+        response = await client.get(
+            f"{self.settings.community_api_url}/users/{user_id}",
+            headers={
+                "Authorization": f"Bearer {self.settings.community_api_key}"
+            }
+        )
+        if response.status_code == 404:
+            logger.info(f"User {user_id} not found in community API")
+            return None
+        
+        response.raise_for_status()
+        data = response.json()
+        
+        return UserMetadata(
+            user_id=user_id,
+            country=data.get('country'),
+            company=data.get('company'),
+            joined_at=data.get('joined_at')
+        )
+    
+    async def _guarded_load_user_metadata(self, user_id: str) -> Optional[UserMetadata]:
+        """
+        Load user metadata through the circuit breaker and rate limiter.
+        
+        The breaker is checked first, so calls it rejects don't take (or
+        wait for) a rate limiter token. Each call is bounded by the metadata
+        latency budget; exceeding it counts as a failure towards tripping
+        the breaker.
+        """
+        return await self.community_breaker.call(
+            self._load_user_metadata,
+            user_id,
+            timeout=self.settings.metadata_latency_budget_seconds,
+            acquire=self.metadata_rate_limiter.acquire
+        )
+    
+    async def _resolve_user_metadata(
+        self,
+        user_id: str
+    ) -> Tuple[Optional[UserMetadata], bool]:
         """
-        Fetch additional user metadata from community API.
+        Resolve user metadata without blocking on an unhealthy API.
         
-        This is a stub that should be implemented to call your actual
-        community platform API.
+        Returns: (metadata, deferred) - deferred is True when the lookup
+        failed, timed out or was rejected by the breaker, meaning the user
+        should be enriched later rather than treated as having no metadata.
         """
         if not self.settings.community_api_url:
-            logger.warning("Community API URL not configured, using defaults")
-            return UserMetadata(
-                user_id=user_id,
-                country=None,
-                company=None,
-                joined_at=datetime.now()  # Fallback
-            )
+            logger.warning("Community API URL not configured, skipping metadata fetch")
+            return (None, False)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.settings.community_api_url}/users/{user_id}",
-                    headers={
-                        "Authorization": f"Bearer {self.settings.community_api_key}"
-                    },
-                    timeout=5.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                return UserMetadata(
-                    user_id=user_id,
-                    country=data.get('country'),
-                    company=data.get('company'),
-                    joined_at=data.get('joined_at')
-                )
+            return (await self.metadata_cache.get(user_id), False)
+        except CircuitOpenError:
+            logger.info(f"Community API circuit open, deferring metadata for {user_id}")
+            return (None, True)
         except Exception as e:
-            logger.error(f"Failed to fetch user metadata for {user_id}: {e}")
-            # Return minimal metadata
-            return UserMetadata(user_id=user_id, joined_at=datetime.now())
+            logger.error(f"Failed to fetch user metadata for {user_id}: {e!r}")
+            return (None, True)
+    
+    async def fetch_user_metadata(self, user_id: str) -> Optional[UserMetadata]:
+        """
+        Fetch additional user metadata from community API (cached).
+        
+        Returns None when metadata is unavailable. Missing fields are left
+        empty rather than guessed - in particular joined_at is never
+        defaulted, since it drives the monthly report cohort.
+        """
+        metadata, _ = await self._resolve_user_metadata(user_id)
+        return metadata
+    
+    def defer_metadata(self, user_id: str):
+        """Queue a user for background metadata enrichment."""
+        with self.db.get_cursor() as cur:
+            cur.execute("""
+                INSERT INTO deferred_metadata (user_id)
+                VALUES (%s)
+                ON CONFLICT (user_id) DO NOTHING
+            """, (user_id,))
+        logger.info(f"Deferred metadata enrichment for user {user_id}")
+    
+    async def enrich_deferred_metadata(self, limit: int = 100) -> dict:
+        """
+        Fill in metadata for users processed while the API was unavailable.
+        
+        Only empty columns are filled, so values that arrived with a later
+        webhook are never overwritten. Returns summary of results.
+        """
+        results = {
+            "total": 0,
+            "enriched": 0,
+            "not_found": 0,
+            "failed": 0
+        }
+        
+        if not self.settings.community_api_url:
+            return results
+        
+        with self.db.get_cursor() as cur:
+            cur.execute("""
+                SELECT user_id
+                FROM deferred_metadata
+                ORDER BY last_attempt_at NULLS FIRST, deferred_at
+                LIMIT %s
+            """, (limit,))
+            user_ids = [row['user_id'] for row in cur.fetchall()]
+        
+        results["total"] = len(user_ids)
+        if not user_ids:
+            return results
+        
+        await self.prefetch_user_metadata(user_ids)
+        
+        for user_id in user_ids:
+            metadata, deferred = await self._resolve_user_metadata(user_id)
+            
+            if deferred:
+                results["failed"] += 1
+                with self.db.get_cursor() as cur:
+                    cur.execute("""
+                        UPDATE deferred_metadata
+                        SET attempts = attempts + 1, last_attempt_at = NOW()
+                        WHERE user_id = %s
+                    """, (user_id,))
+                continue
+            
+            with self.db.transaction() as cur:
+                if metadata:
+                    params = (metadata.country, metadata.company, metadata.joined_at, user_id)
+                    cur.execute("""
+                        UPDATE user_state
+                        SET country = COALESCE(country, %s),
+                            company = COALESCE(company, %s),
+                            joined_at = COALESCE(joined_at, %s)
+                        WHERE user_id = %s
+                    """, params)
+                    cur.execute("""
+                        UPDATE detections
+                        SET country = COALESCE(country, %s),
+                            company = COALESCE(company, %s),
+                            joined_at = COALESCE(joined_at, %s)
+                        WHERE user_id = %s
+                    """, params)
+                    results["enriched"] += 1
+                else:
+                    results["not_found"] += 1
+                
+                cur.execute("""
+                    DELETE FROM deferred_metadata WHERE user_id = %s
+                """, (user_id,))
+        
+        logger.info(f"Deferred metadata enrichment complete: {results}")
+        return results
+    
+    async def prefetch_user_metadata(self, user_ids: Iterable[str]) -> dict:
+        """
+        Warm the metadata cache for many users concurrently.
+        
+        Lookups run under a fixed number of workers and share the
+        community API token bucket, so batch callers overlap API latency
+        without exceeding the configured request rate.
+        
+        Returns counts of users requested, fetched, not_found (no such
+        user upstream) and failed.
+        """
+        pending = [
+            user_id for user_id in dict.fromkeys(user_ids)
+            if not self.metadata_cache.contains(user_id)
+        ]
+        
+        results = {
+            "requested": len(pending),
+            "fetched": 0,
+            "not_found": 0,
+            "failed": 0
+        }
+        
+        if not pending or not self.settings.community_api_url:
+            return results
+        
+        queue = iter(pending)
+        
+        async def worker():
+            for user_id in queue:
+                try:
+                    metadata = await self.metadata_cache.get(user_id)
+                    # None: the user does not exist upstream (negatively cached)
+                    results["fetched" if metadata is not None else "not_found"] += 1
+                except Exception as e:
+                    results["failed"] += 1
+                    logger.warning(f"Prefetch failed for user {user_id}: {e}")
+        
+        workers = min(self.settings.metadata_prefetch_concurrency, len(pending))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        
+        logger.info(f"Metadata prefetch complete: {results}")
+        return results
     
     def store_raw_event(
         self,
         event: WebhookEvent,
-        idempotency_key: str
+        idempotency_key: str,
+        lease_seconds: float = 0.0
     ) -> Optional[int]:
         """
         Store raw event in events_raw table.
         
+        With lease_seconds, the row is stored not due until then
+        (next_attempt_at), so the drainer and process_pending_events()
+        skip it while the caller processes it inline.
+        
         Returns event ID if inserted, None if duplicate.
         """
         with self.db.get_cursor() as cur:
@@ -82,8 +302,12 @@ class EventProcessor:
                 cur.execute("""
                     INSERT INTO events_raw (
                         event_id, user_id, username, profile_field,
-                        value, old_value, idempotency_key, processed
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, FALSE)
+                        value, old_value, idempotency_key, processed,
+                        next_attempt_at
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, FALSE,
+                        NOW() + make_interval(secs => %s)
+                    )
                     ON CONFLICT (idempotency_key) DO NOTHING
                     RETURNING id
                 """, (
@@ -93,7 +317,8 @@ class EventProcessor:
                     event.profileField,
                     event.value,
                     event.oldValue,
-                    idempotency_key
+                    idempotency_key,
+                    max(0.0, lease_seconds)
                 ))
                 
                 result = cur.fetchone()
@@ -108,6 +333,40 @@ class EventProcessor:
                 logger.error(f"Error storing raw event: {e}")
                 raise
     
+    def record_event_failure(self, event_id: int, error: Exception, cur=None) -> str:
+        """
+        Record a failed processing attempt for an events_raw row.
+        
+        The row is rescheduled with exponential backoff, or moved to
+        events_dead_letter once it has failed max_retries times (see
+        migrations/005_event_retries.sql). Pass cur to run inside the
+        caller's transaction, e.g. while holding the row lock.
+        
+        Returns 'retry', 'dead_letter' or 'missing'.
+        """
+        params = (
+            event_id,
+            f"{type(error).__name__}: {error}",
+            self.settings.max_retries,
+            self.settings.retry_base_delay_seconds,
+            self.settings.retry_max_delay_seconds
+        )
+        query = "SELECT record_event_failure(%s, %s, %s, %s, %s) AS outcome"
+        
+        if cur is not None:
+            cur.execute(query, params)
+            outcome = cur.fetchone()['outcome']
+        else:
+            with self.db.get_cursor() as own_cur:
+                own_cur.execute(query, params)
+                outcome = own_cur.fetchone()['outcome']
+        
+        if outcome == "dead_letter":
+            logger.warning(f"Event {event_id} moved to dead letter: {error}")
+        else:
+            logger.info(f"Event {event_id} scheduled for retry ({outcome})")
+        return outcome
+    
     def process_classification(
         self,
         user_id: str,
@@ -115,15 +374,23 @@ class EventProcessor:
         title: str,
         country: Optional[str],
         company: Optional[str],
-        joined_at: Optional[datetime]
+        joined_at: Optional[datetime],
+        classification: Optional[Tuple[bool, str]] = None
     ) -> Tuple[bool, str]:
         """
         Process title classification and update user state.
         
+        Pass a precomputed classification to skip classifying again.
+        
+        For senior titles the seniority mirror, when warm, picks insert vs
+        update without reading user_state. Those writes are guarded, and a
+        guard miss (stale mirror) falls back to the SELECT path within the
+        same transaction.
+        
         Returns: (is_senior, seniority_level)
         """
         # Classify the title
-        is_senior, seniority_level = classify_title(title)
+        is_senior, seniority_level = classification or classify_title(title)
         
         with self.db.transaction() as cur:
             if not is_senior:
@@ -135,10 +402,49 @@ class EventProcessor:
                 deleted = cur.rowcount
                 if deleted > 0:
                     logger.info(f"Removed non-senior user {user_id} from user_state")
-                
-                return (False, "")
-            
-            # User IS senior - check if they exist in user_state
+            else:
+                self._write_senior_state(
+                    cur, user_id, username, title, seniority_level,
+                    country, company, joined_at
+                )
+        
+        # Committed - keep this worker's mirror current without waiting for NOTIFY
+        if is_senior:
+            self.seniority_mirror.set(user_id, seniority_level)
+            return (True, seniority_level)
+        self.seniority_mirror.discard(user_id)
+        return (False, "")
+    
+    def _write_senior_state(
+        self,
+        cur,
+        user_id: str,
+        username: str,
+        title: str,
+        seniority_level: str,
+        country: Optional[str],
+        company: Optional[str],
+        joined_at: Optional[datetime]
+    ):
+        """Insert or update a senior user and record any new detection."""
+        known, mirrored_level = self.seniority_mirror.lookup(user_id)
+        written = False
+        
+        if known:
+            if mirrored_level is None:
+                written = self._insert_user_state(
+                    cur, user_id, username, title, seniority_level,
+                    country, company, joined_at, skip_existing=True
+                )
+            else:
+                written = self._update_user_state(
+                    cur, user_id, username, title, seniority_level,
+                    country, company, expected_level=mirrored_level
+                )
+            old_level = mirrored_level
+        
+        if not written:
+            # Mirror unavailable or stale - read the row
             cur.execute("""
                 SELECT user_id, seniority_level, first_detected_at
                 FROM user_state
@@ -146,89 +452,149 @@ class EventProcessor:
             """, (user_id,))
             
             existing = cur.fetchone()
+            old_level = existing['seniority_level'] if existing else None
+            if known:
+                self.seniority_mirror.mark_stale(user_id, old_level)
             
             if not existing:
-                # First time detection - insert into user_state and detections
-                cur.execute("""
-                    INSERT INTO user_state (
-                        user_id, username, title, seniority_level,
-                        country, company, joined_at,
-                        first_detected_at, last_seen_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-                """, (
-                    user_id, username, title, seniority_level,
+                self._insert_user_state(
+                    cur, user_id, username, title, seniority_level,
                     country, company, joined_at
-                ))
-                
-                # Insert detection record
-                cur.execute("""
-                    INSERT INTO detections (
-                        user_id, username, title, seniority_level,
-                        country, company, joined_at, detected_at, rules_version
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), %s)
-                """, (
-                    user_id, username, title, seniority_level,
-                    country, company, joined_at,
-                    self.classifier.version
-                ))
-                
-                logger.info(
-                    f"First detection: User {user_id} classified as {seniority_level}"
                 )
             else:
-                # Existing senior user - update state
-                old_level = existing['seniority_level']
-                
-                cur.execute("""
-                    UPDATE user_state
-                    SET username = %s,
-                        title = %s,
-                        seniority_level = %s,
-                        country = %s,
-                        company = %s,
-                        last_seen_at = NOW()
-                    WHERE user_id = %s
-                """, (
-                    username, title, seniority_level,
-                    country, company, user_id
-                ))
-                
-                # Check if this is a "promotion" from VP to C-suite
-                if old_level == 'vp' and seniority_level == 'csuite':
-                    # Insert promotion detection
-                    cur.execute("""
-                        INSERT INTO detections (
-                            user_id, username, title, seniority_level,
-                            country, company, joined_at, detected_at, rules_version
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), %s)
-                    """, (
-                        user_id, username, title, seniority_level,
-                        country, company, joined_at,
-                        self.classifier.version
-                    ))
-                    logger.info(
-                        f"Promotion detected: User {user_id} from {old_level} to {seniority_level}"
-                    )
-                else:
-                    logger.info(
-                        f"Updated existing senior user {user_id} with level {seniority_level}"
-                    )
+                self._update_user_state(
+                    cur, user_id, username, title, seniority_level,
+                    country, company
+                )
         
-        return (is_senior, seniority_level)
+        if old_level is None:
+            # First time detection
+            self._insert_detection(
+                cur, user_id, username, title, seniority_level,
+                country, company, joined_at
+            )
+            logger.info(
+                f"First detection: User {user_id} classified as {seniority_level}"
+            )
+        elif old_level == 'vp' and seniority_level == 'csuite':
+            # "Promotion" from VP to C-suite
+            self._insert_detection(
+                cur, user_id, username, title, seniority_level,
+                country, company, joined_at
+            )
+            logger.info(
+                f"Promotion detected: User {user_id} from {old_level} to {seniority_level}"
+            )
+        else:
+            logger.info(
+                f"Updated existing senior user {user_id} with level {seniority_level}"
+            )
     
-    async def process_event(self, event: WebhookEvent) -> dict:
+    def _insert_user_state(
+        self,
+        cur,
+        user_id: str,
+        username: str,
+        title: str,
+        seniority_level: str,
+        country: Optional[str],
+        company: Optional[str],
+        joined_at: Optional[datetime],
+        skip_existing: bool = False
+    ) -> bool:
+        """Insert a user_state row. With skip_existing, returns False if present."""
+        cur.execute("""
+            INSERT INTO user_state (
+                user_id, username, title, seniority_level,
+                country, company, joined_at,
+                first_detected_at, last_seen_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+        """ + ("ON CONFLICT (user_id) DO NOTHING" if skip_existing else ""), (
+            user_id, username, title, seniority_level,
+            country, company, joined_at
+        ))
+        return cur.rowcount > 0
+    
+    def _update_user_state(
+        self,
+        cur,
+        user_id: str,
+        username: str,
+        title: str,
+        seniority_level: str,
+        country: Optional[str],
+        company: Optional[str],
+        expected_level: Optional[str] = None
+    ) -> bool:
+        """
+        Update an existing user_state row.
+        
+        With expected_level, only updates if the stored level still
+        matches; returns False when no row was updated.
+        """
+        guard = "AND seniority_level = %s" if expected_level else ""
+        params = [username, title, seniority_level, country, company, user_id]
+        if expected_level:
+            params.append(expected_level)
+        
+        cur.execute(f"""
+            UPDATE user_state
+            SET username = %s,
+                title = %s,
+                seniority_level = %s,
+                country = %s,
+                company = %s,
+                last_seen_at = NOW()
+            WHERE user_id = %s {guard}
+        """, params)
+        return cur.rowcount > 0
+    
+    def _insert_detection(
+        self,
+        cur,
+        user_id: str,
+        username: str,
+        title: str,
+        seniority_level: str,
+        country: Optional[str],
+        company: Optional[str],
+        joined_at: Optional[datetime]
+    ):
+        """Insert a detection record."""
+        cur.execute("""
+            INSERT INTO detections (
+                user_id, username, title, seniority_level,
+                country, company, joined_at, detected_at, rules_version
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), %s)
+        """, (
+            user_id, username, title, seniority_level,
+            country, company, joined_at,
+            self.classifier.version
+        ))
+    
+    async def process_event(
+        self,
+        event: WebhookEvent,
+        timer: Optional[StageTimer] = None
+    ) -> dict:
         """
         Process a webhook event end-to-end.
         
+        An optional StageTimer records per-stage latency (hash, store,
+        metadata, classify, write).
+        
         Returns processing result summary.
         """
+        timer = timer or NULL_TIMER
+        
         # Generate idempotency key
-        idempotency_key = generate_idempotency_key(
-            None,  # event_id if available
-            event.userId,
-            event.profileField,
-            event.value
-        )
+        with timer.stage("hash"):
+            idempotency_key = generate_idempotency_key(
+                None,  # event_id if available
+                event.userId,
+                event.profileField,
+                event.value
+            )
         
         # Check if this is a Job Title update
         is_job_title = event.profileField.lower() == "job title"
@@ -246,46 +612,120 @@ class EventProcessor:
                 "user_id": event.userId
             }
         
-        # Store raw event
-        event_id = self.store_raw_event(event, idempotency_key)
+        # Store raw event, leased to this call: the insert NOTIFY wakes the
+        # drainer, which must not claim the row while we classify it here
+        with timer.stage("store"):
+            event_id = self.store_raw_event(
+                event, idempotency_key, self.settings.inline_processing_lease_seconds
+            )
         if event_id is None:
             return {
                 "status": "duplicate",
                 "user_id": event.userId
             }
         
+        try:
+            result = await self.process_stored_event(event, timer)
+        except Exception as e:
+            # Leave the event to the retry queue rather than rescanning it forever
+            try:
+                self.record_event_failure(event_id, e)
+            except Exception as record_error:
+                logger.error(f"Could not record failure for event {event_id}: {record_error}")
+            raise
+        
+        # Mark event as processed (write-behind, batched)
+        with timer.stage("mark_processed"):
+            self.processed_batcher.add(event_id)
+        
+        result["event_id"] = event_id
+        return result
+    
+    async def process_stored_event(
+        self,
+        event: WebhookEvent,
+        timer: Optional[StageTimer] = None
+    ) -> dict:
+        """
+        Enrich and classify a Job Title event that is already in events_raw.
+        
+        Does not touch events_raw - callers own storing the event and
+        marking it processed.
+        """
+        timer = timer or NULL_TIMER
+        
         # Fetch user metadata (if not already in webhook)
+        metadata_deferred = False
         if not event.country or not event.company or not event.joined_at:
-            metadata = await self.fetch_user_metadata(event.userId)
-            event.country = event.country or metadata.country
-            event.company = event.company or metadata.company
-            event.joined_at = event.joined_at or metadata.joined_at
+            with timer.stage("metadata"):
+                metadata, metadata_deferred = await self._resolve_user_metadata(event.userId)
+            if metadata:
+                event.country = event.country or metadata.country
+                event.company = event.company or metadata.company
+                event.joined_at = event.joined_at or metadata.joined_at
         
-        # Process classification and update state
-        is_senior, seniority_level = self.process_classification(
-            user_id=event.userId,
-            username=event.username,
-            title=event.value,
-            country=event.country,
-            company=event.company,
-            joined_at=event.joined_at
-        )
+        with timer.stage("classify"):
+            classification = classify_title(event.value)
         
-        # Mark event as processed
-        with self.db.get_cursor() as cur:
-            cur.execute("""
-                UPDATE events_raw
-                SET processed = TRUE, processed_at = NOW()
-                WHERE id = %s
-            """, (event_id,))
+        # Process classification and update state
+        with timer.stage("write"):
+            is_senior, seniority_level = self.process_classification(
+                user_id=event.userId,
+                username=event.username,
+                title=event.value,
+                country=event.country,
+                company=event.company,
+                joined_at=event.joined_at,
+                classification=classification
+            )
+            
+            # Only senior users are persisted, so only they need enrichment
+            if is_senior and metadata_deferred:
+                self.defer_metadata(event.userId)
         
         return {
             "status": "processed",
             "user_id": event.userId,
             "is_senior": is_senior,
             "seniority_level": seniority_level,
-            "event_id": event_id
+            "metadata_deferred": metadata_deferred
         }
+    
+    async def process_event_batch(
+        self,
+        events: List[WebhookEvent],
+        timer: Optional[StageTimer] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[dict, Exception]]:
+        """
+        Process many webhook events, prefetching metadata up front.
+        
+        All metadata lookups are issued concurrently before the first
+        classification write, so per-event processing hits the cache.
+        
+        Events are stored as they are processed, so an event that raises
+        stops the batch with the earlier ones already done. With
+        return_exceptions, its exception takes its place in the results
+        and the rest of the batch is still processed (as in
+        asyncio.gather).
+        """
+        missing = [
+            event.userId for event in events
+            if event.profileField.lower() == "job title"
+            and (not event.country or not event.company or not event.joined_at)
+        ]
+        with (timer or NULL_TIMER).stage("prefetch"):
+            await self.prefetch_user_metadata(missing)
+        
+        results = []
+        for event in events:
+            try:
+                results.append(await self.process_event(event, timer))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
 
 
 # Singleton instance
@@ -0,0 +1,152 @@
+"""
+User Metadata Cache
+===================
+Async TTL cache for community user metadata (country, company, joined_at).
+
+- Positive entries expire after a TTL.
+- Users the community API reports as missing (404) are negatively cached
+  for a shorter TTL so they are not re-fetched on every event.
+- Concurrent lookups for the same user collapse into a single upstream
+  call (single-flight).
+- Upstream failures are never cached and never fabricate metadata.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from ..models import UserMetadata
+
+logger = logging.getLogger(__name__)
+
+# Loader contract: return metadata, return None if the user does not exist
+# upstream (cached negatively), or raise on any other failure (not cached).
+MetadataLoader = Callable[[str], Awaitable[Optional[UserMetadata]]]
+
+
+class UserMetadataCache:
+    """TTL + negative cache with single-flight loading."""
+
+    def __init__(
+        self,
+        loader: MetadataLoader,
+        ttl_seconds: float = 3600.0,
+        negative_ttl_seconds: float = 300.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize cache around an async loader."""
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+
+        # user_id -> (expires_at, metadata or None for negative entries)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[UserMetadata]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.load_errors = 0
+        self.evictions = 0
+
+    def _lookup(self, user_id: str) -> Tuple[bool, Optional[UserMetadata]]:
+        """Return (found, value) for a live entry, dropping expired ones."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return (False, None)
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[user_id]
+            return (False, None)
+
+        self._entries.move_to_end(user_id)
+        return (True, value)
+
+    def _store(self, user_id: str, value: Optional[UserMetadata]):
+        """Store a positive or negative entry, evicting the oldest if full."""
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+
+        self._entries[user_id] = (self._clock() + ttl, value)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, user_id: str) -> bool:
+        """Check whether a live (positive or negative) entry exists."""
+        found, _ = self._lookup(user_id)
+        return found
+
+    def invalidate(self, user_id: str):
+        """Drop any cached entry for a user."""
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop all cached entries."""
+        self._entries.clear()
+
+    async def _load(self, user_id: str) -> Optional[UserMetadata]:
+        """Call the loader and cache the outcome."""
+        try:
+            value = await self.loader(user_id)
+        except Exception:
+            self.load_errors += 1
+            raise
+
+        self._store(user_id, value)
+        return value
+
+    async def get(self, user_id: str) -> Optional[UserMetadata]:
+        """
+        Get metadata for a user.
+
+        Returns cached metadata, None if the user is known to be missing,
+        or raises if the upstream lookup fails.
+        """
+        found, value = self._lookup(user_id)
+        if found:
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+        inflight = self._inflight.get(user_id)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._load(user_id))
+        self._inflight[user_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+
+        # Shield so a cancelled caller does not cancel the shared load
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Return cache metrics."""
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "hit_rate": round(
+                (self.hits + self.negative_hits + self.coalesced) / lookups, 4
+            ) if lookups else 0.0
+        }
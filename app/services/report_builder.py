@@ -2,20 +2,188 @@
 Report Builder Service
 ======================
 Generates month-end reports with CSV and HTML output.
+
+Report rows are streamed from a named (server-side) cursor in chunks of
+REPORT_FETCH_SIZE and written straight to the output files: each row is
+written to the CSV (optionally gzip-compressed) as the HTML template
+consumes it, so both files come from one pass over the query and memory
+stays flat regardless of the month's size.
+
+process_pending_reports fans months out across a process pool
+(REPORT_WORKERS), one month per task; each worker process has its own
+ReportBuilder and database connections.
+
+Generated files are content-addressed: each month's artifacts live in
+reports/<month>/<fingerprint>/, where the fingerprint covers the month's
+row count, max user_state.last_seen_at and updated_at (bumped by
+metadata enrichment, migrations/012), max detection id, rules_version,
+summary, CSV compression and the report template. If a complete artifact
+with the same fingerprint exists, the month is not regenerated and only
+reports.file_uri is updated (force=True regenerates anyway).
+
+Months are selected with half-open timestamp ranges computed in
+America/New_York (month_range), so the filters can use
+idx_user_state_report_month instead of scanning user_state.
 """
 
+import gzip
+import hashlib
+import json
 import logging
 import csv
 import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from itertools import chain
+from zoneinfo import ZoneInfo
+from typing import IO, Iterable, Iterator, List, Dict, Any, Optional
 from pathlib import Path
 
 from ..database import get_db
 from ..config import get_settings
+from ..utils.metrics import summarize_latencies
+from ..utils.rendering import TEMPLATE_DIR, get_renderer
 
 logger = logging.getLogger(__name__)
 
+REPORTS_DIR = Path("reports")
+
+# Report months are calendar months in the database's timezone
+REPORT_TIMEZONE = ZoneInfo("America/New_York")
+
+CSV_FIELDNAMES = [
+    'User ID', 'Username', 'Title', 'Seniority Level',
+    'Country', 'Company', 'Joined At', 'First Detected At'
+]
+
+MANIFEST_NAME = "manifest.json"
+
+REPORT_MONTH_FILTER = """
+    WHERE us.first_detected_at >= %(month_start)s
+      AND us.first_detected_at < %(month_end)s
+      AND us.joined_at >= %(month_start)s
+      AND us.joined_at < %(month_end)s
+"""
+
+REPORT_DATA_QUERY = f"""
+    SELECT 
+        us.user_id,
+        us.username,
+        us.title,
+        us.seniority_level,
+        us.country,
+        us.company,
+        us.joined_at,
+        us.first_detected_at
+    FROM user_state us
+    {REPORT_MONTH_FILTER}
+    ORDER BY us.first_detected_at DESC
+"""
+
+# Cheap change detection for a month: same index ranges as the report
+# query, plus the newest detection in the month (idx_detections_detected_at)
+REPORT_FINGERPRINT_QUERY = f"""
+    SELECT
+        COUNT(*) AS row_count,
+        MAX(us.last_seen_at) AS max_last_seen_at,
+        MAX(us.updated_at) AS max_updated_at,
+        (
+            SELECT MAX(d.id)
+            FROM detections d
+            WHERE d.detected_at >= %(month_start)s
+              AND d.detected_at < %(month_end)s
+        ) AS max_detection_id
+    FROM user_state us
+    {REPORT_MONTH_FILTER}
+"""
+
+
+def month_range(month_label: str) -> tuple:
+    """
+    Half-open [start, end) bounds of a "YYYY-MM" month in REPORT_TIMEZONE.
+    
+    Comparing the raw columns against these bounds is equivalent to
+    EXTRACT(YEAR/MONTH ...) in the New York session timezone (DST
+    included) but lets the planner use an index.
+    """
+    year, month = (int(part) for part in month_label.split('-'))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month label: {month_label!r}")
+    start = datetime(year, month, 1, tzinfo=REPORT_TIMEZONE)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=REPORT_TIMEZONE)
+    return start, end
+
+
+def csv_row(row: dict) -> list:
+    """Format one report row in CSV_FIELDNAMES order."""
+    return [
+        row['user_id'],
+        row['username'],
+        row['title'],
+        row['seniority_level'].upper(),
+        row['country'] or 'N/A',
+        row['company'] or 'N/A',
+        row['joined_at'].strftime('%Y-%m-%d') if row['joined_at'] else 'N/A',
+        row['first_detected_at'].strftime('%Y-%m-%d %H:%M:%S')
+    ]
+
+
+@lru_cache(maxsize=1)
+def _template_digest() -> str:
+    return hashlib.sha256((TEMPLATE_DIR / "report.html").read_bytes()).hexdigest()
+
+
+def report_fingerprint(
+    month_label: str,
+    rules_version: Optional[str],
+    summary: Dict[str, Any],
+    state: Dict[str, Any],
+    compress_csv: bool
+) -> str:
+    """
+    Content address of a month's report artifacts.
+    
+    state is the REPORT_FINGERPRINT_QUERY row. The summary and template
+    are included because they are rendered into the HTML.
+    """
+    key = {
+        "month": month_label,
+        "rules_version": rules_version,
+        "row_count": state['row_count'],
+        "max_last_seen_at": state['max_last_seen_at'],
+        "max_updated_at": state['max_updated_at'],
+        "max_detection_id": state['max_detection_id'],
+        "summary": summary,
+        "compress_csv": compress_csv,
+        "template": _template_digest()
+    }
+    encoded = json.dumps(key, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def stream_csv(rows: Iterable[dict], output: IO[str]) -> Iterator[dict]:
+    """
+    Write rows to output as CSV while passing them through.
+    
+    The header goes out with the first row; an empty report gets a
+    placeholder line instead.
+    """
+    writer = csv.writer(output)
+    empty = True
+    for row in rows:
+        if empty:
+            writer.writerow(CSV_FIELDNAMES)
+            empty = False
+        writer.writerow(csv_row(row))
+        yield row
+    
+    if empty:
+        writer.writerow(['No data for this month'])
+
 
 class ReportBuilder:
     """Builds month-end reports for senior executive detections."""
@@ -24,12 +192,21 @@ class ReportBuilder:
         """Initialize report builder."""
         self.db = get_db()
         self.settings = get_settings()
+        self.cache_counters = {"hits": 0, "misses": 0, "forced": 0}
+    
+    def stats(self) -> dict:
+        """Report artifact cache counters for this process's runs."""
+        lookups = self.cache_counters["hits"] + self.cache_counters["misses"]
+        return {
+            **self.cache_counters,
+            "hit_rate": round(self.cache_counters["hits"] / lookups, 3) if lookups else 0.0
+        }
     
     def get_pending_reports(self) -> List[dict]:
         """
         Get reports that need file generation.
         
-        Returns reports where file_uri is NULL.
+        Returns reports where file_uri is NULL (at most REPORT_PENDING_LIMIT).
         """
         with self.db.get_cursor() as cur:
             cur.execute("""
@@ -37,44 +214,48 @@ class ReportBuilder:
                 FROM reports
                 WHERE file_uri IS NULL
                 ORDER BY generated_at DESC
-                LIMIT 10
-            """)
+                LIMIT %s
+            """, (max(1, self.settings.report_pending_limit),))
             reports = cur.fetchall()
             logger.info(f"Found {len(reports)} pending reports")
             return reports
     
+    def _report_params(self, month_label: str) -> dict:
+        # Parse month label (e.g., "2025-11")
+        month_start, month_end = month_range(month_label)
+        return {"month_start": month_start, "month_end": month_end}
+    
     def get_report_data(self, month_label: str) -> List[dict]:
         """
         Get detection data for a specific month.
         
         Returns list of users who were detected in that month and joined in that month.
+        Loads the whole month; generate_report streams via iter_report_data.
         """
-        # Parse month label (e.g., "2025-11")
-        year, month = month_label.split('-')
-        
         with self.db.get_cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    us.user_id,
-                    us.username,
-                    us.title,
-                    us.seniority_level,
-                    us.country,
-                    us.company,
-                    us.joined_at,
-                    us.first_detected_at
-                FROM user_state us
-                WHERE EXTRACT(YEAR FROM us.joined_at) = %s
-                  AND EXTRACT(MONTH FROM us.joined_at) = %s
-                  AND EXTRACT(YEAR FROM us.first_detected_at) = %s
-                  AND EXTRACT(MONTH FROM us.first_detected_at) = %s
-                ORDER BY us.first_detected_at DESC
-            """, (year, month, year, month))
+            cur.execute(REPORT_DATA_QUERY, self._report_params(month_label))
             
             data = cur.fetchall()
             logger.info(f"Retrieved {len(data)} records for month {month_label}")
             return data
     
+    def iter_report_data(self, month_label: str) -> Iterator[dict]:
+        """
+        Stream a month's report rows from a server-side cursor.
+        
+        Rows are fetched REPORT_FETCH_SIZE at a time; the connection is
+        held until the iterator is exhausted or closed.
+        """
+        conn = self.db.get_connection()
+        try:
+            with conn.cursor(name=f"report_{month_label.replace('-', '_')}") as cur:
+                cur.itersize = max(1, self.settings.report_fetch_size)
+                cur.execute(REPORT_DATA_QUERY, self._report_params(month_label))
+                yield from cur
+            conn.commit()
+        finally:
+            conn.close()
+    
     def generate_csv(self, data: List[dict], month_label: str) -> str:
         """
         Generate CSV report.
@@ -82,198 +263,138 @@ class ReportBuilder:
         Returns CSV content as string.
         """
         output = io.StringIO()
-        
-        if not data:
-            # Empty report
-            writer = csv.writer(output)
-            writer.writerow(['No data for this month'])
-            return output.getvalue()
-        
-        # Define columns
-        fieldnames = [
-            'User ID', 'Username', 'Title', 'Seniority Level',
-            'Country', 'Company', 'Joined At', 'First Detected At'
-        ]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for row in data:
-            writer.writerow({
-                'User ID': row['user_id'],
-                'Username': row['username'],
-                'Title': row['title'],
-                'Seniority Level': row['seniority_level'].upper(),
-                'Country': row['country'] or 'N/A',
-                'Company': row['company'] or 'N/A',
-                'Joined At': row['joined_at'].strftime('%Y-%m-%d') if row['joined_at'] else 'N/A',
-                'First Detected At': row['first_detected_at'].strftime('%Y-%m-%d %H:%M:%S')
-            })
-        
+        self.write_csv(data, output)
         return output.getvalue()
     
+    def write_csv(self, rows: Iterable[dict], output: IO[str]) -> int:
+        """
+        Write report rows as CSV to a text stream, one row at a time.
+        
+        Returns the number of data rows written.
+        """
+        return sum(1 for _ in stream_csv(rows, output))
+    
     def generate_html(self, data: List[dict], month_label: str, summary: Dict[str, Any]) -> str:
         """
         Generate HTML report.
         
-        Returns HTML content as string.
+        Returns HTML content as string (user fields are HTML-escaped).
         """
-        # Build summary stats
-        total = summary.get('total_detections', 0)
-        csuite = summary.get('csuite_count', 0)
-        vp = summary.get('vp_count', 0)
-        countries = summary.get('countries', {})
-        
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Senior Executive Report - {month_label}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 40px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background-color: white;
-            padding: 30px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            border-bottom: 3px solid #007bff;
-            padding-bottom: 10px;
-        }}
-        .summary {{
-            background-color: #e7f3ff;
-            padding: 20px;
-            border-radius: 5px;
-            margin: 20px 0;
-        }}
-        .summary h2 {{
-            margin-top: 0;
-            color: #0056b3;
-        }}
-        .stat {{
-            display: inline-block;
-            margin-right: 30px;
-            font-size: 1.1em;
-        }}
-        .stat strong {{
-            color: #007bff;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }}
-        th {{
-            background-color: #007bff;
-            color: white;
-            padding: 12px;
-            text-align: left;
-        }}
-        td {{
-            padding: 10px;
-            border-bottom: 1px solid #ddd;
-        }}
-        tr:hover {{
-            background-color: #f8f9fa;
-        }}
-        .badge {{
-            display: inline-block;
-            padding: 4px 8px;
-            border-radius: 3px;
-            font-size: 0.85em;
-            font-weight: bold;
-        }}
-        .badge-csuite {{
-            background-color: #28a745;
-            color: white;
-        }}
-        .badge-vp {{
-            background-color: #17a2b8;
-            color: white;
-        }}
-        .footer {{
-            margin-top: 30px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            color: #666;
-            font-size: 0.9em;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Senior Executive Detection Report</h1>
-        <p><strong>Month:</strong> {month_label}</p>
-        <p><strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S EST')}</p>
-        
-        <div class="summary">
-            <h2>Summary</h2>
-            <div class="stat">
-                <strong>Total Detections:</strong> {total}
-            </div>
-            <div class="stat">
-                <strong>C-Suite:</strong> {csuite}
-            </div>
-            <div class="stat">
-                <strong>VP Level:</strong> {vp}
-            </div>
-        </div>
+        return get_renderer().render("report.html", **self._html_context(data, bool(data), month_label, summary))
+    
+    def _html_context(
+        self,
+        rows: Iterable[dict],
+        has_rows: bool,
+        month_label: str,
+        summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Template context for report.html (rows may be a one-shot iterator)."""
+        return {
+            "rows": rows,
+            "has_rows": has_rows,
+            "month_label": month_label,
+            "generated_at": datetime.now(),
+            "total": summary.get('total_detections', 0),
+            "csuite": summary.get('csuite_count', 0),
+            "vp": summary.get('vp_count', 0)
+        }
+    
+    def _open_csv(self, path: Path) -> IO[str]:
+        """Open a CSV report for writing, gzip-compressed for .gz paths."""
+        if path.suffix == ".gz":
+            return gzip.open(path, "wt", encoding="utf-8", newline="")
+        return open(path, "w", encoding="utf-8", newline="")
+    
+    def write_report_files(
+        self,
+        rows: Iterable[dict],
+        month_label: str,
+        summary: Dict[str, Any],
+        directory: Optional[Path] = None
+    ) -> dict:
+        """
+        Write the CSV and HTML reports from one pass over rows.
         
-        <h2>Detections</h2>
-"""
+        The HTML template pulls rows one at a time and each is written to
+        the CSV on the way through, so nothing is buffered beyond the
+        current row. The CSV is gzip-compressed if REPORT_COMPRESS_CSV.
+        Files go to directory (default REPORTS_DIR).
         
-        if not data:
-            html += "<p><em>No senior executives detected this month.</em></p>"
-        else:
-            html += """
-        <table>
-            <thead>
-                <tr>
-                    <th>Username</th>
-                    <th>Title</th>
-                    <th>Level</th>
-                    <th>Country</th>
-                    <th>Company</th>
-                    <th>Joined</th>
-                    <th>Detected</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-            for row in data:
-                level_class = f"badge-{row['seniority_level']}"
-                html += f"""
-                <tr>
-                    <td>{row['username']}</td>
-                    <td>{row['title']}</td>
-                    <td><span class="badge {level_class}">{row['seniority_level'].upper()}</span></td>
-                    <td>{row['country'] or 'N/A'}</td>
-                    <td>{row['company'] or 'N/A'}</td>
-                    <td>{row['joined_at'].strftime('%Y-%m-%d') if row['joined_at'] else 'N/A'}</td>
-                    <td>{row['first_detected_at'].strftime('%Y-%m-%d')}</td>
-                </tr>
-"""
-            html += """
-            </tbody>
-        </table>
-"""
+        Returns file paths and the row count.
+        """
+        directory = directory or REPORTS_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        csv_path = directory / f"report_{month_label}.csv"
+        if self.settings.report_compress_csv:
+            csv_path = csv_path.with_suffix(".csv.gz")
+        html_path = directory / f"report_{month_label}.html"
+        
+        rows = iter(rows)
+        first = next(rows, None)
+        rows = chain([first], rows) if first is not None else iter(())
+        count = 0
+        
+        with self._open_csv(csv_path) as csv_file:
+            def counted():
+                nonlocal count
+                for row in stream_csv(rows, csv_file):
+                    count += 1
+                    yield row
+            
+            streamed = counted()
+            get_renderer().render_to_file(
+                "report.html",
+                html_path,
+                **self._html_context(streamed, first is not None, month_label, summary)
+            )
+            # An empty report never iterates rows; drain so the CSV gets its placeholder
+            for _ in streamed:
+                pass
+        
+        logger.info(f"Saved report to {csv_path} and {html_path} ({count} rows)")
+        return {
+            "csv_uri": str(csv_path),
+            "html_uri": str(html_path),
+            "record_count": count
+        }
+    
+    def fingerprint(self, month_label: str, rules_version: Optional[str], summary: Dict[str, Any]) -> str:
+        """Compute the month's artifact fingerprint (one aggregate query)."""
+        with self.db.get_cursor() as cur:
+            cur.execute(REPORT_FINGERPRINT_QUERY, self._report_params(month_label))
+            state = cur.fetchone()
+        return report_fingerprint(
+            month_label, rules_version, summary, state, self.settings.report_compress_csv
+        )
+    
+    def artifact_dir(self, month_label: str, fingerprint: str) -> Path:
+        """Content-addressed directory for a month's artifacts."""
+        return REPORTS_DIR / month_label / fingerprint[:16]
+    
+    def load_artifact(self, directory: Path, fingerprint: str) -> Optional[dict]:
+        """
+        Return a complete cached artifact's manifest, or None.
         
-        html += """
-        <div class="footer">
-            <p>This report is generated automatically by CaptPathfinder.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return html
+        The manifest is written last, so its presence (with matching
+        fingerprint and files) means the artifact is complete.
+        """
+        try:
+            manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("fingerprint") != fingerprint:
+            return None
+        if not all(Path(manifest[key]).is_file() for key in ("csv_uri", "html_uri")):
+            return None
+        return manifest
+    
+    def save_artifact_manifest(self, directory: Path, fingerprint: str, files: dict):
+        """Atomically mark an artifact directory complete."""
+        manifest = dict(files, fingerprint=fingerprint, created_at=datetime.now().isoformat())
+        tmp_path = directory / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, directory / MANIFEST_NAME)
     
     def save_to_local(self, content: str, filename: str) -> str:
         """
@@ -282,10 +403,9 @@ class ReportBuilder:
         In production, you would upload to Supabase Storage instead.
         Returns file path/URI.
         """
-        reports_dir = Path("reports")
-        reports_dir.mkdir(exist_ok=True)
+        REPORTS_DIR.mkdir(exist_ok=True)
         
-        filepath = reports_dir / filename
+        filepath = REPORTS_DIR / filename
         filepath.write_text(content, encoding='utf-8')
         
         logger.info(f"Saved report to {filepath}")
@@ -317,26 +437,42 @@ class ReportBuilder:
         logger.warning("Supabase Storage upload not implemented, using local storage")
         return self.save_to_local(content, filename)
     
-    def generate_report(self, report_id: int, month_label: str, summary: Dict[str, Any]) -> dict:
+    def generate_report(
+        self,
+        report_id: int,
+        month_label: str,
+        summary: Dict[str, Any],
+        report_ids: Optional[List[int]] = None,
+        rules_version: Optional[str] = None,
+        force: bool = False
+    ) -> dict:
         """
         Generate complete report (CSV + HTML).
         
-        Returns summary with file URIs.
+        Reuses the cached artifact when the month's fingerprint is
+        unchanged, unless force. The file URIs are recorded on report_id,
+        or on every id in report_ids if given. Returns summary with file
+        URIs and whether the cache was hit.
         """
-        logger.info(f"Generating report for month {month_label}")
-        
-        # Get data
-        data = self.get_report_data(month_label)
-        
-        # Generate CSV
-        csv_content = self.generate_csv(data, month_label)
-        csv_filename = f"report_{month_label}.csv"
-        csv_uri = self.save_to_local(csv_content, csv_filename)
+        fingerprint = self.fingerprint(month_label, rules_version, summary)
+        directory = self.artifact_dir(month_label, fingerprint)
+        files = None if force else self.load_artifact(directory, fingerprint)
+        cache_hit = files is not None
         
-        # Generate HTML
-        html_content = self.generate_html(data, month_label, summary)
-        html_filename = f"report_{month_label}.html"
-        html_uri = self.save_to_local(html_content, html_filename)
+        if cache_hit:
+            logger.info(f"Reusing cached report for month {month_label} ({fingerprint[:16]})")
+        else:
+            logger.info(f"Generating report for month {month_label}")
+            
+            # Stream rows from the database into both files
+            rows = self.iter_report_data(month_label)
+            try:
+                files = self.write_report_files(rows, month_label, summary, directory)
+            finally:
+                rows.close()
+            self.save_artifact_manifest(directory, fingerprint, files)
+        csv_uri = files["csv_uri"]
+        html_uri = files["html_uri"]
         
         # Update report record with file URIs
         file_uri = f"csv: {csv_uri}, html: {html_uri}"
@@ -345,8 +481,8 @@ class ReportBuilder:
             cur.execute("""
                 UPDATE reports
                 SET file_uri = %s
-                WHERE id = %s
-            """, (file_uri, report_id))
+                WHERE id = ANY(%s)
+            """, (file_uri, report_ids or [report_id]))
         
         logger.info(f"Report {report_id} generated successfully")
         
@@ -355,42 +491,142 @@ class ReportBuilder:
             "month_label": month_label,
             "csv_uri": csv_uri,
             "html_uri": html_uri,
-            "record_count": len(data)
+            "record_count": files["record_count"],
+            "fingerprint": fingerprint,
+            "cache_hit": cache_hit
         }
     
-    def process_pending_reports(self) -> dict:
+    def generate_month(self, reports: List[dict], force: bool = False) -> dict:
+        """
+        Generate one month's files and point its pending reports at them.
+        
+        reports are the month's pending rows, newest first; the files are
+        rendered once with the newest summary (or reused from the artifact
+        cache unless force). Never raises: failures are
+        returned as status "failed". Returns the outcome with timing.
+        """
+        newest = reports[0]
+        outcome = {
+            "month_label": newest['month_label'],
+            "report_ids": [report['id'] for report in reports]
+        }
+        start = time.perf_counter()
+        try:
+            result = self.generate_report(
+                report_id=newest['id'],
+                month_label=newest['month_label'],
+                summary=newest['summary'] or {},
+                report_ids=outcome["report_ids"],
+                rules_version=newest.get('rules_version'),
+                force=force
+            )
+            outcome.update(
+                status="generated",
+                cache_hit=result["cache_hit"],
+                fingerprint=result["fingerprint"][:16],
+                record_count=result["record_count"],
+                csv_uri=result["csv_uri"],
+                html_uri=result["html_uri"]
+            )
+        except Exception as e:
+            outcome.update(status="failed", error=str(e))
+            logger.error(
+                f"Error generating report for {newest['month_label']} (reports {outcome['report_ids']}): {e}",
+                exc_info=True
+            )
+        outcome["seconds"] = round(time.perf_counter() - start, 3)
+        return outcome
+    
+    def process_pending_reports(self, workers: Optional[int] = None, force: bool = False) -> dict:
         """
         Process all pending reports.
         
-        Returns summary of results.
+        Pending reports are grouped by month and each month is one task;
+        with more than one month and worker, tasks run in a process pool
+        of up to `workers` (default REPORT_WORKERS) processes. Unchanged
+        months reuse their cached artifacts unless force.
+        
+        Returns summary of results with per-month outcomes and timings.
         """
         reports = self.get_pending_reports()
         
+        by_month: Dict[str, List[dict]] = {}
+        for report in reports:
+            by_month.setdefault(report['month_label'], []).append(report)
+        months = list(by_month.values())
+        workers = max(1, min(workers or self.settings.report_workers, len(months)))
+        
+        start = time.perf_counter()
+        if workers == 1:
+            outcomes = [self.generate_month(month, force) for month in months]
+        else:
+            outcomes = self._generate_months_in_pool(months, workers, force)
+        wall = time.perf_counter() - start
+        
+        generated = [o for o in outcomes if o["status"] == "generated"]
+        failed = [o for o in outcomes if o["status"] != "generated"]
+        hits = sum(1 for o in generated if o["cache_hit"])
+        self.cache_counters["hits"] += hits
+        self.cache_counters["misses"] += len(generated) - hits
+        if force:
+            self.cache_counters["forced"] += len(generated)
         results = {
             "total": len(reports),
-            "generated": 0,
-            "failed": 0,
-            "errors": []
+            "generated": sum(len(o["report_ids"]) for o in generated),
+            "failed": sum(len(o["report_ids"]) for o in failed),
+            "errors": [
+                f"Report {report_id}: {o['error']}"
+                for o in failed for report_id in o["report_ids"]
+            ],
+            "months": len(months),
+            "workers": workers,
+            "records": sum(o["record_count"] for o in generated),
+            "cache": {"hits": hits, "misses": len(generated) - hits, "forced": force},
+            "wall_seconds": round(wall, 3),
+            "month_latency": summarize_latencies(o["seconds"] for o in outcomes),
+            "reports": sorted(outcomes, key=lambda o: o["month_label"])
         }
-        
-        for report in reports:
-            try:
-                result = self.generate_report(
-                    report_id=report['id'],
-                    month_label=report['month_label'],
-                    summary=report['summary'] or {}
-                )
-                results["generated"] += 1
-                logger.info(f"Generated report: {result}")
-            except Exception as e:
-                results["failed"] += 1
-                results["errors"].append(f"Report {report['id']}: {str(e)}")
-                logger.error(
-                    f"Error generating report {report['id']}: {e}",
-                    exc_info=True
-                )
-        
+        logger.info(
+            f"Generated {results['generated']}/{results['total']} reports "
+            f"({results['months']} months, {hits} cached, {workers} workers) in {results['wall_seconds']}s"
+        )
         return results
+    
+    def _generate_months_in_pool(self, months: List[List[dict]], workers: int, force: bool) -> List[dict]:
+        """Run generate_month for each month in a process pool."""
+        # spawn rather than fork: the API process has threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_report_worker
+        ) as pool:
+            futures = [(month, pool.submit(_generate_month_task, month, force)) for month in months]
+            outcomes = []
+            for month, future in futures:
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    # The worker process itself died (generate_month never raises)
+                    logger.error(f"Report worker failed for {month[0]['month_label']}: {e}")
+                    outcomes.append({
+                        "month_label": month[0]['month_label'],
+                        "report_ids": [report['id'] for report in month],
+                        "status": "failed",
+                        "error": str(e) or type(e).__name__,
+                        "seconds": 0.0
+                    })
+            return outcomes
+
+
+def _init_report_worker():
+    """Compile the report template once per worker process."""
+    get_renderer().warm()
+
+
+def _generate_month_task(reports: List[dict], force: bool) -> dict:
+    """Process-pool entry point: one month with this process's own builder."""
+    return get_report_builder().generate_month(reports, force)
 
 
 # Singleton instance
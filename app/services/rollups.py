@@ -0,0 +1,110 @@
+"""
+Monthly Rollups
+===============
+Reads of monthly_rollups: detection counts per (month, seniority_level,
+country), kept current by statement-level insert/update/delete triggers
+on detections (migrations/011_monthly_rollups.sql). Month summaries and
+/admin/stats read O(groups) rows here instead of scanning detections.
+
+rebuild() recomputes months from detections after loads with triggers
+disabled or to repair drift.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional
+
+from ..database import get_db
+from .report_builder import REPORT_TIMEZONE, month_range
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(month_label: str) -> date:
+    """First day of a "YYYY-MM" month."""
+    return month_range(month_label)[0].date()
+
+
+def current_month_label() -> str:
+    """The current month in the reports' timezone, as "YYYY-MM"."""
+    return datetime.now(REPORT_TIMEZONE).strftime("%Y-%m")
+
+
+def summarize_rollups(month_label: str, rows: Iterable[dict]) -> Dict[str, Any]:
+    """
+    Fold one month's rollup rows into a report summary.
+
+    Same shape as build_month_end_report()'s summary; countries are summed
+    across seniority levels so each country appears once.
+    """
+    total = 0
+    by_level: Dict[str, int] = {}
+    countries: Dict[str, int] = {}
+    for row in rows:
+        count = int(row['detection_count'])
+        if count == 0:
+            # Groups emptied by updates/deletes stay as zero rows
+            continue
+        total += count
+        by_level[row['seniority_level']] = by_level.get(row['seniority_level'], 0) + count
+        countries[row['country']] = countries.get(row['country'], 0) + count
+
+    return {
+        "month": month_label,
+        "total_detections": total,
+        "csuite_count": by_level.get('csuite', 0),
+        "vp_count": by_level.get('vp', 0),
+        "countries": countries
+    }
+
+
+class MonthlyRollups:
+    """Queries and maintenance for the monthly_rollups table."""
+
+    def __init__(self, db=None):
+        self.db = db or get_db()
+
+    def month_summary(self, month_label: Optional[str] = None) -> Dict[str, Any]:
+        """Summary for a month (default: the current month)."""
+        month_label = month_label or current_month_label()
+        with self.db.get_cursor() as cur:
+            cur.execute("""
+                SELECT seniority_level, country, detection_count
+                FROM monthly_rollups
+                WHERE month = %s
+            """, (month_start(month_label),))
+            return summarize_rollups(month_label, cur.fetchall())
+
+    def total_detections(self) -> int:
+        """All-time detection count."""
+        with self.db.get_cursor() as cur:
+            cur.execute("SELECT COALESCE(SUM(detection_count), 0) AS count FROM monthly_rollups")
+            return int(cur.fetchone()['count'])
+
+    def rebuild(self, since: Optional[str] = None, until: Optional[str] = None) -> int:
+        """
+        Recompute rollups from detections for months in [since, until).
+
+        since/until are "YYYY-MM" labels; None leaves that side open.
+        Returns the number of rollup rows written.
+        """
+        with self.db.transaction() as cur:
+            cur.execute(
+                "SELECT rebuild_monthly_rollups(%s, %s) AS rows_written",
+                (month_start(since) if since else None, month_start(until) if until else None)
+            )
+            rows_written = cur.fetchone()['rows_written']
+        logger.info(f"Rebuilt monthly rollups [{since or '-'}, {until or '-'}): {rows_written} rows")
+        return rows_written
+
+
+# Singleton instance
+_monthly_rollups: Optional[MonthlyRollups] = None
+
+
+def get_monthly_rollups() -> MonthlyRollups:
+    """Get monthly rollups instance (singleton)."""
+    global _monthly_rollups
+    if _monthly_rollups is None:
+        _monthly_rollups = MonthlyRollups()
+    return _monthly_rollups
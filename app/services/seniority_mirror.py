@@ -0,0 +1,237 @@
+"""
+Seniority Mirror
+================
+In-process copy of user_state's user_id -> seniority_level map, so the
+event processor can pick insert vs update vs promotion without a SELECT.
+
+user_state only holds senior users, so the whole map fits comfortably in
+memory: a dict from user_id to a slot in a one-byte-per-user array of
+level codes.
+
+Lifecycle:
+    1. LISTEN on user_state_changed (trigger in migrations/007_user_state_notify.sql)
+    2. Warm with one streaming query over user_state
+    3. Apply each notification (every committed insert/update/delete,
+       from any worker or the SQL functions) in commit order
+
+Consistency: the mirror is a hint, never the source of truth.
+    - Until warm, or while the listener is disconnected, lookups report
+      "unknown" and the processor uses the original SELECT path.
+    - Writes chosen from the mirror are guarded in SQL (INSERT ... ON
+      CONFLICT DO NOTHING for "absent", UPDATE ... WHERE seniority_level
+      = expected for "present"). If the guard matches no row the mirror
+      was stale, the transaction falls back to the SELECT path, and the
+      entry is corrected from the database.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import psycopg
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "user_state_changed"
+
+# Level codes stored in the array; index 0 doubles as "level is NULL"
+_LEVELS = (None, "vp", "csuite")
+_CODES = {level: code for code, level in enumerate(_LEVELS)}
+
+
+class SeniorityMirror:
+    """Compact user_id -> seniority_level map kept in sync via NOTIFY."""
+
+    __slots__ = (
+        "settings", "ready", "_slots", "_levels", "_free",
+        "hits", "misses", "stale", "notifications", "warms", "warm_seconds"
+    )
+
+    def __init__(self):
+        """Initialize an empty, not-yet-ready mirror."""
+        self.settings = get_settings()
+        self.ready = False
+        self._slots: Dict[str, int] = {}
+        self._levels = array("B")
+        self._free: List[int] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.notifications = 0
+        self.warms = 0
+        self.warm_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def lookup(self, user_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a user's seniority level.
+
+        Returns (known, level). known is False when the mirror cannot
+        answer (not warm / listener down) - use the database. When known,
+        level is None for users not in user_state.
+        """
+        if not self.ready:
+            self.misses += 1
+            return (False, None)
+        slot = self._slots.get(user_id)
+        if slot is None:
+            self.hits += 1
+            return (True, None)
+        level = _LEVELS[self._levels[slot]]
+        if level is None:
+            # Present with a NULL level; indistinguishable from absent here
+            self.misses += 1
+            return (False, None)
+        self.hits += 1
+        return (True, level)
+
+    def contains(self, user_id: str) -> bool:
+        """Whether the user has an entry (regardless of readiness)."""
+        return user_id in self._slots
+
+    def set(self, user_id: str, level: Optional[str]):
+        """Record that the user is in user_state at the given level."""
+        code = _CODES.get(level, 0)
+        slot = self._slots.get(user_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._levels[slot] = code
+            else:
+                slot = len(self._levels)
+                self._levels.append(code)
+            self._slots[user_id] = slot
+        else:
+            self._levels[slot] = code
+
+    def discard(self, user_id: str):
+        """Record that the user is not in user_state."""
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._levels[slot] = 0
+            self._free.append(slot)
+
+    def mark_stale(self, user_id: str, level: Optional[str]):
+        """A mirror-guided write missed; correct the entry from the database."""
+        self.stale += 1
+        if level is None:
+            self.discard(user_id)
+        else:
+            self.set(user_id, level)
+
+    def load(self, rows: Iterable[Tuple[str, Optional[str]]]):
+        """Replace the contents with (user_id, seniority_level) rows."""
+        slots: Dict[str, int] = {}
+        levels = array("B")
+        for user_id, level in rows:
+            slots[user_id] = len(levels)
+            levels.append(_CODES.get(level, 0))
+        self._slots, self._levels, self._free = slots, levels, []
+
+    def apply_notification(self, payload: str):
+        """
+        Apply one user_state_changed payload.
+
+        Format: "U|<level>|<user_id>" for insert/update (empty level means
+        NULL), "D||<user_id>" for delete, "*" after a TRUNCATE.
+        """
+        self.notifications += 1
+        op, level, user_id = payload.split("|", 2)
+        if op == "D":
+            self.discard(user_id)
+        else:
+            self.set(user_id, level or None)
+
+    async def warm(self):
+        """Load user_state with one streaming query."""
+        start = time.monotonic()
+        slots: Dict[str, int] = {}
+        levels = array("B")
+        async with await psycopg.AsyncConnection.connect(self.settings.supabase_db_url) as conn:
+            async with conn.cursor(name="seniority_mirror_warm") as cur:
+                cur.itersize = 10000
+                await cur.execute("SELECT user_id, seniority_level FROM user_state")
+                async for user_id, level in cur:
+                    slots[user_id] = len(levels)
+                    levels.append(_CODES.get(level, 0))
+        # Swap in one step so lookups never see a half-built map
+        self._slots, self._levels, self._free = slots, levels, []
+        self.warms += 1
+        self.warm_seconds = time.monotonic() - start
+        logger.info(f"Seniority mirror warmed with {len(self)} users in {self.warm_seconds:.2f}s")
+
+    async def run(self, stop: asyncio.Event):
+        """Keep the mirror current until stop is set."""
+        listener = asyncio.create_task(self._listen(stop))
+        try:
+            await stop.wait()
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            self.ready = False
+
+    async def _listen(self, stop: asyncio.Event):
+        """Hold a LISTEN connection: warm, then apply changes; reconnect on loss."""
+        while not stop.is_set():
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    self.settings.supabase_db_url,
+                    autocommit=True
+                )
+                async with conn:
+                    # Listen before warming so no change falls in between;
+                    # notifications queued during the warm are replayed in order
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    await self.warm()
+                    self.ready = True
+
+                    async for notify in conn.notifies():
+                        if notify.payload == "*":
+                            self.ready = False
+                            await self.warm()
+                            self.ready = True
+                        else:
+                            self.apply_notification(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Seniority mirror listener lost: {e}")
+            finally:
+                # Without notifications the mirror may drift; fall back to the DB
+                self.ready = False
+
+            await asyncio.sleep(self.settings.drain_reconnect_seconds)
+
+    def stats(self) -> dict:
+        """Return mirror metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "ready": self.ready,
+            "users": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "notifications": self.notifications,
+            "warms": self.warms,
+            "warm_seconds": round(self.warm_seconds, 3),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Singleton instance
+_mirror: Optional[SeniorityMirror] = None
+
+
+def get_seniority_mirror() -> SeniorityMirror:
+    """Get seniority mirror instance (singleton)."""
+    global _mirror
+    if _mirror is None:
+        _mirror = SeniorityMirror()
+    return _mirror
@@ -0,0 +1,205 @@
+"""
+Status Batcher
+==============
+Write-behind batching for simple status transitions (events_raw
+processed, digests sent).
+
+Callers add ids as work completes; the batcher applies the transition to
+all pending ids with one UPDATE ... WHERE id = ANY(%s) once max_batch ids
+are pending or max_delay after the first one was added, whichever comes
+first. Call flush_status_batchers() on shutdown. A crash loses at most
+max_delay of transitions; both transitions are safe to lose, since the
+row is retried (events are reprocessed idempotently, digest leases
+expire), so this only trades a small retry window for fewer round trips.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from ..config import get_settings
+from ..database import get_db
+from ..utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+MARK_EVENTS_PROCESSED = """
+    UPDATE events_raw
+    SET processed = TRUE, processed_at = NOW()
+    WHERE id = ANY(%s)
+"""
+
+MARK_DIGESTS_SENT = """
+    UPDATE digests
+    SET sent = TRUE, sent_at = NOW(), lease_expires_at = NULL
+    WHERE id = ANY(%s) AND NOT sent
+"""
+
+
+class StatusBatcher:
+    """Collects ids and applies one status UPDATE to them in batches."""
+
+    def __init__(
+        self,
+        name: str,
+        update_sql: str,
+        max_batch: int,
+        max_delay_seconds: float,
+        db=None
+    ):
+        """
+        Initialize batcher.
+
+        update_sql takes the id list as its only parameter. Without a
+        running event loop (scripts, tests) ids are written through
+        immediately.
+        """
+        self.name = name
+        self.update_sql = update_sql
+        self.max_batch = max(1, max_batch)
+        self.max_delay_seconds = max_delay_seconds
+        self.db = db or get_db()
+        self._pending: Dict[int, None] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.added = 0
+        self.flushes = 0
+        self.size_flushes = 0
+        self.timer_flushes = 0
+        self.flush_errors = 0
+        self.rows_updated = 0
+        self.flush_latency = LatencyTracker()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, item_id: int) -> bool:
+        """Whether item_id is queued and not yet written."""
+        return item_id in self._pending
+
+    def add(self, item_id: int):
+        """Queue an id for the status transition."""
+        self._pending[item_id] = None
+        self.added += 1
+
+        if len(self._pending) >= self.max_batch:
+            # The caller's own work is already committed; a failed status
+            # write is retried here, never raised into it
+            self.size_flushes += 1
+            self._flush_or_retry()
+            return
+
+        if self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+                return
+            self._timer = loop.call_later(self.max_delay_seconds, self._flush_on_timer)
+
+    def _flush_on_timer(self):
+        self._timer = None
+        self.timer_flushes += 1
+        self._flush_or_retry()
+
+    def _flush_or_retry(self):
+        """Flush now; on failure keep the ids pending and retry after max_delay."""
+        try:
+            self.flush()
+        except Exception:
+            # Ids were re-queued and the error logged; without a loop they
+            # go out with the next flush
+            if self._pending and self._timer is None:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    return
+                self._timer = loop.call_later(self.max_delay_seconds, self._flush_on_timer)
+
+    def flush(self) -> int:
+        """
+        Apply the transition to all pending ids now.
+
+        On failure the ids stay pending and the error is raised.
+        Returns rows updated.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return 0
+
+        ids = list(self._pending)
+        self._pending.clear()
+        start = time.monotonic()
+        try:
+            with self.db.get_cursor() as cur:
+                cur.execute(self.update_sql, (ids,))
+                updated = cur.rowcount
+        except Exception as e:
+            self.flush_errors += 1
+            for item_id in ids:
+                self._pending[item_id] = None
+            logger.error(f"Error flushing {len(ids)} {self.name} updates: {e}")
+            raise
+
+        self.flush_latency.observe(time.monotonic() - start)
+        self.flushes += 1
+        self.rows_updated += updated
+        logger.debug(f"Flushed {len(ids)} {self.name} updates ({updated} rows)")
+        return updated
+
+    def stats(self) -> dict:
+        """Return batching metrics."""
+        return {
+            "pending": len(self._pending),
+            "added": self.added,
+            "flushes": self.flushes,
+            "size_flushes": self.size_flushes,
+            "timer_flushes": self.timer_flushes,
+            "flush_errors": self.flush_errors,
+            "rows_updated": self.rows_updated,
+            "avg_batch": round(self.rows_updated / self.flushes, 1) if self.flushes else 0.0,
+            "flush_latency": self.flush_latency.summary()
+        }
+
+
+# Singleton instances
+_batchers: Dict[str, StatusBatcher] = {}
+
+
+def _get_batcher(name: str, update_sql: str) -> StatusBatcher:
+    if name not in _batchers:
+        settings = get_settings()
+        _batchers[name] = StatusBatcher(
+            name,
+            update_sql,
+            max_batch=settings.status_batch_max_size,
+            max_delay_seconds=settings.status_batch_max_delay_ms / 1000
+        )
+    return _batchers[name]
+
+
+def get_processed_batcher() -> StatusBatcher:
+    """Get the events_raw processed batcher (singleton)."""
+    return _get_batcher("events_processed", MARK_EVENTS_PROCESSED)
+
+
+def get_digest_sent_batcher() -> StatusBatcher:
+    """Get the digests sent batcher (singleton)."""
+    return _get_batcher("digests_sent", MARK_DIGESTS_SENT)
+
+
+def flush_status_batchers():
+    """Flush every batcher created in this process (call on shutdown)."""
+    for batcher in list(_batchers.values()):
+        try:
+            batcher.flush()
+        except Exception as e:
+            logger.error(f"Could not flush {batcher.name} on shutdown: {e}")
+
+
+def status_batcher_stats() -> dict:
+    """Metrics for every batcher created in this process."""
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,142 @@
+"""
+Admission control for request handlers.
+
+Caps the number of requests doing work at once and the number allowed to
+wait for a slot. Requests beyond that are rejected immediately (429), and
+requests that wait too long are rejected with 503, both carrying a
+Retry-After hint so the sender's retry logic absorbs bursts instead of
+piling work onto the server.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable
+
+from starlette.responses import JSONResponse
+
+from .metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded in-flight + bounded queue admission control."""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        retry_after_seconds: int
+    ):
+        """Initialize controller limits."""
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queue_wait = LatencyTracker()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Hold an in-flight slot for the duration of the block.
+
+        Raises AdmissionRejected if the queue is full or the wait for a
+        slot exceeds the queue timeout.
+        """
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, "queue_full", self.retry_after_seconds)
+
+        start = time.monotonic()
+        if not self._slots.locked():
+            # Free slot: acquire without the wait_for task overhead
+            await self._slots.acquire()
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, "queue_timeout", self.retry_after_seconds)
+            finally:
+                self.queued -= 1
+
+        self.queue_wait.observe(time.monotonic() - start)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Return admission metrics."""
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "queue_wait": self.queue_wait.summary()
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to selected paths.
+
+    Runs before request parsing and validation, so shed requests cost
+    almost nothing.
+    """
+
+    def __init__(
+        self,
+        app,
+        get_controller: Callable[[], AdmissionController],
+        paths: Iterable[str]
+    ):
+        """Wrap an ASGI app."""
+        self.app = app
+        self.get_controller = get_controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with self.get_controller().admit():
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            logger.debug(f"Rejected {scope['path']}: {e.reason}")
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"status": "rejected", "reason": e.reason},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
@@ -0,0 +1,112 @@
+"""
+Adaptive batch sizing for queue consumers.
+
+Picks the next claim size from what the last batch cost: shrink when a
+batch overshoots the latency target, grow while a backlog is waiting and
+batches finish well under target, and drift down when the queue is quiet
+so row locks are held briefly.
+
+The claim query's own time is recorded for metrics but does not drive
+sizing: claims use FOR UPDATE SKIP LOCKED, so they never wait on row
+locks, and their time is already part of the batch latency.
+"""
+
+from collections import deque
+from typing import Dict
+
+# Decision reasons (exported as metrics)
+LATENCY = "latency_over_target"
+BACKLOG = "backlog"
+QUIET = "quiet"
+STEADY = "steady"
+
+
+class AdaptiveBatchSizer:
+    """Chooses batch sizes within [min_size, max_size] to hold a latency target."""
+
+    def __init__(
+        self,
+        initial_size: int,
+        min_size: int,
+        max_size: int,
+        target_latency_seconds: float,
+        max_growth: float = 2.0,
+        history_size: int = 20
+    ):
+        """Initialize sizer; initial_size is clamped into the bounds."""
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.target_latency_seconds = target_latency_seconds
+        self.max_growth = max_growth
+
+        self.batch_size = self._clamp(initial_size)
+        self.decisions: Dict[str, int] = {
+            reason: 0 for reason in (LATENCY, BACKLOG, QUIET, STEADY)
+        }
+        self.history: deque = deque(maxlen=history_size)
+
+    def _clamp(self, size: float) -> int:
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    def observe(
+        self,
+        claimed: int,
+        latency_seconds: float,
+        claim_seconds: float,
+        backlog: int
+    ) -> int:
+        """
+        Record one batch and return the size to claim next.
+
+        claimed is the number of rows the batch actually got, latency the
+        whole batch transaction (after connecting), claim the claim query
+        alone (recorded only) and backlog the number of due rows still
+        waiting after the claim.
+        """
+        size = self.batch_size
+        target = self.target_latency_seconds
+
+        if claimed and latency_seconds > target:
+            # Scale towards the size that would have hit the target
+            reason = LATENCY
+            new_size = min(size - 1, claimed * target / latency_seconds)
+        elif backlog > 0 and claimed >= size:
+            # Queue is deeper than one batch; grow while there is headroom
+            reason = BACKLOG
+            headroom = target / latency_seconds if latency_seconds > 0 else self.max_growth
+            new_size = size * min(self.max_growth, headroom)
+            if new_size <= size:
+                reason = STEADY
+                new_size = size
+        elif claimed < size and backlog == 0:
+            # Quiet: the limit is not binding, so claim close to demand
+            reason = QUIET
+            new_size = max(claimed * 2, size / 2)
+        else:
+            reason = STEADY
+            new_size = size
+
+        self.batch_size = self._clamp(new_size)
+        self.decisions[reason] += 1
+        self.history.append({
+            "reason": reason,
+            "size_before": size,
+            "size_after": self.batch_size,
+            "claimed": claimed,
+            "latency_ms": round(latency_seconds * 1000, 2),
+            "claim_ms": round(claim_seconds * 1000, 2),
+            "backlog": backlog
+        })
+        return self.batch_size
+
+    def stats(self) -> dict:
+        """Return current size, decision counts and the latest decision."""
+        return {
+            "batch_size": self.batch_size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "target_latency_ms": round(self.target_latency_seconds * 1000, 2),
+            "decisions": dict(self.decisions),
+            "last_decision": self.history[-1] if self.history else None,
+            "recent_decisions": list(self.history)
+        }
@@ -0,0 +1,180 @@
+"""
+Circuit breaker for outbound API calls.
+
+Tracks a rolling window of call outcomes. The breaker opens when either
+the failure rate or the slow-call rate crosses its threshold, rejects
+calls while open, then lets a few probe calls through (half-open) to
+decide whether to close again.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the breaker is open."""
+
+
+class CircuitBreaker:
+    """Failure-rate and latency based circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        slow_call_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize breaker in the closed state."""
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
+        self.state = CLOSED
+        self._window: deque = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._half_open_inflight = 0
+        self._half_open_successes = 0
+
+        self.trips = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+    def _transition(self, state: str):
+        """Move to a new state and reset per-state bookkeeping."""
+        if state == self.state:
+            return
+
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        self._half_open_inflight = 0
+        self._half_open_successes = 0
+
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.trips += 1
+        elif state == CLOSED:
+            self._window.clear()
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, reserving a probe slot if half-open."""
+        if self.state == OPEN:
+            if self._clock() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._half_open_inflight >= self.half_open_max_calls:
+                return False
+            self._half_open_inflight += 1
+
+        return True
+
+    def record(self, failed: bool, duration: float):
+        """Record the outcome of a permitted call."""
+        slow = duration >= self.slow_call_seconds
+        if failed:
+            self.failures += 1
+        else:
+            self.successes += 1
+        if slow:
+            self.slow_calls += 1
+
+        if self.state == HALF_OPEN:
+            self._half_open_inflight = max(0, self._half_open_inflight - 1)
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self._transition(CLOSED)
+            return
+
+        if self.state != CLOSED:
+            return
+
+        self._window.append((failed, slow))
+        calls = len(self._window)
+        if calls < self.minimum_calls:
+            return
+
+        failure_rate = sum(1 for f, _ in self._window if f) / calls
+        slow_rate = sum(1 for _, s in self._window if s) / calls
+        if (failure_rate >= self.failure_rate_threshold
+                or slow_rate >= self.slow_call_rate_threshold):
+            self._transition(OPEN)
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        timeout: Optional[float] = None,
+        acquire: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Run an async callable through the breaker.
+
+        A timeout bounds the call's latency; timing out counts as a failure.
+        Raises CircuitOpenError without calling func when the breaker is open.
+
+        acquire (e.g. a rate limiter's acquire) is awaited only once the
+        call is admitted, and outside the timed call, so rejected calls
+        don't spend it and waiting for it doesn't count as latency.
+        """
+        if not self.allow_request():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is {self.state}")
+
+        start = self._clock()
+        try:
+            if acquire is not None:
+                await acquire()
+                start = self._clock()
+            if timeout is not None:
+                result = await asyncio.wait_for(func(*args), timeout=timeout)
+            else:
+                result = await func(*args)
+        except asyncio.CancelledError:
+            # Cancellation says nothing about upstream health
+            if self.state == HALF_OPEN:
+                self._half_open_inflight = max(0, self._half_open_inflight - 1)
+            raise
+        except Exception:
+            self.record(failed=True, duration=self._clock() - start)
+            raise
+
+        self.record(failed=False, duration=self._clock() - start)
+        return result
+
+    def stats(self) -> dict:
+        """Return breaker metrics."""
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "successes": self.successes,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "window_calls": len(self._window)
+        }
@@ -0,0 +1,80 @@
+"""
+Lightweight in-process metrics helpers.
+"""
+
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(samples: Iterable[float]) -> dict:
+    """Summarize latency samples (seconds) as milliseconds."""
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0
+    }
+
+
+class LatencyTracker:
+    """Keeps the most recent latency samples for percentile reporting."""
+
+    def __init__(self, max_samples: int = 1024):
+        """Initialize tracker with a bounded sample window."""
+        self._samples: deque = deque(maxlen=max_samples)
+        self.total_count = 0
+
+    def observe(self, seconds: float):
+        """Record one latency sample."""
+        self._samples.append(seconds)
+        self.total_count += 1
+
+    def summary(self) -> dict:
+        """Percentiles over the sample window plus the lifetime count."""
+        result = summarize_latencies(self._samples)
+        result["total_count"] = self.total_count
+        return result
+
+
+class StageTimer:
+    """Collects per-stage durations for a multi-step pipeline."""
+
+    def __init__(self):
+        """Initialize with no samples."""
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under the given stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        """Latency summary per stage."""
+        return {name: summarize_latencies(values) for name, values in self.samples.items()}
+
+
+class NullStageTimer:
+    """StageTimer stand-in that records nothing (the default)."""
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+
+
+NULL_TIMER = NullStageTimer()
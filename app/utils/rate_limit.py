@@ -0,0 +1,86 @@
+"""
+Rate limiting primitives shared by outbound API clients.
+"""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """Initialize bucket, starting full."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = asyncio.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+
+    def _refill(self):
+        """Add tokens accrued since the last refill."""
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take tokens if available without waiting.
+
+        Does not queue behind acquire() waiters, so it can take a token
+        ahead of them.
+        """
+        if self.rate <= 0:
+            self.acquired += 1
+            return True
+
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            self.acquired += 1
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Wait until tokens are available, then take them.
+
+        Every caller goes through the (FIFO) lock, so tokens are handed
+        out in arrival order: a new caller cannot take a refilled token
+        from one already waiting.
+        """
+        if self.rate <= 0:
+            self.acquired += 1
+            return
+
+        async with self._lock:
+            if self.try_acquire(tokens):
+                return
+            self.throttled += 1
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def stats(self) -> dict:
+        """Return limiter metrics."""
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "acquired": self.acquired,
+            "throttled": self.throttled
+        }
@@ -0,0 +1,96 @@
+"""
+Template rendering for digests and reports.
+
+Templates live in app/templates and are compiled once per process (the
+API warms them at startup). HTML templates autoescape, so user-supplied
+titles, names and companies cannot inject markup; the Teams markdown
+template escapes user fields with the `md` filter instead. Output is
+produced by joining the template's generated chunks, which stays linear
+in the number of rows, and can be streamed to a file without building
+the whole document.
+"""
+
+import logging
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+# Templates compiled by warm()
+TEMPLATES = ("digest_email.html", "digest_teams.md", "report.html")
+
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_\[\]<>~])")
+
+
+def format_date(value: Optional[Union[date, datetime]], fmt: str = "%Y-%m-%d", default: str = "N/A") -> str:
+    """Format a date/datetime, or return default for None."""
+    if value is None:
+        return default
+    return value.strftime(fmt)
+
+
+def escape_markdown(value: object) -> str:
+    """Backslash-escape characters with meaning in Teams markdown."""
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", str(value))
+
+
+class TemplateRenderer:
+    """Compiled-template cache over the app/templates directory."""
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR):
+        """Create the environment; templates compile on first use or warm()."""
+        self.env = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            autoescape=select_autoescape(["html"]),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            # Templates ship with the code; skip per-render mtime checks
+            auto_reload=False
+        )
+        self.env.filters["date"] = format_date
+        self.env.filters["md"] = escape_markdown
+
+    def warm(self) -> int:
+        """Compile every known template; returns how many were loaded."""
+        for name in TEMPLATES:
+            self.env.get_template(name)
+        logger.info(f"Compiled {len(TEMPLATES)} templates from {TEMPLATE_DIR}")
+        return len(TEMPLATES)
+
+    def get_template(self, name: str) -> Template:
+        return self.env.get_template(name)
+
+    def stream(self, name: str, **context) -> Iterator[str]:
+        """Yield the rendered output in chunks."""
+        return self.get_template(name).generate(**context)
+
+    def render(self, name: str, **context) -> str:
+        """Render a template to a string."""
+        return "".join(self.stream(name, **context))
+
+    def render_to_file(self, name: str, path: Union[str, Path], **context) -> int:
+        """Stream a template into a file; returns characters written."""
+        written = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in self.stream(name, **context):
+                written += f.write(chunk)
+        return written
+
+
+# Singleton instance
+_renderer: Optional[TemplateRenderer] = None
+
+
+def get_renderer() -> TemplateRenderer:
+    """Get template renderer instance (singleton)."""
+    global _renderer
+    if _renderer is None:
+        _renderer = TemplateRenderer()
+    return _renderer
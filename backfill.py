@@ -0,0 +1,367 @@
+"""
+Bulk backfill of existing community members.
+
+Streams a CSV or NDJSON user export (user_id/id, username, title, country,
+company, joined_at), classifies titles across worker processes in
+chunks, and COPYs senior users into user_state and detections.
+
+Every chunk's inserts commit together with its checkpoint row
+(backfill_checkpoints, migrations/008_backfill_checkpoints.sql), so an
+interrupted run resumes where it stopped when started again with the same
+--run-id. Memory stays flat: the input is read lazily and only a bounded
+number of chunks is in flight.
+
+Semantics:
+    - first_detected_at / detected_at are the run's start time (kept on resume)
+    - rules_version is the current classifier version
+    - users already in user_state are left untouched
+    - detections are marked as already digested, so onboarding does not
+      flood the weekly digest (pass --include-in-digest to send them)
+    - chunks skip the per-row user_state_changed NOTIFY; one '*' is sent
+      when the run ends (or aborts), so seniority mirrors reload once
+
+Usage:
+    python backfill.py members.csv
+    python backfill.py members.ndjson --run-id onboarding-acme --workers 8
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.classification import classify_title, get_classifier
+from app.database import get_db
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("backfill")
+
+# (user_id, username, title, country, company, joined_at)
+UserRow = Tuple[str, Optional[str], str, Optional[str], Optional[str], Optional[str]]
+
+STAGE_COLUMNS = "user_id, username, title, seniority_level, country, company, joined_at"
+
+# Checked by notify_user_state_changed() (migrations/007_user_state_notify.sql)
+SKIP_NOTIFY_SETTING = "captpathfinder.skip_user_state_notify"
+
+
+def normalize(record: dict) -> Optional[UserRow]:
+    """Map an export record to a UserRow; None if it has no id or title."""
+    user_id = record.get("user_id") or record.get("userId") or record.get("id")
+    title = record.get("title") or record.get("job_title") or record.get("value")
+    if not user_id or not title:
+        return None
+    return (
+        str(user_id),
+        record.get("username") or None,
+        str(title),
+        record.get("country") or None,
+        record.get("company") or None,
+        record.get("joined_at") or record.get("joinedAt") or None
+    )
+
+
+def read_export(path: str, fmt: str) -> Iterator[Optional[UserRow]]:
+    """Stream records from the export (None for unusable rows, to keep positions)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for record in csv.DictReader(f):
+                yield normalize(record)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield normalize(json.loads(line))
+                except ValueError:
+                    yield None
+
+
+def parse_joined_at(value: Optional[str]) -> Optional[str]:
+    """Return an ISO timestamp Postgres accepts, or None if unparseable."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        return None
+
+
+def classify_chunk(rows: List[Optional[UserRow]]) -> List[tuple]:
+    """
+    Classify one chunk (runs in a worker process).
+
+    Returns staging rows for senior users only, in STAGE_COLUMNS order.
+    """
+    seniors = []
+    for row in rows:
+        if row is None:
+            continue
+        user_id, username, title, country, company, joined_at = row
+        is_senior, level = classify_title(title)
+        if is_senior:
+            seniors.append((
+                user_id, username, title, level,
+                country, company, parse_joined_at(joined_at)
+            ))
+    return seniors
+
+
+def _init_worker():
+    """Build the classifier once per worker process."""
+    get_classifier()
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size items."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BackfillWriter:
+    """Writes classified chunks and checkpoints on one connection."""
+
+    def __init__(self, run_id: str, source: str, include_in_digest: bool):
+        """Open the connection, load or create the checkpoint, set up staging."""
+        self.run_id = run_id
+        self.include_in_digest = include_in_digest
+        self.rules_version = get_classifier().version
+        self.conn = get_db().get_connection()
+
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO backfill_checkpoints (run_id, source, rules_version)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (run_id) DO NOTHING
+            """, (run_id, source, self.rules_version))
+            cur.execute("""
+                SELECT rows_done, seniors_found, seniors_inserted, started_at, completed_at
+                FROM backfill_checkpoints
+                WHERE run_id = %s
+            """, (run_id,))
+            checkpoint = cur.fetchone()
+
+            cur.execute("""
+                CREATE TEMP TABLE backfill_stage (
+                    user_id TEXT,
+                    username TEXT,
+                    title TEXT,
+                    seniority_level TEXT,
+                    country TEXT,
+                    company TEXT,
+                    joined_at TIMESTAMPTZ
+                ) ON COMMIT DELETE ROWS
+            """)
+        self.conn.commit()
+
+        self.rows_done = checkpoint['rows_done']
+        self.seniors_found = checkpoint['seniors_found']
+        self.seniors_inserted = checkpoint['seniors_inserted']
+        self.detected_at = checkpoint['started_at']
+        self.completed = checkpoint['completed_at'] is not None
+        self.inserted_this_run = 0
+
+    def write_chunk(self, rows_in_chunk: int, seniors: List[tuple]) -> int:
+        """COPY one chunk's seniors and advance the checkpoint atomically."""
+        inserted = 0
+        with self.conn.cursor() as cur:
+            if seniors:
+                with cur.copy(f"COPY backfill_stage ({STAGE_COLUMNS}) FROM STDIN") as copy:
+                    for row in seniors:
+                        copy.write_row(row)
+
+                # One NOTIFY per inserted user would flood every mirror;
+                # notify_mirrors() sends a single reload instead
+                cur.execute(f"SET LOCAL {SKIP_NOTIFY_SETTING} = 'on'")
+
+                # Existing users keep their live state; new ones get a detection
+                cur.execute(f"""
+                    WITH inserted AS (
+                        INSERT INTO user_state (
+                            {STAGE_COLUMNS}, first_detected_at, last_seen_at
+                        )
+                        SELECT DISTINCT ON (user_id)
+                            {STAGE_COLUMNS}, %(detected_at)s, %(detected_at)s
+                        FROM backfill_stage
+                        ORDER BY user_id
+                        ON CONFLICT (user_id) DO NOTHING
+                        RETURNING {STAGE_COLUMNS}
+                    )
+                    INSERT INTO detections (
+                        {STAGE_COLUMNS}, detected_at, rules_version, included_in_digest
+                    )
+                    SELECT {STAGE_COLUMNS}, %(detected_at)s, %(rules_version)s, %(digested)s
+                    FROM inserted
+                """, {
+                    "detected_at": self.detected_at,
+                    "rules_version": self.rules_version,
+                    "digested": not self.include_in_digest
+                })
+                inserted = cur.rowcount
+
+            self.rows_done += rows_in_chunk
+            self.seniors_found += len(seniors)
+            self.seniors_inserted += inserted
+            self.inserted_this_run += inserted
+            cur.execute("""
+                UPDATE backfill_checkpoints
+                SET rows_done = %s,
+                    seniors_found = %s,
+                    seniors_inserted = %s,
+                    updated_at = NOW()
+                WHERE run_id = %s
+            """, (self.rows_done, self.seniors_found, self.seniors_inserted, self.run_id))
+        self.conn.commit()
+        return inserted
+
+    def notify_mirrors(self):
+        """Have seniority mirrors reload user_state once, if this run added users."""
+        if not self.inserted_this_run:
+            return
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_notify('user_state_changed', '*')")
+        self.conn.commit()
+        self.inserted_this_run = 0
+
+    def finish(self):
+        """Mark the run complete, notify mirrors and close the connection."""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE backfill_checkpoints
+                SET completed_at = NOW(), updated_at = NOW()
+                WHERE run_id = %s
+            """, (self.run_id,))
+        self.conn.commit()
+        self.notify_mirrors()
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+
+def run_backfill(
+    path: str,
+    fmt: str,
+    run_id: str,
+    workers: int,
+    chunk_size: int,
+    include_in_digest: bool
+) -> dict:
+    """Backfill from an export, resuming from the run's checkpoint."""
+    writer = BackfillWriter(run_id, os.path.abspath(path), include_in_digest)
+    if writer.completed:
+        writer.close()
+        logger.info(f"Run {run_id} already completed")
+        return {"run_id": run_id, "status": "already_completed"}
+
+    skip = writer.rows_done
+    if skip:
+        logger.info(f"Resuming run {run_id} after {skip} rows")
+
+    rows = read_export(path, fmt)
+    for _ in range(skip):
+        if next(rows, StopIteration) is StopIteration:
+            break
+
+    start = time.perf_counter()
+    processed = 0
+    chunks_written = 0
+    max_in_flight = workers * 2
+    pending: deque = deque()
+
+    def write_oldest():
+        nonlocal processed, chunks_written
+        size, future = pending.popleft()
+        writer.write_chunk(size, future.result())
+        processed += size
+        chunks_written += 1
+        if chunks_written % 20 == 0:
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"{writer.rows_done} rows, {writer.seniors_inserted} seniors inserted "
+                f"({processed / elapsed:.0f} rows/sec)"
+            )
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for chunk in chunked(rows, chunk_size):
+                pending.append((len(chunk), pool.submit(classify_chunk, chunk)))
+                # Write in input order so the checkpoint is a simple row count
+                if len(pending) >= max_in_flight:
+                    write_oldest()
+            while pending:
+                write_oldest()
+    except BaseException:
+        try:
+            # Chunks committed so far are in user_state; reload mirrors
+            writer.conn.rollback()
+            writer.notify_mirrors()
+        except Exception as e:
+            logger.error(f"Could not notify seniority mirrors: {e}")
+        writer.close()
+        raise
+
+    elapsed = time.perf_counter() - start
+    writer.finish()
+
+    return {
+        "run_id": run_id,
+        "status": "completed",
+        "rows_done": writer.rows_done,
+        "rows_this_run": processed,
+        "seniors_found": writer.seniors_found,
+        "seniors_inserted": writer.seniors_inserted,
+        "rules_version": writer.rules_version,
+        "detected_at": writer.detected_at.isoformat(),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(processed / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="CSV or NDJSON user export")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="input format (default: from the file extension)")
+    parser.add_argument("--run-id", help="checkpoint key (default: export file name)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--include-in-digest", action="store_true",
+                        help="send backfilled detections in the next weekly digest")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    run_id = args.run_id or Path(args.path).name
+
+    result = run_backfill(
+        args.path, fmt, run_id,
+        workers=max(1, args.workers),
+        chunk_size=max(1, args.chunk_size),
+        include_in_digest=args.include_in_digest
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks and load tests (run as scripts, not collected by pytest)."""
@@ -0,0 +1,180 @@
+"""
+Fake Automation Anywhere Control Room.
+
+Implements the two endpoints AutomationAnywhereClient uses:
+
+    POST /v2/authentication      -> {"token": <JWT with exp>}
+    POST /v3/automations/deploy  -> {"deploymentId": ...}
+
+with configurable latency, error rate, token lifetime and a concurrent
+deploy limit (deploys beyond it get 429), so digest delivery can be
+load-tested without a real Control Room. GET /stats returns what the
+server saw. Use it in-process (create_app + httpx.ASGITransport, as
+benchmarks.digest_throughput does) or run it standalone:
+
+    python -m benchmarks.fake_control_room --port 8081 --latency-ms 200 --error-rate 0.02
+
+and point AA_CONTROL_ROOM_URL / AA_AUTH_ENDPOINT at it.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeControlRoomConfig:
+    """Behaviour knobs for the fake server."""
+    deploy_latency_ms: float = 100.0
+    deploy_jitter_ms: float = 50.0
+    auth_latency_ms: float = 50.0
+    error_rate: float = 0.0  # fraction of deploys answered with 500
+    token_ttl_seconds: float = 900.0
+    revoke_every_seconds: float = 0.0  # >0: all tokens become invalid (401) this often
+    max_concurrent_deploys: int = 0  # >0: deploys beyond this get 429
+    seed: Optional[int] = None
+
+
+def make_jwt(exp: float) -> str:
+    """Unsigned JWT carrying an exp claim (the client only reads exp)."""
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'none'})}.{encode({'exp': exp, 'jti': uuid.uuid4().hex})}.fake"
+
+
+class FakeControlRoom:
+    """Server state: issued tokens, in-flight deploys and counters."""
+
+    def __init__(self, config: FakeControlRoomConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.started_at = time.time()
+        self.tokens: Dict[str, float] = {}
+        self.in_flight = 0
+        self.counters = {
+            "auth": 0,
+            "deploys_ok": 0,
+            "deploys_401": 0,
+            "deploys_429": 0,
+            "deploys_500": 0,
+            "peak_concurrency": 0
+        }
+
+    def _revocation_epoch(self, at: float) -> int:
+        every = self.config.revoke_every_seconds
+        return int((at - self.started_at) // every) if every > 0 else 0
+
+    def issue_token(self) -> str:
+        now = time.time()
+        token = make_jwt(now + self.config.token_ttl_seconds)
+        self.tokens[token] = now
+        self.counters["auth"] += 1
+        return token
+
+    def token_valid(self, token: Optional[str]) -> bool:
+        issued_at = self.tokens.get(token or "")
+        if issued_at is None:
+            return False
+        now = time.time()
+        if now >= issued_at + self.config.token_ttl_seconds:
+            return False
+        return self._revocation_epoch(issued_at) == self._revocation_epoch(now)
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": self.in_flight, "config": asdict(self.config)}
+
+
+def create_app(config: Optional[FakeControlRoomConfig] = None) -> FastAPI:
+    """Build the fake Control Room ASGI app; its state is app.state.control_room."""
+    room = FakeControlRoom(config or FakeControlRoomConfig())
+    app = FastAPI(title="Fake AA Control Room")
+    app.state.control_room = room
+
+    @app.post("/v2/authentication")
+    async def authenticate(request: Request):
+        body = await request.json()
+        if not body.get("username") or not body.get("apiKey"):
+            return JSONResponse(status_code=400, content={"message": "username and apiKey required"})
+        await asyncio.sleep(room.config.auth_latency_ms / 1000)
+        return {"token": room.issue_token(), "user": {"username": body["username"]}}
+
+    @app.post("/v3/automations/deploy")
+    async def deploy(request: Request, x_authorization: Optional[str] = Header(None)):
+        if not room.token_valid(x_authorization):
+            room.counters["deploys_401"] += 1
+            return JSONResponse(status_code=401, content={"message": "Token expired or invalid"})
+
+        limit = room.config.max_concurrent_deploys
+        if limit > 0 and room.in_flight >= limit:
+            room.counters["deploys_429"] += 1
+            return JSONResponse(status_code=429, content={"message": "Too many concurrent deployments"})
+
+        body = await request.json()
+        room.in_flight += 1
+        room.counters["peak_concurrency"] = max(room.counters["peak_concurrency"], room.in_flight)
+        try:
+            delay = room.config.deploy_latency_ms + room.random.uniform(0, room.config.deploy_jitter_ms)
+            await asyncio.sleep(delay / 1000)
+        finally:
+            room.in_flight -= 1
+
+        if room.random.random() < room.config.error_rate:
+            room.counters["deploys_500"] += 1
+            return JSONResponse(status_code=500, content={"message": "Injected failure"})
+
+        room.counters["deploys_ok"] += 1
+        return {"deploymentId": uuid.uuid4().hex, "automationName": body.get("automationName")}
+
+    @app.get("/stats")
+    async def stats():
+        return room.stats()
+
+    return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """CLI flags for every FakeControlRoomConfig field."""
+    defaults = FakeControlRoomConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.deploy_latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.deploy_jitter_ms)
+    parser.add_argument("--auth-latency-ms", type=float, default=defaults.auth_latency_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--token-ttl", type=float, default=defaults.token_ttl_seconds)
+    parser.add_argument("--revoke-every", type=float, default=defaults.revoke_every_seconds,
+                        help="invalidate all tokens every N seconds (exercises 401 re-auth)")
+    parser.add_argument("--max-concurrent", type=int, default=defaults.max_concurrent_deploys,
+                        help="deploys beyond this many in flight get 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeControlRoomConfig:
+    return FakeControlRoomConfig(
+        deploy_latency_ms=args.latency_ms,
+        deploy_jitter_ms=args.jitter_ms,
+        auth_latency_ms=args.auth_latency_ms,
+        error_rate=args.error_rate,
+        token_ttl_seconds=args.token_ttl,
+        revoke_every_seconds=args.revoke_every,
+        max_concurrent_deploys=args.max_concurrent,
+        seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
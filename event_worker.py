@@ -0,0 +1,57 @@
+"""
+Long-running event worker.
+
+LISTENs for events_raw inserts and drains them in micro-batches through
+the Python processing pipeline, with a periodic sweep as a fallback for
+missed notifications. Run one or more instances alongside the API:
+
+    python event_worker.py
+
+Requires migrations/004_event_notify.sql (and 007_user_state_notify.sql
+for the seniority mirror).
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.event_drainer import get_event_drainer
+from app.services.event_processor import get_event_processor
+from app.services.seniority_mirror import get_seniority_mirror
+from app.config import get_settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Run the drainer until SIGINT/SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    logger.info("Event worker started")
+    
+    tasks = [get_event_drainer().run(stop)]
+    if get_settings().seniority_mirror_enabled:
+        tasks.append(get_seniority_mirror().run(stop))
+    
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await get_event_processor().close()
+    
+    logger.info("Event worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
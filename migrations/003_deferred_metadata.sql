@@ -0,0 +1,17 @@
+-- =====================================================
+-- Deferred Metadata Enrichment
+-- =====================================================
+-- Senior users processed while the community API was unavailable
+-- (circuit open, timeout or error). Their user_state/detections rows
+-- are written without country/company/joined_at and filled in later
+-- by EventProcessor.enrich_deferred_metadata (run from worker.py).
+
+CREATE TABLE IF NOT EXISTS deferred_metadata (
+    user_id TEXT PRIMARY KEY,
+    deferred_at TIMESTAMPTZ DEFAULT NOW(),
+    attempts INTEGER DEFAULT 0,
+    last_attempt_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_deferred_metadata_attempt
+    ON deferred_metadata(last_attempt_at NULLS FIRST, deferred_at);
@@ -0,0 +1,22 @@
+-- =====================================================
+-- NOTIFY on events_raw inserts
+-- =====================================================
+-- Wakes the Python event drainer (event_worker.py) as soon as events are
+-- queued, instead of waiting for the next cron poll. Statement-level so a
+-- multi-row insert sends a single notification; the drainer claims
+-- everything pending when woken, so no payload is needed.
+
+CREATE OR REPLACE FUNCTION notify_events_raw_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('events_raw_inserted', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS events_raw_notify ON events_raw;
+
+CREATE TRIGGER events_raw_notify
+    AFTER INSERT ON events_raw
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_events_raw_inserted();
@@ -0,0 +1,214 @@
+-- =====================================================
+-- Persistent Retry Queue for events_raw
+-- =====================================================
+-- Events whose processing fails are rescheduled with exponential backoff
+-- instead of being rescanned on every poll. After max_retries failed
+-- attempts the row moves to events_dead_letter, where it stays visible
+-- via GET /admin/dead-letter but no longer touches the hot drain path.
+
+ALTER TABLE events_raw
+    ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+-- Claims filter on "pending and due"
+CREATE INDEX IF NOT EXISTS idx_events_raw_due
+    ON events_raw(next_attempt_at) WHERE NOT processed;
+
+CREATE TABLE IF NOT EXISTS events_dead_letter (
+    id BIGINT PRIMARY KEY,  -- original events_raw.id
+    event_id TEXT,
+    user_id TEXT NOT NULL,
+    username TEXT,
+    profile_field TEXT,
+    value TEXT,
+    old_value TEXT,
+    idempotency_key TEXT NOT NULL,
+    received_at TIMESTAMPTZ,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    dead_lettered_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_dead_letter_at
+    ON events_dead_letter(dead_lettered_at DESC);
+
+-- =====================================================
+-- Record a failed processing attempt
+-- =====================================================
+-- Increments attempts and schedules the next one at
+-- base_delay * 2^(attempts - 1), capped at max_delay. Once attempts
+-- reaches max_retries the event is moved to events_dead_letter.
+-- Returns 'retry' or 'dead_letter' ('missing' if the row is gone).
+
+CREATE OR REPLACE FUNCTION record_event_failure(
+    p_id BIGINT,
+    p_error TEXT,
+    p_max_retries INTEGER DEFAULT 3,
+    p_base_delay_seconds DOUBLE PRECISION DEFAULT 30,
+    p_max_delay_seconds DOUBLE PRECISION DEFAULT 3600
+)
+RETURNS TEXT AS $$
+DECLARE
+    new_attempts INTEGER;
+BEGIN
+    UPDATE events_raw
+    SET
+        attempts = attempts + 1,
+        last_error = left(p_error, 2000),
+        next_attempt_at = NOW() + make_interval(secs => LEAST(
+            p_max_delay_seconds,
+            p_base_delay_seconds * power(2, attempts)
+        ))
+    WHERE id = p_id
+    RETURNING attempts INTO new_attempts;
+
+    IF new_attempts IS NULL THEN
+        RETURN 'missing';
+    END IF;
+
+    IF new_attempts < p_max_retries THEN
+        RETURN 'retry';
+    END IF;
+
+    WITH moved AS (
+        DELETE FROM events_raw WHERE id = p_id RETURNING *
+    )
+    INSERT INTO events_dead_letter (
+        id, event_id, user_id, username, profile_field, value, old_value,
+        idempotency_key, received_at, attempts, last_error
+    )
+    SELECT
+        id, event_id, user_id, username, profile_field, value, old_value,
+        idempotency_key, received_at, attempts, last_error
+    FROM moved
+    ON CONFLICT (id) DO NOTHING;
+
+    RAISE NOTICE 'Event % moved to dead letter after % attempts', p_id, new_attempts;
+    RETURN 'dead_letter';
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- Event Processing Function (retry-aware)
+-- =====================================================
+-- Same as migrations/002_serverless_functions.sql, but only claims due
+-- events and records failures per event instead of aborting the batch.
+-- p_batch_limit replaces the fixed LIMIT 100, so cron callers can pass a
+-- size (e.g. the drainer's current batch_size from GET /admin/metrics,
+-- or PROCESS_EVENTS_BATCH_LIMIT in the Edge Function).
+
+DROP FUNCTION IF EXISTS process_pending_events();
+DROP FUNCTION IF EXISTS process_pending_events(INTEGER);
+
+CREATE OR REPLACE FUNCTION process_pending_events(
+    p_max_retries INTEGER DEFAULT 3,
+    p_batch_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE(processed_count INTEGER, senior_count INTEGER) AS $$
+DECLARE
+    event_record RECORD;
+    classification RECORD;
+    total_processed INTEGER := 0;
+    total_senior INTEGER := 0;
+    total_failed INTEGER := 0;
+    user_metadata RECORD;
+BEGIN
+    -- Process due, unprocessed events (with lock to prevent concurrent processing)
+    FOR event_record IN
+        SELECT * FROM events_raw
+        WHERE NOT processed
+          AND next_attempt_at <= NOW()
+        ORDER BY received_at ASC
+        LIMIT GREATEST(p_batch_limit, 1)
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        BEGIN
+            -- Only process Job Title updates
+            IF lower(event_record.profile_field) = 'job title' THEN
+                -- Classify the title
+                SELECT * INTO classification FROM classify_job_title(event_record.value);
+
+                IF classification.is_senior THEN
+                    -- Check if user already exists
+                    SELECT * INTO user_metadata FROM user_state WHERE user_id = event_record.user_id;
+
+                    IF user_metadata IS NULL THEN
+                        -- First time detection - insert into user_state and detections
+                        INSERT INTO user_state (
+                            user_id, username, title, seniority_level,
+                            first_detected_at, last_seen_at
+                        ) VALUES (
+                            event_record.user_id,
+                            event_record.username,
+                            event_record.value,
+                            classification.seniority_level,
+                            NOW(),
+                            NOW()
+                        );
+
+                        INSERT INTO detections (
+                            user_id, username, title, seniority_level,
+                            detected_at, rules_version
+                        ) VALUES (
+                            event_record.user_id,
+                            event_record.username,
+                            event_record.value,
+                            classification.seniority_level,
+                            NOW(),
+                            'v1'
+                        );
+
+                        total_senior := total_senior + 1;
+
+                    ELSE
+                        -- Update existing user
+                        UPDATE user_state
+                        SET
+                            username = event_record.username,
+                            title = event_record.value,
+                            seniority_level = classification.seniority_level,
+                            last_seen_at = NOW()
+                        WHERE user_id = event_record.user_id;
+
+                        -- Check for promotion
+                        IF user_metadata.seniority_level = 'vp' AND classification.seniority_level = 'csuite' THEN
+                            INSERT INTO detections (
+                                user_id, username, title, seniority_level,
+                                detected_at, rules_version
+                            ) VALUES (
+                                event_record.user_id,
+                                event_record.username,
+                                event_record.value,
+                                classification.seniority_level,
+                                NOW(),
+                                'v1'
+                            );
+                            total_senior := total_senior + 1;
+                        END IF;
+                    END IF;
+                ELSE
+                    -- Not senior - remove from user_state if exists
+                    DELETE FROM user_state WHERE user_id = event_record.user_id;
+                END IF;
+            END IF;
+
+            -- Mark event as processed
+            UPDATE events_raw
+            SET processed = TRUE, processed_at = NOW()
+            WHERE id = event_record.id;
+
+            total_processed := total_processed + 1;
+        EXCEPTION WHEN OTHERS THEN
+            -- Changes for this event were rolled back; schedule a retry
+            PERFORM record_event_failure(event_record.id, SQLERRM, p_max_retries);
+            total_failed := total_failed + 1;
+        END;
+    END LOOP;
+
+    RAISE NOTICE 'Processed % events, % new senior executives, % failed',
+        total_processed, total_senior, total_failed;
+
+    RETURN QUERY SELECT total_processed, total_senior;
+END;
+$$ LANGUAGE plpgsql;
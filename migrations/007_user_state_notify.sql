@@ -0,0 +1,66 @@
+-- =====================================================
+-- NOTIFY on user_state changes
+-- =====================================================
+-- Keeps each worker's in-process seniority mirror
+-- (app/services/seniority_mirror.py) in sync. Every insert, delete and
+-- seniority_level change sends its new state; notifications are
+-- delivered on commit, in commit order, so applying them in sequence
+-- converges on the table.
+--
+-- Payload: 'U|<level>|<user_id>' or 'D||<user_id>'; '*' after TRUNCATE
+-- (listeners reload the whole table).
+--
+-- Bulk loads (backfill.py) skip the per-row notifications by setting
+--     SET LOCAL captpathfinder.skip_user_state_notify = 'on'
+-- in their transaction, then send a single '*' so listeners reload once.
+
+CREATE OR REPLACE FUNCTION notify_user_state_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('captpathfinder.skip_user_state_notify', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('user_state_changed', 'D||' || OLD.user_id);
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND NEW.user_id = OLD.user_id
+       AND NEW.seniority_level IS NOT DISTINCT FROM OLD.seniority_level THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND NEW.user_id <> OLD.user_id THEN
+        PERFORM pg_notify('user_state_changed', 'D||' || OLD.user_id);
+    END IF;
+
+    PERFORM pg_notify(
+        'user_state_changed',
+        'U|' || COALESCE(NEW.seniority_level, '') || '|' || NEW.user_id
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_user_state_truncated()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('user_state_changed', '*');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_state_notify ON user_state;
+DROP TRIGGER IF EXISTS user_state_notify_truncate ON user_state;
+
+CREATE TRIGGER user_state_notify
+    AFTER INSERT OR UPDATE OR DELETE ON user_state
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_state_changed();
+
+CREATE TRIGGER user_state_notify_truncate
+    AFTER TRUNCATE ON user_state
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_state_truncated();
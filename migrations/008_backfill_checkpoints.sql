@@ -0,0 +1,19 @@
+-- =====================================================
+-- Backfill Checkpoints
+-- =====================================================
+-- Progress of backfill.py runs. Each chunk's user_state/detections
+-- inserts and its checkpoint update commit together, so a resumed run
+-- skips exactly the input rows already written. started_at is reused as
+-- first_detected_at/detected_at for the whole run, including resumes.
+
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    run_id TEXT PRIMARY KEY,
+    source TEXT,
+    rules_version TEXT,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    seniors_found BIGINT NOT NULL DEFAULT 0,
+    seniors_inserted BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
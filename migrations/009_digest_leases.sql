@@ -0,0 +1,16 @@
+-- =====================================================
+-- Lease-based Digest Outbox
+-- =====================================================
+-- Digest senders claim rows by setting claimed_by/lease_expires_at in a
+-- single UPDATE ... RETURNING, renew the lease while a send is in
+-- progress, and release it on failure. A sender that dies mid-send stops
+-- renewing, so its digests become claimable again once the lease expires.
+-- Several worker.py instances can therefore send in parallel without
+-- double-sending.
+
+ALTER TABLE digests
+    ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_digests_claimable
+    ON digests(created_at) WHERE NOT sent;
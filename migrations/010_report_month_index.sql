@@ -0,0 +1,19 @@
+-- =====================================================
+-- Month-end report index
+-- =====================================================
+-- ReportBuilder selects a month with half-open ranges on both
+-- first_detected_at and joined_at (computed in America/New_York) and
+-- orders by first_detected_at DESC. The previous EXTRACT(YEAR/MONTH ...)
+-- filters could not use any index and scanned all of user_state.
+--
+-- Leading with first_detected_at serves the range and the ORDER BY
+-- (scanned backwards); joined_at in the key lets the second range be
+-- checked in the index before the heap is visited.
+--
+-- On a large live table, run the CREATE INDEX by hand with CONCURRENTLY
+-- (outside a transaction) before applying this migration.
+
+CREATE INDEX IF NOT EXISTS idx_user_state_report_month
+    ON user_state(first_detected_at, joined_at);
+
+ANALYZE user_state;
@@ -0,0 +1,190 @@
+-- =====================================================
+-- Incremental monthly detection rollups
+-- =====================================================
+-- monthly_rollups holds detection counts per (month, seniority_level,
+-- country), where month is the calendar month of detected_at in
+-- America/New_York. Statement-level triggers on detections apply each
+-- statement's changes as per-group deltas (one upsert per group per
+-- statement, so backfill's bulk INSERT ... SELECT costs the same as a
+-- single row):
+--
+--     INSERT    +new rows
+--     UPDATE    -old rows, +new rows (e.g. deferred metadata enrichment
+--               filling in country); groups that net to zero are skipped,
+--               so updates of other columns write nothing
+--     DELETE    -old rows
+--     TRUNCATE  empties monthly_rollups
+--
+-- The month-end summary (build_month_end_report) and GET /admin/stats
+-- read these O(groups) rows instead of scanning detections.
+--
+-- After applying this migration to a database that already has
+-- detections (done once below), or after loading detections with
+-- triggers disabled, rebuild the affected months:
+--
+--     SELECT rebuild_monthly_rollups();                          -- all
+--     SELECT rebuild_monthly_rollups('2025-11-01', '2025-12-01'); -- [from, to)
+--
+-- or: python rebuild_rollups.py --since 2025-11 --until 2025-12
+
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    month DATE NOT NULL,                -- first day of the month (New York)
+    seniority_level TEXT NOT NULL,
+    country TEXT NOT NULL,              -- 'Unknown' when the detection had none
+    detection_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (month, seniority_level, country)
+);
+
+CREATE OR REPLACE FUNCTION detection_month(ts TIMESTAMPTZ)
+RETURNS DATE AS $$
+    SELECT date_trunc('month', ts AT TIME ZONE 'America/New_York')::DATE;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION rollup_detections_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Groups are upserted in key order so concurrent inserts lock rollup
+    -- rows in the same order and cannot deadlock
+    INSERT INTO monthly_rollups AS r (month, seniority_level, country, detection_count)
+    SELECT
+        detection_month(COALESCE(detected_at, NOW())),
+        COALESCE(seniority_level, 'unknown'),
+        COALESCE(country, 'Unknown'),
+        COUNT(*)
+    FROM new_detections
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (month, seniority_level, country) DO UPDATE
+    SET detection_count = r.detection_count + EXCLUDED.detection_count,
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- UPDATE/DELETE: net per-group deltas of the removed (old) and added
+-- (new) row images, upserted in key order like inserts
+CREATE OR REPLACE FUNCTION rollup_detections_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO monthly_rollups AS r (month, seniority_level, country, detection_count)
+        SELECT month, seniority_level, country, SUM(delta)
+        FROM (
+            SELECT
+                detection_month(COALESCE(detected_at, NOW())) AS month,
+                COALESCE(seniority_level, 'unknown') AS seniority_level,
+                COALESCE(country, 'Unknown') AS country,
+                -1 AS delta
+            FROM old_detections
+            UNION ALL
+            SELECT
+                detection_month(COALESCE(detected_at, NOW())),
+                COALESCE(seniority_level, 'unknown'),
+                COALESCE(country, 'Unknown'),
+                1
+            FROM new_detections
+        ) deltas
+        GROUP BY 1, 2, 3
+        HAVING SUM(delta) <> 0
+        ORDER BY 1, 2, 3
+        ON CONFLICT (month, seniority_level, country) DO UPDATE
+        SET detection_count = r.detection_count + EXCLUDED.detection_count,
+            updated_at = NOW();
+    ELSE
+        INSERT INTO monthly_rollups AS r (month, seniority_level, country, detection_count)
+        SELECT
+            detection_month(COALESCE(detected_at, NOW())),
+            COALESCE(seniority_level, 'unknown'),
+            COALESCE(country, 'Unknown'),
+            -COUNT(*)
+        FROM old_detections
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (month, seniority_level, country) DO UPDATE
+        SET detection_count = r.detection_count + EXCLUDED.detection_count,
+            updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_detections_truncated()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE monthly_rollups;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event, and an UPDATE trigger
+-- with transition tables cannot have a column list (UPDATE OF ...)
+DROP TRIGGER IF EXISTS detections_rollup ON detections;
+DROP TRIGGER IF EXISTS detections_rollup_update ON detections;
+DROP TRIGGER IF EXISTS detections_rollup_delete ON detections;
+DROP TRIGGER IF EXISTS detections_rollup_truncate ON detections;
+
+CREATE TRIGGER detections_rollup
+    AFTER INSERT ON detections
+    REFERENCING NEW TABLE AS new_detections
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_detections_inserted();
+
+CREATE TRIGGER detections_rollup_update
+    AFTER UPDATE ON detections
+    REFERENCING OLD TABLE AS old_detections NEW TABLE AS new_detections
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_detections_changed();
+
+CREATE TRIGGER detections_rollup_delete
+    AFTER DELETE ON detections
+    REFERENCING OLD TABLE AS old_detections
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_detections_changed();
+
+CREATE TRIGGER detections_rollup_truncate
+    AFTER TRUNCATE ON detections
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_detections_truncated();
+
+-- Recompute rollups for the months overlapping [p_from, p_to) (NULL =
+-- unbounded) from detections. Returns the number of rollup rows written.
+CREATE OR REPLACE FUNCTION rebuild_monthly_rollups(
+    p_from DATE DEFAULT NULL,
+    p_to DATE DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    rows_written INTEGER;
+BEGIN
+    -- Whole months only: widen to month boundaries
+    p_from := date_trunc('month', p_from)::DATE;
+    p_to := (date_trunc('month', p_to - 1) + INTERVAL '1 month')::DATE;
+
+    -- Blocks the rollup triggers until commit: a detection changed
+    -- concurrently is either counted here or applied after the rebuild,
+    -- never both
+    LOCK TABLE monthly_rollups IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM monthly_rollups
+    WHERE (p_from IS NULL OR month >= p_from)
+      AND (p_to IS NULL OR month < p_to);
+
+    INSERT INTO monthly_rollups (month, seniority_level, country, detection_count)
+    SELECT
+        detection_month(COALESCE(detected_at, NOW())),
+        COALESCE(seniority_level, 'unknown'),
+        COALESCE(country, 'Unknown'),
+        COUNT(*)
+    FROM detections
+    WHERE (p_from IS NULL OR detected_at >= p_from::TIMESTAMP AT TIME ZONE 'America/New_York')
+      AND (p_to IS NULL OR detected_at < p_to::TIMESTAMP AT TIME ZONE 'America/New_York')
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS rows_written = ROW_COUNT;
+    RETURN rows_written;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Seed from existing detections
+SELECT rebuild_monthly_rollups();
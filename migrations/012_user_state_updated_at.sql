@@ -0,0 +1,29 @@
+-- =====================================================
+-- user_state.updated_at
+-- =====================================================
+-- Set on insert and bumped by a row trigger whenever an UPDATE actually
+-- changes a row, from any writer (event processing, deferred metadata
+-- enrichment, the SQL functions). last_seen_at only moves when a profile
+-- event arrives, so enrichment filling in country/company/joined_at was
+-- invisible to the month-end report cache; its fingerprint now includes
+-- MAX(updated_at) for the month.
+
+ALTER TABLE user_state
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION touch_user_state_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW IS DISTINCT FROM OLD THEN
+        NEW.updated_at := NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_state_touch_updated_at ON user_state;
+
+CREATE TRIGGER user_state_touch_updated_at
+    BEFORE UPDATE ON user_state
+    FOR EACH ROW
+    EXECUTE FUNCTION touch_user_state_updated_at();
@@ -0,0 +1,46 @@
+"""
+Rebuild monthly detection rollups.
+
+monthly_rollups (migrations/011_monthly_rollups.sql) is kept current by
+triggers on detections. Run this after loading detections with the
+triggers disabled, or to repair drift, to recompute the affected months
+from detections.
+
+Usage:
+    python rebuild_rollups.py                              # every month
+    python rebuild_rollups.py --since 2025-10 --until 2025-12
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.rollups import get_monthly_rollups
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--since", help="first month to rebuild, YYYY-MM (default: earliest)")
+    parser.add_argument("--until", help="month to stop before, YYYY-MM (default: latest)")
+    parser.add_argument("--show", metavar="YYYY-MM", help="print this month's summary afterwards")
+    args = parser.parse_args()
+
+    rollups = get_monthly_rollups()
+    result = {"rows_written": rollups.rebuild(args.since, args.until)}
+    if args.show:
+        result["summary"] = rollups.month_summary(args.show)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Historical event replay.
+
+Streams historical events through the full EventProcessor pipeline against
+a scratch database and reports throughput, per-stage latency percentiles
+and the resulting user_state diff. Use it to size capacity before
+onboarding a community, or to check a rules change against real traffic.
+
+Sources:
+    --ndjson FILE       one webhook payload (JSON object) per line
+    --source-db URL     events_raw rows from another database (streamed)
+
+Usage:
+    python replay.py --target-db postgresql://.../scratch --ndjson webhooks.ndjson
+    python replay.py --target-db postgresql://.../scratch \\
+        --source-db "$SUPABASE_DB_URL" --since 2025-10-01 --limit 100000
+
+The target database must already have the schema (migrations/*.sql).
+Metadata lookups are skipped unless --metadata api is given, so replays
+never hit the community API by accident.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import get_settings
+from app.models import WebhookEvent
+from app.utils.metrics import StageTimer
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("replay")
+
+# Accept both the API's camelCase fields and the Edge Function's snake_case
+FIELD_ALIASES = {
+    "user_id": "userId",
+    "profile_field": "profileField",
+    "old_value": "oldValue",
+    "profile_field_id": "profileFieldId",
+}
+
+
+def parse_payload(payload: dict) -> WebhookEvent:
+    """Build a WebhookEvent from a webhook payload or events_raw row."""
+    data = {FIELD_ALIASES.get(key, key): value for key, value in payload.items()}
+    data.setdefault("username", "Unknown")
+    data["username"] = data["username"] or "Unknown"
+    data["profileField"] = data.get("profileField") or ""
+    data["value"] = data.get("value") or ""
+    return WebhookEvent(**{k: v for k, v in data.items() if k in WebhookEvent.model_fields})
+
+
+def read_ndjson(path: str) -> Iterator[WebhookEvent]:
+    """Stream events from an NDJSON export."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield parse_payload(json.loads(line))
+            except Exception as e:
+                logger.warning(f"Skipping line {line_no}: {e}")
+
+
+def read_events_raw(
+    url: str,
+    since: Optional[str],
+    until: Optional[str],
+    limit: Optional[int]
+) -> Iterator[WebhookEvent]:
+    """Stream events_raw rows from a source database (server-side cursor)."""
+    query = """
+        SELECT user_id, username, profile_field, value, old_value
+        FROM events_raw
+        WHERE (%(since)s::timestamptz IS NULL OR received_at >= %(since)s)
+          AND (%(until)s::timestamptz IS NULL OR received_at < %(until)s)
+        ORDER BY received_at, id
+    """
+    if limit:
+        query += " LIMIT %(limit)s"
+
+    with psycopg.connect(url, row_factory=dict_row) as conn:
+        with conn.cursor(name="replay_events") as cur:
+            cur.itersize = 2000
+            cur.execute(query, {"since": since, "until": until, "limit": limit})
+            for row in cur:
+                yield parse_payload(row)
+
+
+def snapshot_user_state(url: str) -> Dict[str, Tuple[str, str]]:
+    """Map user_id -> (seniority_level, title) for the target database."""
+    with psycopg.connect(url) as conn:
+        with conn.cursor(name="replay_snapshot") as cur:
+            cur.itersize = 10000
+            cur.execute("SELECT user_id, seniority_level, title FROM user_state")
+            return {user_id: (level, title) for user_id, level, title in cur}
+
+
+def diff_user_state(
+    before: Dict[str, Tuple[str, str]],
+    after: Dict[str, Tuple[str, str]],
+    sample_size: int = 10
+) -> dict:
+    """Summarize how user_state changed during the replay."""
+    added = sorted(after.keys() - before.keys())
+    removed = sorted(before.keys() - after.keys())
+    common = before.keys() & after.keys()
+    level_changed = sorted(u for u in common if before[u][0] != after[u][0])
+    title_changed = sorted(
+        u for u in common if before[u][1] != after[u][1] and before[u][0] == after[u][0]
+    )
+
+    return {
+        "before": len(before),
+        "after": len(after),
+        "added": len(added),
+        "removed": len(removed),
+        "level_changed": len(level_changed),
+        "title_changed": len(title_changed),
+        "samples": {
+            "added": [{"user_id": u, "level": after[u][0], "title": after[u][1]} for u in added[:sample_size]],
+            "removed": [{"user_id": u, "level": before[u][0], "title": before[u][1]} for u in removed[:sample_size]],
+            "level_changed": [
+                {"user_id": u, "from": before[u][0], "to": after[u][0], "title": after[u][1]}
+                for u in level_changed[:sample_size]
+            ]
+        }
+    }
+
+
+async def replay(events: Iterator[WebhookEvent], batch_size: int) -> dict:
+    """Feed events through EventProcessor in batches, timing each stage."""
+    from app.services.event_processor import get_event_processor
+
+    processor = get_event_processor()
+    timer = StageTimer()
+    statuses: Dict[str, int] = {}
+    errors = 0
+    total = 0
+
+    async def run_batch(batch: List[WebhookEvent]):
+        nonlocal errors
+        # A bad event does not sink the batch: its exception is returned in
+        # its place and the events after it are still processed (retrying
+        # the whole batch would find the stored ones as duplicates)
+        results = await processor.process_event_batch(batch, timer, return_exceptions=True)
+        for event, result in zip(batch, results):
+            if isinstance(result, Exception):
+                errors += 1
+                logger.error(f"Event for user {event.userId} failed: {result}")
+                continue
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    start = time.perf_counter()
+    batch: List[WebhookEvent] = []
+    for event in events:
+        batch.append(event)
+        total += 1
+        if len(batch) >= batch_size:
+            await run_batch(batch)
+            batch = []
+    if batch:
+        await run_batch(batch)
+    processor.processed_batcher.flush()
+    elapsed = time.perf_counter() - start
+
+    await processor.close()
+
+    return {
+        "events": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "events_per_sec": round(total / elapsed, 1) if elapsed else 0.0,
+        "statuses": statuses,
+        "errors": errors,
+        "stage_latency": timer.summary(),
+        "metadata_cache": processor.metadata_cache.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ndjson", help="NDJSON file of webhook payloads")
+    source.add_argument("--source-db", help="database to read events_raw from")
+    parser.add_argument("--target-db", required=True, help="scratch database to replay into")
+    parser.add_argument("--since", help="events_raw received_at lower bound (inclusive)")
+    parser.add_argument("--until", help="events_raw received_at upper bound (exclusive)")
+    parser.add_argument("--limit", type=int, help="max events to read from --source-db")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--metadata", choices=["skip", "api"], default="skip",
+                        help="skip metadata lookups (default) or call the community API")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--allow-configured-db", action="store_true",
+                        help="allow --target-db to equal SUPABASE_DB_URL")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if args.target_db == settings.supabase_db_url and not args.allow_configured_db:
+        parser.error("--target-db is the configured SUPABASE_DB_URL; use a scratch database")
+
+    # Point the app at the scratch database before anything connects
+    settings.supabase_db_url = args.target_db
+    if args.metadata == "skip":
+        settings.community_api_url = None
+
+    if args.ndjson:
+        events = read_ndjson(args.ndjson)
+    else:
+        events = read_events_raw(args.source_db, args.since, args.until, args.limit)
+
+    before = snapshot_user_state(args.target_db)
+    report = asyncio.run(replay(events, args.batch_size))
+    report["user_state_diff"] = diff_user_state(before, snapshot_user_state(args.target_db))
+
+    output = json.dumps(report, indent=2, default=str)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,76 +5,67 @@
 -- =====================================================
 -- Weekly Digest Builder Function
 -- =====================================================
-CREATE OR REPLACE FUNCTION build_weekly_digest()
+-- Set-based: one statement claims the week's undigested detections
+-- (UPDATE ... RETURNING), numbers them into chunks of p_chunk_size with
+-- row_number(), and inserts every chunk for every channel. Claiming and
+-- chunking happen in the same statement, so a detection is marked
+-- included_in_digest only if it was written into a digest; a concurrent
+-- run blocks on the claimed rows and then skips them.
+DROP FUNCTION IF EXISTS build_weekly_digest();
+
+CREATE OR REPLACE FUNCTION build_weekly_digest(p_chunk_size INTEGER DEFAULT 10)
 RETURNS TABLE(digests_created INTEGER) AS $$
 DECLARE
     week_start_date DATE;
     week_end_date DATE;
-    digest_count INTEGER := 0;
-    rec RECORD;
-    digest_payload JSONB;
-    chunk_array JSONB[];
-    chunk JSONB;
+    digest_count INTEGER;
 BEGIN
     -- Calculate week window (last 7 days)
     week_end_date := CURRENT_DATE;
-    week_start_date := week_end_date - INTERVAL '7 days';
+    week_start_date := week_end_date - 7;
     
     RAISE NOTICE 'Building weekly digest for % to %', week_start_date, week_end_date;
     
-    -- Process for each channel: email and teams
-    FOR rec IN (
-        SELECT 'email' AS channel
-        UNION ALL
-        SELECT 'teams' AS channel
-    ) LOOP
-        -- Get all detections from the past week that haven't been included in a digest yet
-        chunk_array := ARRAY[]::JSONB[];
-        
-        FOR digest_payload IN (
-            SELECT jsonb_build_object(
-                'user_id', d.user_id,
-                'username', d.username,
-                'title', d.title,
-                'seniority_level', d.seniority_level,
-                'country', d.country,
-                'company', d.company,
-                'joined_at', d.joined_at,
-                'detected_at', d.detected_at
-            )
-            FROM detections d
-            WHERE d.detected_at >= week_start_date
-              AND d.detected_at <= week_end_date
-              AND NOT d.included_in_digest
-            ORDER BY d.detected_at DESC
-        ) LOOP
-            chunk_array := chunk_array || digest_payload;
-            
-            -- If we have 10 items, create a digest
-            IF array_length(chunk_array, 1) = 10 THEN
-                INSERT INTO digests (week_start, week_end, channel, payload)
-                VALUES (week_start_date, week_end_date, rec.channel, 
-                        jsonb_build_object('users', to_jsonb(chunk_array)));
-                digest_count := digest_count + 1;
-                chunk_array := ARRAY[]::JSONB[];
-            END IF;
-        END LOOP;
-        
-        -- Create digest for remaining items (if any)
-        IF array_length(chunk_array, 1) > 0 THEN
-            INSERT INTO digests (week_start, week_end, channel, payload)
-            VALUES (week_start_date, week_end_date, rec.channel,
-                    jsonb_build_object('users', to_jsonb(chunk_array)));
-            digest_count := digest_count + 1;
-        END IF;
-    END LOOP;
-    
-    -- Mark all detections from this week as included in digest
-    UPDATE detections
-    SET included_in_digest = TRUE
-    WHERE detected_at >= week_start_date
-      AND detected_at <= week_end_date
-      AND NOT included_in_digest;
+    WITH claimed AS (
+        UPDATE detections d
+        SET included_in_digest = TRUE
+        WHERE d.detected_at >= week_start_date
+          AND d.detected_at <= week_end_date
+          AND NOT d.included_in_digest
+        RETURNING d.id, d.user_id, d.username, d.title, d.seniority_level,
+                  d.country, d.company, d.joined_at, d.detected_at
+    ),
+    numbered AS (
+        SELECT
+            c.id,
+            c.detected_at,
+            (row_number() OVER (ORDER BY c.detected_at DESC, c.id) - 1) / p_chunk_size AS chunk,
+            jsonb_build_object(
+                'user_id', c.user_id,
+                'username', c.username,
+                'title', c.title,
+                'seniority_level', c.seniority_level,
+                'country', c.country,
+                'company', c.company,
+                'joined_at', c.joined_at,
+                'detected_at', c.detected_at
+            ) AS entry
+        FROM claimed c
+    ),
+    chunks AS (
+        SELECT chunk, jsonb_agg(entry ORDER BY detected_at DESC, id) AS users
+        FROM numbered
+        GROUP BY chunk
+    ),
+    inserted AS (
+        INSERT INTO digests (week_start, week_end, channel, payload)
+        SELECT week_start_date, week_end_date, ch.channel, jsonb_build_object('users', c.users)
+        FROM chunks c
+        CROSS JOIN (VALUES ('email'), ('teams')) AS ch(channel)
+        ORDER BY ch.channel, c.chunk
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER INTO digest_count FROM inserted;
     
     RAISE NOTICE 'Created % digest records', digest_count;
     RETURN QUERY SELECT digest_count;
@@ -87,42 +78,43 @@ $$ LANGUAGE plpgsql;
 CREATE OR REPLACE FUNCTION build_month_end_report()
 RETURNS TABLE(report_id BIGINT) AS $$
 DECLARE
-    month_start TIMESTAMPTZ;
-    month_end TIMESTAMPTZ;
+    report_month DATE;
     month_label TEXT;
     report_summary JSONB;
     new_report_id BIGINT;
 BEGIN
-    -- Calculate current month in EST
-    month_start := date_trunc('month', CURRENT_TIMESTAMP);
-    month_end := month_start + INTERVAL '1 month' - INTERVAL '1 second';
-    month_label := to_char(month_start, 'YYYY-MM');
+    -- Current month in EST
+    report_month := detection_month(CURRENT_TIMESTAMP);
+    month_label := to_char(report_month, 'YYYY-MM');
     
     RAISE NOTICE 'Building month-end report for %', month_label;
     
-    -- Build summary statistics
+    -- Build summary statistics from the month's rollups
+    -- (monthly_rollups, migrations/011_monthly_rollups.sql). Countries are
+    -- summed across seniority levels so each appears once.
     SELECT jsonb_build_object(
         'month', month_label,
-        'total_detections', COUNT(*),
-        'csuite_count', COUNT(*) FILTER (WHERE seniority_level = 'csuite'),
-        'vp_count', COUNT(*) FILTER (WHERE seniority_level = 'vp'),
-        'countries', jsonb_object_agg(COALESCE(country, 'Unknown'), country_count)
+        'total_detections', COALESCE(SUM(detection_count), 0),
+        'csuite_count', COALESCE(SUM(detection_count) FILTER (WHERE seniority_level = 'csuite'), 0),
+        'vp_count', COALESCE(SUM(detection_count) FILTER (WHERE seniority_level = 'vp'), 0),
+        'countries', COALESCE((
+            SELECT jsonb_object_agg(country, country_count)
+            FROM (
+                SELECT country, SUM(detection_count) AS country_count
+                FROM monthly_rollups
+                WHERE month = report_month
+                GROUP BY country
+                HAVING SUM(detection_count) > 0
+            ) by_country
+        ), '{}'::JSONB)
     )
     INTO report_summary
-    FROM (
-        SELECT 
-            seniority_level,
-            country,
-            COUNT(*) as country_count
-        FROM detections
-        WHERE detected_at >= month_start
-          AND detected_at <= month_end
-        GROUP BY seniority_level, country
-    ) subq;
+    FROM monthly_rollups
+    WHERE month = report_month;
     
     -- Insert report record (file generation happens in Python service)
     INSERT INTO reports (month_label, rules_version, summary)
-    VALUES (month_label, 'v1', COALESCE(report_summary, '{}'::JSONB))
+    VALUES (month_label, 'v1', report_summary)
     RETURNING id INTO new_report_id;
     
     RAISE NOTICE 'Created report record with ID %', new_report_id;
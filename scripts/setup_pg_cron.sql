@@ -13,12 +13,18 @@ CREATE EXTENSION IF NOT EXISTS pg_cron;
 -- =====================================================
 -- Weekly Digest Job
 -- =====================================================
--- Runs every Friday at 5 PM EST
-SELECT cron.schedule(
-    'weekly-digest',           -- job name
-    '0 17 * * FRI',           -- cron expression (5 PM every Friday)
-    $$SELECT build_weekly_digest();$$
-);
+-- Weekly digests are built by the Python DigestBuilder, which packs users
+-- by rendered message size (build_weekly_digest() in create_functions.sql
+-- uses fixed 10-user chunks). It is not scheduled here; run the worker
+-- with --build-digests every Friday at 5 PM Eastern instead, e.g. crontab:
+--
+--     CRON_TZ=America/New_York
+--     0 17 * * FRI  cd /path/to/captpathfinder && python worker.py --build-digests
+--
+-- or have your scheduler call POST /admin/build-digests.
+--
+-- Remove the SQL job if an earlier version of this script scheduled it
+SELECT cron.unschedule(jobid) FROM cron.job WHERE jobname = 'weekly-digest';
 
 -- =====================================================
 -- Month-End Report Job
@@ -68,7 +74,6 @@ SELECT cron.schedule(
 -- To remove a job, use:
 -- SELECT cron.unschedule('job-name');
 -- Example:
--- SELECT cron.unschedule('weekly-digest');
 -- SELECT cron.unschedule('month-end-report');
 -- SELECT cron.unschedule('housekeeping');
 
@@ -76,7 +81,6 @@ SELECT cron.schedule(
 -- Manual Testing
 -- =====================================================
 -- To manually trigger the jobs for testing:
--- SELECT build_weekly_digest();
 -- SELECT build_month_end_report();
 -- SELECT purge_old_events();
 
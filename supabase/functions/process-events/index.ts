@@ -25,7 +25,11 @@ serve(async (req) => {
     console.log('Processing pending events...')
     
     // Call PostgreSQL function to process events
-    const { data, error } = await supabase.rpc('process_pending_events')
+    // Optional claim size override (defaults to 100 in SQL)
+    const batchLimit = Deno.env.get('PROCESS_EVENTS_BATCH_LIMIT')
+    const { data, error } = batchLimit
+      ? await supabase.rpc('process_pending_events', { p_batch_limit: parseInt(batchLimit, 10) })
+      : await supabase.rpc('process_pending_events')
     
     if (error) {
       throw error
@@ -16,6 +16,11 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 }
 
+// Events are classified inline below, so they are stored not due for this
+// long; the event drainer and process_pending_events() skip them meanwhile
+// (same as INLINE_PROCESSING_LEASE_SECONDS in the Python API)
+const INLINE_PROCESSING_LEASE_MS = 60_000
+
 serve(async (req) => {
   // Handle CORS preflight
   if (req.method === 'OPTIONS') {
@@ -128,7 +133,8 @@ serve(async (req) => {
         value: value,
         old_value: oldValue,
         idempotency_key: idempotencyKey,
-        processed: false
+        processed: false,
+        next_attempt_at: new Date(Date.now() + INLINE_PROCESSING_LEASE_MS).toISOString()
       })
       .select()
       .single()
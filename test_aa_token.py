@@ -0,0 +1,116 @@
+"""
+Tests for Automation Anywhere token management.
+
+Run with: python -m pytest test_aa_token.py
+"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+
+from app.services.aa_integration import (
+    AutomationAnywhereClient, TokenManager, parse_token_expiry
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_jwt(exp):
+    body = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=").decode()
+    return f"header.{body}.signature"
+
+
+def test_parse_token_expiry():
+    assert parse_token_expiry(make_jwt(1700000000)) == 1700000000.0
+    assert parse_token_expiry("opaque-token") is None
+
+
+def test_single_flight_refresh():
+    """Concurrent callers share one authentication."""
+    calls = []
+
+    async def authenticate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"token-{len(calls)}", None
+
+    manager = TokenManager(authenticate, default_ttl_seconds=900, refresh_margin_seconds=60)
+
+    async def run():
+        return await asyncio.gather(*(manager.get_token() for _ in range(10)))
+
+    assert set(asyncio.run(run())) == {"token-1"}
+    assert len(calls) == 1
+
+
+def test_proactive_refresh_before_expiry():
+    clock = FakeClock()
+    issued = []
+
+    async def authenticate():
+        issued.append(clock.now)
+        return f"token-{len(issued)}", clock.now + 300
+
+    manager = TokenManager(authenticate, 900, refresh_margin_seconds=60, clock=clock)
+
+    async def run():
+        assert await manager.get_token() == "token-1"
+        clock.now += 200
+        assert await manager.get_token() == "token-1"
+        # Inside the refresh margin: renewed before it actually expires
+        clock.now += 50
+        assert await manager.get_token() == "token-2"
+
+    asyncio.run(run())
+
+
+def test_rejected_token_refreshed_once():
+    """Callers reporting the same rejected token trigger one re-auth."""
+    calls = []
+
+    async def authenticate():
+        calls.append(1)
+        return f"token-{len(calls)}", None
+
+    manager = TokenManager(authenticate, 900, 60)
+
+    async def run():
+        stale = await manager.get_token()
+        tokens = await asyncio.gather(*(manager.refresh(rejected_token=stale) for _ in range(5)))
+        return set(tokens)
+
+    assert asyncio.run(run()) == {"token-2"}
+    assert len(calls) == 2
+    assert manager.stats()["forced_refreshes"] == 1
+
+
+def test_deploy_reauthenticates_on_401_without_retrying():
+    """A revoked token costs one re-auth, not a tenacity retry."""
+    requests = []
+    tokens = iter(["token-a", "token-b"])
+
+    def handler(request):
+        requests.append((request.url.path, request.headers.get("X-Authorization")))
+        if request.url.path.endswith("/authentication"):
+            return httpx.Response(200, json={"token": next(tokens)})
+        if request.headers.get("X-Authorization") == "token-a":
+            return httpx.Response(401, json={"message": "expired"})
+        return httpx.Response(200, json={"deploymentId": "d-1"})
+
+    client = AutomationAnywhereClient()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    result = asyncio.run(client._deploy_bot("123", {"k": "v"}, "Email Bot"))
+
+    assert result == {"deploymentId": "d-1"}
+    deploys = [auth for path, auth in requests if path.endswith("/deploy")]
+    assert deploys == ["token-a", "token-b"]
+    assert client._deploy_bot.retry.statistics["attempt_number"] == 1
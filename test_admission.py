@@ -0,0 +1,114 @@
+"""
+Tests for webhook admission control.
+
+Run with: python -m pytest test_admission.py
+"""
+
+import asyncio
+
+import httpx
+
+from app.utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_rejects_when_queue_full():
+    """Requests beyond in-flight + queue capacity get an immediate 429."""
+    controller = AdmissionController(
+        max_in_flight=1, max_queue=1, queue_timeout_seconds=1.0, retry_after_seconds=7
+    )
+    release = None
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        try:
+            async with controller.admit():
+                pass
+            assert False, "expected rejection"
+        except AdmissionRejected as e:
+            assert e.status_code == 429
+            assert e.retry_after == 7
+        release.set()
+        await asyncio.gather(holder, queued)
+
+    asyncio.run(run())
+    stats = controller.stats()
+    assert stats["admitted"] == 2
+    assert stats["rejected_queue_full"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_rejects_on_queue_timeout():
+    """A queued request that cannot get a slot in time gets a 503."""
+    controller = AdmissionController(
+        max_in_flight=1, max_queue=10, queue_timeout_seconds=0.01, retry_after_seconds=1
+    )
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        try:
+            async with controller.admit():
+                pass
+            assert False, "expected rejection"
+        except AdmissionRejected as e:
+            assert e.status_code == 503
+        release.set()
+        await holder
+
+    asyncio.run(run())
+    assert controller.stats()["rejected_timeout"] == 1
+    assert controller.stats()["queue_depth"] == 0
+
+
+def test_webhook_route_sheds_with_retry_after(monkeypatch):
+    """Over capacity the webhook route returns 429 with Retry-After."""
+    from app import main
+    from app.services.event_processor import get_event_processor
+
+    monkeypatch.setattr(main, "_webhook_admission", AdmissionController(
+        max_in_flight=1, max_queue=0, queue_timeout_seconds=1.0, retry_after_seconds=3
+    ))
+
+    processor = get_event_processor()
+
+    async def slow_process_event(event):
+        await asyncio.sleep(0.05)
+        return {"status": "processed", "user_id": event.userId}
+
+    monkeypatch.setattr(processor, "process_event", slow_process_event)
+
+    payload = {
+        "userId": "1",
+        "username": "Test",
+        "profileField": "Job Title",
+        "value": "CEO"
+    }
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/webhooks/community", json=payload),
+                client.post("/webhooks/community", json=payload)
+            )
+
+    responses = asyncio.run(run())
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [200, 429]
+    rejected = next(r for r in responses if r.status_code == 429)
+    assert rejected.headers["Retry-After"] == "3"
@@ -0,0 +1,149 @@
+"""
+Tests for the backfill command's streaming and classification helpers.
+
+Run with: python -m pytest test_backfill.py
+"""
+
+from datetime import datetime
+
+from backfill import chunked, classify_chunk, normalize, read_export
+
+
+def test_normalize_accepts_export_field_variants():
+    assert normalize({"id": 7, "username": "A", "title": "CEO", "joinedAt": "2024-01-02"}) == (
+        "7", "A", "CEO", None, None, "2024-01-02"
+    )
+    assert normalize({"user_id": "u1", "title": ""}) is None
+
+
+def test_classify_chunk_keeps_only_seniors():
+    rows = [
+        ("u1", "Ann", "Chief Executive Officer", "US", "Acme", "2024-01-02T00:00:00Z"),
+        ("u2", "Bob", "Software Engineer", None, None, None),
+        None,
+        ("u3", "Cy", "VP Sales", None, None, "not a date"),
+    ]
+    seniors = classify_chunk(rows)
+    assert [(r[0], r[3]) for r in seniors] == [("u1", "csuite"), ("u3", "vp")]
+    assert seniors[0][6] == "2024-01-02T00:00:00+00:00"
+    # Unparseable dates are dropped rather than failing the COPY
+    assert seniors[1][6] is None
+
+
+def test_read_export_keeps_positions(tmp_path):
+    """Unusable rows still count, so checkpoints line up with input rows."""
+    export = tmp_path / "users.ndjson"
+    export.write_text('{"id": "1", "title": "CEO"}\nnot json\n{"id": "2"}\n')
+    rows = list(read_export(str(export), "ndjson"))
+    assert len(rows) == 3
+    assert rows[1] is None and rows[2] is None
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+class FakeCopy:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakeConnection:
+    """Records statements per transaction (split on commit)."""
+
+    def __init__(self, inserted_per_chunk):
+        self.inserted_per_chunk = inserted_per_chunk
+        self.statements = []
+        self.committed = []
+        self.copied = []
+        self.rowcount = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append(query)
+        if query.startswith("WITH inserted"):
+            self.rowcount = self.inserted_per_chunk
+
+    def fetchone(self):
+        return {
+            "rows_done": 0, "seniors_found": 0, "seniors_inserted": 0,
+            "started_at": datetime(2025, 11, 24), "completed_at": None
+        }
+
+    def copy(self, statement):
+        return FakeCopy(self.copied)
+
+    def commit(self):
+        self.committed.append(self.statements)
+        self.statements = []
+
+    def rollback(self):
+        self.statements = []
+
+    def close(self):
+        pass
+
+
+class FakeDb:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_connection(self):
+        return self.conn
+
+
+def make_writer(monkeypatch, inserted_per_chunk):
+    import backfill
+
+    conn = FakeConnection(inserted_per_chunk)
+    monkeypatch.setattr(backfill, "get_db", lambda: FakeDb(conn))
+    return backfill.BackfillWriter("run", "members.csv", include_in_digest=False), conn
+
+
+def notifications(conn):
+    return [q for tx in conn.committed for q in tx if "pg_notify" in q]
+
+
+def test_chunks_skip_row_notifications_and_run_notifies_once(monkeypatch):
+    """Mirrors get one reload for the run, not one NOTIFY per backfilled user."""
+    writer, conn = make_writer(monkeypatch, inserted_per_chunk=2)
+    senior = ("u1", "Ann", "CEO", "csuite", None, None, None)
+
+    for _ in range(3):
+        writer.write_chunk(10, [senior, senior])
+    chunk = conn.committed[-1]
+    assert chunk[0] == "SET LOCAL captpathfinder.skip_user_state_notify = 'on'"
+    assert chunk[1].startswith("WITH inserted")
+    assert notifications(conn) == []
+
+    writer.finish()
+
+    assert notifications(conn) == ["SELECT pg_notify('user_state_changed', '*')"]
+    assert writer.seniors_inserted == 6
+
+
+def test_run_without_new_users_sends_no_reload(monkeypatch):
+    writer, conn = make_writer(monkeypatch, inserted_per_chunk=0)
+
+    writer.write_chunk(10, [("u1", "Ann", "CEO", "csuite", None, None, None)])
+    writer.finish()
+
+    assert notifications(conn) == []
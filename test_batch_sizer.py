@@ -0,0 +1,73 @@
+"""
+Tests for adaptive drainer batch sizing.
+
+Run with: python -m pytest test_batch_sizer.py
+"""
+
+from app.utils.batch_sizer import (
+    AdaptiveBatchSizer, BACKLOG, LATENCY, QUIET, STEADY
+)
+
+
+def make_sizer(**overrides):
+    options = dict(
+        initial_size=100,
+        min_size=10,
+        max_size=1000,
+        target_latency_seconds=0.5
+    )
+    options.update(overrides)
+    return AdaptiveBatchSizer(**options)
+
+
+def last_reason(sizer):
+    return sizer.stats()["last_decision"]["reason"]
+
+
+def test_grows_under_backlog_with_headroom():
+    """A full, fast batch with work waiting grows the next claim."""
+    sizer = make_sizer()
+    assert sizer.observe(claimed=100, latency_seconds=0.1, claim_seconds=0.01, backlog=5000) == 200
+    assert last_reason(sizer) == BACKLOG
+
+
+def test_growth_capped_by_max_size():
+    sizer = make_sizer(initial_size=800)
+    assert sizer.observe(800, 0.1, 0.01, 5000) == 1000
+
+
+def test_shrinks_towards_latency_target():
+    """A slow batch scales the claim to what would have met the target."""
+    sizer = make_sizer()
+    assert sizer.observe(100, 1.0, 0.01, 5000) == 50
+    assert last_reason(sizer) == LATENCY
+
+
+def test_slow_claim_alone_does_not_shrink():
+    """Claim time is recorded, but only the batch latency drives sizing."""
+    sizer = make_sizer()
+    assert sizer.observe(100, 0.25, 0.2, 5000) == 200
+    assert last_reason(sizer) == BACKLOG
+    assert sizer.stats()["last_decision"]["claim_ms"] == 200.0
+
+
+def test_quiet_drifts_down_to_min():
+    """Empty or near-empty polls shrink the claim, never below min_size."""
+    sizer = make_sizer()
+    for _ in range(10):
+        sizer.observe(0, 0.001, 0.001, 0)
+    assert sizer.batch_size == 10
+    assert last_reason(sizer) == QUIET
+    assert sizer.stats()["decisions"][QUIET] == 10
+
+
+def test_steady_when_short_batch_with_backlog():
+    """Rows locked by another drainer: keep the size."""
+    sizer = make_sizer()
+    assert sizer.observe(60, 0.2, 0.01, 40) == 100
+    assert last_reason(sizer) == STEADY
+
+
+def test_initial_size_clamped():
+    assert make_sizer(initial_size=5).batch_size == 10
+    assert make_sizer(initial_size=5000).batch_size == 1000
@@ -0,0 +1,183 @@
+"""
+Tests for the circuit breaker and deferred metadata handling.
+
+Run with: python -m pytest test_circuit_breaker.py
+"""
+
+import asyncio
+
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock, **overrides):
+    options = dict(
+        failure_rate_threshold=0.5,
+        slow_call_seconds=1.0,
+        slow_call_rate_threshold=0.5,
+        window_size=10,
+        minimum_calls=4,
+        open_seconds=30,
+        half_open_max_calls=2,
+        clock=clock
+    )
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_failure_rate():
+    """Breaker opens once the failure rate crosses the threshold."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for failed in (False, True, False, True):
+        assert breaker.allow_request()
+        breaker.record(failed=failed, duration=0.1)
+
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow_request()
+
+
+def test_opens_on_slow_calls():
+    """Successful but slow calls also trip the breaker."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for _ in range(4):
+        breaker.allow_request()
+        breaker.record(failed=False, duration=2.0)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_recovers():
+    """After the open period, successful probes close the breaker."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.allow_request()
+        breaker.record(failed=True, duration=0.1)
+    assert breaker.state == OPEN
+
+    clock.now = 31
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    # Probe slots exhausted
+    assert not breaker.allow_request()
+
+    breaker.record(failed=False, duration=0.1)
+    breaker.record(failed=False, duration=0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_failure_reopens():
+    """A failed probe reopens the breaker and counts another trip."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.allow_request()
+        breaker.record(failed=True, duration=0.1)
+
+    clock.now = 31
+    assert breaker.allow_request()
+    breaker.record(failed=True, duration=0.1)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+
+def test_call_timeout_counts_as_failure():
+    """The latency budget cancels slow calls and records a failure."""
+    breaker = CircuitBreaker("test", minimum_calls=1, failure_rate_threshold=1.0)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def run():
+        try:
+            await breaker.call(slow, timeout=0.01)
+            assert False, "expected timeout"
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await breaker.call(slow, timeout=0.01)
+            assert False, "expected rejection"
+        except CircuitOpenError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.stats()["failures"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_open_breaker_defers_metadata(monkeypatch):
+    """Lookups rejected by an open breaker are reported as deferred."""
+    from app.config import get_settings
+    from app.services.event_processor import EventProcessor
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "community_api_url", "http://community.test")
+
+    processor = EventProcessor()
+    processor.community_breaker._transition(OPEN)
+
+    metadata, deferred = asyncio.run(processor._resolve_user_metadata("u1"))
+    assert metadata is None
+    assert deferred is True
+
+
+def test_acquire_runs_only_for_admitted_calls_and_is_not_timed():
+    """An open breaker rejects before acquire; waiting in acquire is not latency."""
+    clock = FakeClock()
+    breaker = make_breaker(clock, minimum_calls=1)
+    acquired = []
+
+    async def acquire():
+        acquired.append(clock.now)
+        # A long rate-limit wait, past slow_call_seconds
+        clock.now += 5.0
+
+    async def fetch():
+        return "ok"
+
+    async def run():
+        assert await breaker.call(fetch, acquire=acquire) == "ok"
+        breaker._transition(OPEN)
+        try:
+            await breaker.call(fetch, acquire=acquire)
+            assert False, "expected rejection"
+        except CircuitOpenError:
+            pass
+
+    asyncio.run(run())
+    assert len(acquired) == 1
+    assert breaker.stats()["slow_calls"] == 0
+
+
+def test_open_breaker_does_not_spend_rate_limit_tokens(monkeypatch):
+    """Metadata lookups rejected by the breaker leave the token bucket alone."""
+    from app.config import get_settings
+    from app.services.event_processor import EventProcessor
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "community_api_url", "http://community.test")
+
+    processor = EventProcessor()
+    processor.community_breaker._transition(OPEN)
+    tokens = processor.metadata_rate_limiter._tokens
+
+    for user_id in ("u1", "u2", "u3"):
+        assert asyncio.run(processor._resolve_user_metadata(user_id)) == (None, True)
+
+    assert processor.metadata_rate_limiter.stats()["acquired"] == 0
+    assert processor.metadata_rate_limiter._tokens == tokens
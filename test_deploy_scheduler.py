@@ -0,0 +1,270 @@
+"""
+Tests for the AA deploy scheduler.
+
+Run with: python -m pytest test_deploy_scheduler.py
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import httpx
+
+from app.models import DigestEntry, DigestPayload
+from app.services.aa_integration import (
+    PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL,
+    AutomationAnywhereClient, DeployCancelledError, DeployScheduler,
+    digest_message_bytes, merge_digests
+)
+
+
+def make_entry(user_id, level="vp"):
+    return DigestEntry(
+        user_id=user_id, username=user_id, title="Title", seniority_level=level,
+        country=None, company=None, joined_at=None, detected_at=datetime(2025, 11, 24)
+    )
+
+
+def make_digest(channel, users, week_start="2025-11-24"):
+    return DigestPayload(
+        week_start=week_start, week_end="2025-11-30", channel=channel,
+        users=users, total_count=len(users)
+    )
+
+
+def test_priority_order_and_max_in_flight():
+    scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+    started = []
+    active = peak = 0
+
+    async def run(payload, priority):
+        nonlocal active, peak
+        started.append(payload)
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return payload
+
+    async def main():
+        first = asyncio.create_task(scheduler.submit(run, "first", PRIORITY_LOW))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(scheduler.submit(run, name, priority))
+            for name, priority in [
+                ("low", PRIORITY_LOW), ("normal-1", PRIORITY_NORMAL),
+                ("high", PRIORITY_HIGH), ("normal-2", PRIORITY_NORMAL)
+            ]
+        ]
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(main())
+
+    assert started == ["first", "high", "normal-1", "normal-2", "low"]
+    assert peak == 1
+    stats = scheduler.stats()
+    assert stats["completed"] == 5
+    assert stats["queue_depth"] == 0
+    assert stats["peak_queue_depth"] == 4
+
+
+def test_queued_deploys_coalesce_and_share_result():
+    scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+    runs = []
+
+    async def run(payload, priority):
+        runs.append((payload, priority))
+        await asyncio.sleep(0.01)
+        return len(payload)
+
+    def merge(queued, new):
+        return queued + new if len(queued) + len(new) <= 3 else None
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.submit(run, ["x"], key="other", merge=merge))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            scheduler.submit(run, ["a"], PRIORITY_NORMAL, key="k", merge=merge),
+            scheduler.submit(run, ["b"], PRIORITY_HIGH, key="k", merge=merge),
+            scheduler.submit(run, ["c"], PRIORITY_NORMAL, key="k", merge=merge),
+            # Over the merge limit: queued on its own
+            scheduler.submit(run, ["d"], PRIORITY_NORMAL, key="k", merge=merge)
+        )
+        await blocker
+        return results
+
+    results = asyncio.run(main())
+
+    assert results == [3, 3, 3, 1]
+    # The merged job was upgraded to high priority by its second caller
+    assert runs[1] == (["a", "b", "c"], PRIORITY_HIGH)
+    assert runs[2] == (["d"], PRIORITY_NORMAL)
+    assert scheduler.stats()["coalesced"] == 2
+
+
+def test_merge_digests_respects_rendered_byte_limit():
+    """Merging stops at the channel's message size, not just the user count."""
+    queued = make_digest("teams", [make_entry(f"q{i}") for i in range(3)])
+    new = make_digest("teams", [make_entry(f"n{i}") for i in range(3)])
+    merged = merge_digests(queued, new, max_users=50)
+    size = digest_message_bytes(merged)
+
+    assert merge_digests(queued, new, max_users=50, max_bytes=size).total_count == 6
+    assert merge_digests(queued, new, max_users=50, max_bytes=size - 1) is None
+    assert merge_digests(queued, new, max_users=5, max_bytes=size) is None
+
+
+def test_failures_propagate_to_coalesced_callers():
+    scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+
+    async def run(payload, priority):
+        await asyncio.sleep(0.01)
+        if payload != ["x"]:
+            raise RuntimeError("control room down")
+        return True
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.submit(run, ["x"]))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            scheduler.submit(run, ["a"], key="k", merge=lambda q, n: q + n),
+            scheduler.submit(run, ["b"], key="k", merge=lambda q, n: q + n),
+            return_exceptions=True
+        )
+        await blocker
+        return results
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_owner_timeout_fails_coalesced_followers_with_ordinary_exception():
+    scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+    runs = []
+
+    async def run(payload, priority):
+        runs.append(payload)
+        await asyncio.sleep(0.05)
+        return True
+
+    async def send_one(payload, timeout):
+        # Shaped like DigestSender: per-send timeout, ordinary errors become results
+        try:
+            return await asyncio.wait_for(
+                scheduler.submit(run, payload, key="k", merge=lambda q, n: q + n), timeout
+            )
+        except Exception as e:
+            return e
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.submit(run, ["x"]))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            send_one(["a"], timeout=0.01),  # owns the job, times out while queued
+            send_one(["b"], timeout=1),
+            send_one(["c"], timeout=1)
+        )
+        await blocker
+        return results
+
+    results = asyncio.run(main())
+
+    assert isinstance(results[0], asyncio.TimeoutError)
+    assert all(isinstance(r, DeployCancelledError) for r in results[1:])
+    # The abandoned merged job never ran
+    assert runs == [["x"]]
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_rate_limit_spaces_deploy_starts():
+    scheduler = DeployScheduler(rate_per_second=50, max_in_flight=10)
+    scheduler.rate_limiter.capacity = scheduler.rate_limiter._tokens = 1
+
+    async def run(payload, priority):
+        return payload
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(scheduler.submit(run, i) for i in range(5)))
+        return time.perf_counter() - start
+
+    # One token up front, then 4 more at 50/sec
+    assert asyncio.run(main()) >= 0.07
+    assert scheduler.stats()["rate_limiter"]["throttled"] >= 1
+
+
+def test_client_coalesces_digests_and_prioritizes_csuite():
+    """Against a fake Control Room: two queued email digests become one deploy."""
+    deploys = []
+
+    async def handler(request):
+        if request.url.path.endswith("/authentication"):
+            return httpx.Response(200, json={"token": "token"})
+        body = json.loads(request.content)
+        deploys.append(body)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"deploymentId": f"d-{len(deploys)}"})
+
+    client = AutomationAnywhereClient()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+
+    async def main():
+        blocker = asyncio.create_task(
+            client.send_digest(make_digest("teams", [make_entry("t1")]))
+        )
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            client.send_digest(make_digest("email", [make_entry("u1")])),
+            client.send_digest(make_digest("email", [make_entry("u2", "csuite")]))
+        )
+        await blocker
+        await client.close()
+        return results
+
+    assert asyncio.run(main()) == [True, True]
+
+    assert len(deploys) == 2
+    email = deploys[1]
+    assert email["automationPriority"] == "PRIORITY_HIGH"
+    assert email["botInput"]["totalCount"]["string"] == "2"
+    assert deploys[0]["automationPriority"] == "PRIORITY_MEDIUM"
+
+
+def test_client_does_not_coalesce_past_channel_byte_limit(monkeypatch):
+    """Queued digests that would render over DIGEST_EMAIL_MAX_BYTES deploy separately."""
+    deploys = []
+
+    async def handler(request):
+        if request.url.path.endswith("/authentication"):
+            return httpx.Response(200, json={"token": "token"})
+        deploys.append(json.loads(request.content))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"deploymentId": f"d-{len(deploys)}"})
+
+    client = AutomationAnywhereClient()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.scheduler = DeployScheduler(rate_per_second=0, max_in_flight=1)
+    single = digest_message_bytes(make_digest("email", [make_entry("u1")]))
+    monkeypatch.setattr(client.settings, "digest_email_max_bytes", single + 10)
+
+    async def main():
+        blocker = asyncio.create_task(
+            client.send_digest(make_digest("teams", [make_entry("t1")]))
+        )
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            client.send_digest(make_digest("email", [make_entry("u1")])),
+            client.send_digest(make_digest("email", [make_entry("u2")]))
+        )
+        await blocker
+        await client.close()
+        return results
+
+    assert asyncio.run(main()) == [True, True]
+
+    assert len(deploys) == 3
+    assert client.scheduler.stats()["coalesced"] == 0
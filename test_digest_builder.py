@@ -0,0 +1,110 @@
+"""
+Tests for size-aware weekly digest building.
+
+Run with: python -m pytest test_digest_builder.py
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from app.models import DigestEntry, DigestPayload
+from app.services.aa_integration import AutomationAnywhereClient
+from app.services.digest_builder import DigestBuilder, pack_sizes
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeDb:
+    def __init__(self, cur):
+        self.cur = cur
+
+    @contextmanager
+    def transaction(self):
+        yield self.cur
+
+
+def make_row(i, title="VP of Engineering"):
+    return {
+        "id": i, "user_id": f"u{i}", "username": f"member_{i}", "title": title,
+        "seniority_level": "vp", "country": "US", "company": "Acme",
+        "joined_at": None, "detected_at": datetime(2025, 11, 24) + timedelta(minutes=i),
+        "week_start": date(2025, 11, 17), "week_end": date(2025, 11, 24)
+    }
+
+
+def make_builder(monkeypatch, rows=(), **limits):
+    builder = DigestBuilder()
+    cur = FakeCursor(list(rows))
+    builder.db = FakeDb(cur)
+    for name, value in limits.items():
+        monkeypatch.setattr(builder.settings, name, value)
+    return builder, cur
+
+
+def test_pack_sizes_respects_bytes_and_users():
+    assert pack_sizes([10, 10, 10, 10], base_bytes=5, max_bytes=30, max_users=10) == [(0, 2), (2, 4)]
+    assert pack_sizes([10] * 5, base_bytes=0, max_bytes=1000, max_users=2) == [(0, 2), (2, 4), (4, 5)]
+    # Oversized items still get sent, alone
+    assert pack_sizes([5, 50, 5], base_bytes=0, max_bytes=20, max_users=10) == [(0, 1), (1, 2), (2, 3)]
+    assert pack_sizes([], 0, 10, 10) == []
+
+
+def test_packed_digests_fit_rendered_limits(monkeypatch):
+    builder, _ = make_builder(monkeypatch, digest_teams_max_bytes=3000, digest_teams_max_users=100)
+    users = [
+        DigestEntry(**{k: v for k, v in make_row(i, "Chief " + "X" * (i % 40)).items()
+                       if k in DigestEntry.model_fields})
+        for i in range(60)
+    ]
+
+    chunks = builder.pack("teams", users)
+
+    assert sum(len(c) for c in chunks) == 60
+    client = AutomationAnywhereClient()
+    for chunk in chunks:
+        digest = DigestPayload(week_start="2025-11-17", week_end="2025-11-24",
+                               channel="teams", users=chunk, total_count=len(chunk))
+        message = client._prepare_teams_bot_inputs(digest)["messageText"]
+        assert len(message.encode("utf-8")) <= 3000
+
+
+def test_build_weekly_digest_single_insert_and_savings(monkeypatch):
+    rows = [make_row(i) for i in range(45)]
+    builder, cur = make_builder(
+        monkeypatch, rows,
+        digest_email_max_bytes=1_000_000, digest_email_max_users=250,
+        digest_teams_max_bytes=1_000_000, digest_teams_max_users=20
+    )
+
+    results = builder.build_weekly_digest()
+
+    assert results["by_channel"] == {"email": 1, "teams": 3}
+    assert results["legacy_digests"] == 10
+    assert results["deploys_saved"] == 6
+
+    claim, insert = cur.statements
+    assert claim[0].startswith("UPDATE detections") and "RETURNING" in claim[0]
+    assert insert[0].startswith("INSERT INTO digests")
+    week_start, week_end, channels, payloads = insert[1]
+    assert channels == ["email", "teams", "teams", "teams"]
+    email_users = json.loads(payloads[0])["users"]
+    # Newest first, same shape as the SQL builder
+    assert email_users[0]["user_id"] == "u44"
+    assert email_users[0]["detected_at"].startswith("2025-11-24T00:44")
+
+
+def test_build_weekly_digest_nothing_to_claim(monkeypatch):
+    builder, cur = make_builder(monkeypatch, [])
+    assert builder.build_weekly_digest()["digests_created"] == 0
+    assert len(cur.statements) == 1
@@ -0,0 +1,181 @@
+"""
+Tests for concurrent digest delivery.
+
+Run with: python -m pytest test_digest_sender.py
+"""
+
+import asyncio
+
+from app.services.digest_builder import DigestSender
+
+
+class FakeAAClient:
+    """Tracks concurrent sends per channel; optionally hangs or fails."""
+
+    def __init__(self, delay=0.02, hang_ids=(), fail_ids=()):
+        self.delay = delay
+        self.hang_ids = set(hang_ids)
+        self.fail_ids = set(fail_ids)
+        self.active = {}
+        self.peak = {}
+
+    async def send_digest(self, payload):
+        channel = payload.channel
+        self.active[channel] = self.active.get(channel, 0) + 1
+        self.peak[channel] = max(self.peak.get(channel, 0), self.active[channel])
+        try:
+            week = payload.week_start
+            await asyncio.sleep(10 if week in self.hang_ids else self.delay)
+            return week not in self.fail_ids
+        finally:
+            self.active[channel] -= 1
+
+
+def make_digest(digest_id, channel):
+    # week_start doubles as the digest id so the fake client can tell them apart
+    return {
+        "id": digest_id,
+        "week_start": str(digest_id),
+        "week_end": "2025-11-30",
+        "channel": channel,
+        "payload": {"users": []},
+        "created_at": None,
+    }
+
+
+def make_sender(monkeypatch, digests, client, email=2, teams=1, timeout=5.0):
+    sender = DigestSender()
+    sender.aa_client = client
+    monkeypatch.setattr(sender.settings, "digest_email_concurrency", email)
+    monkeypatch.setattr(sender.settings, "digest_teams_concurrency", teams)
+    monkeypatch.setattr(sender.settings, "digest_send_timeout_seconds", timeout)
+    monkeypatch.setattr(sender, "get_pending_digests", lambda: digests)
+    marked = []
+    monkeypatch.setattr(sender, "mark_digest_sent", lambda digest_id: marked.append(digest_id) or True)
+    sender.released = []
+    monkeypatch.setattr(sender, "release_digest", sender.released.append)
+    sender.renewals = []
+    monkeypatch.setattr(sender, "renew_leases", lambda ids: sender.renewals.append(ids) or ids)
+    return sender, marked
+
+
+def test_concurrency_bounded_per_channel(monkeypatch):
+    digests = [make_digest(i, "email") for i in range(6)] + [make_digest(i, "teams") for i in range(6, 9)]
+    client = FakeAAClient()
+    sender, marked = make_sender(monkeypatch, digests, client)
+
+    results = asyncio.run(sender.send_pending_digests())
+
+    assert results["sent"] == 9 and results["failed"] == 0
+    assert client.peak == {"email": 2, "teams": 1}
+    assert sorted(marked) == list(range(9))
+
+
+def test_timeouts_and_failures_are_not_marked(monkeypatch):
+    digests = [make_digest(i, "email") for i in range(4)]
+    client = FakeAAClient(hang_ids={"1"}, fail_ids={"2"})
+    sender, marked = make_sender(monkeypatch, digests, client, email=4, timeout=0.1)
+
+    results = asyncio.run(sender.send_pending_digests())
+
+    assert results["total"] == 4
+    assert results["sent"] == 2
+    assert results["failed"] == 2
+    assert results["timed_out"] == 1
+    assert sorted(marked) == [0, 3]
+    # Unsent digests are released for the next run
+    assert sorted(sender.released) == [1, 2]
+
+
+def test_leases_renewed_during_long_sends(monkeypatch):
+    digests = [make_digest(i, "email") for i in range(3)]
+    client = FakeAAClient(delay=0.1)
+    sender, marked = make_sender(monkeypatch, digests, client, email=1)
+    sender.lease_seconds = 0.06
+
+    asyncio.run(sender.send_pending_digests())
+
+    assert sorted(marked) == [0, 1, 2]
+    assert sender.renewals
+    # Only digests still in flight are renewed
+    assert sender.renewals[0] == [0, 1, 2]
+    assert sender.renewals[-1] == [2]
+
+
+class HeldSentBatcher:
+    """Holds sent marks until flushed; the first fail_flushes flushes raise."""
+
+    def __init__(self, fail_flushes=0):
+        self.pending = set()
+        self.fail_flushes = fail_flushes
+
+    def __contains__(self, digest_id):
+        return digest_id in self.pending
+
+    def add(self, digest_id):
+        self.pending.add(digest_id)
+
+    def flush(self):
+        if self.fail_flushes:
+            self.fail_flushes -= 1
+            raise RuntimeError("database unavailable")
+        self.pending.clear()
+
+
+def test_leases_renewed_until_sent_marks_are_written(monkeypatch):
+    """A sent digest keeps its lease while its write-behind sent mark is pending."""
+    digests = [make_digest(i, "email") for i in range(3)]
+    client = FakeAAClient(delay=0.1)
+    sender, _ = make_sender(monkeypatch, digests, client, email=1)
+    # Real write-behind marks, held by the fake batcher
+    monkeypatch.delattr(sender, "mark_digest_sent")
+    sender.sent_batcher = HeldSentBatcher()
+    sender.lease_seconds = 0.06
+
+    results = asyncio.run(sender.send_pending_digests())
+
+    assert results["sent"] == 3
+    assert sender.renewals
+    # Sent digests stay renewed alongside the one still in flight
+    assert all(ids == [0, 1, 2] for ids in sender.renewals)
+    assert not sender.sent_batcher.pending
+
+
+def test_failed_final_flush_renews_pending_sent_digests(monkeypatch):
+    digests = [make_digest(i, "email") for i in range(2)]
+    sender, _ = make_sender(monkeypatch, digests, FakeAAClient(fail_ids={"1"}))
+    monkeypatch.delattr(sender, "mark_digest_sent")
+    sender.sent_batcher = HeldSentBatcher(fail_flushes=1)
+
+    results = asyncio.run(sender.send_pending_digests())
+
+    assert results["sent"] == 1
+    assert sender.released == [1]
+    # The unwritten mark's digest gets a fresh lease for the batcher's retry
+    assert sender.renewals[-1] == [0]
+    assert 0 in sender.sent_batcher
+
+
+def test_trusted_hydration_matches_strict(monkeypatch):
+    from dataclasses import asdict
+
+    from app.models import DigestEntryRecord
+
+    row = make_digest(1, "email")
+    row["payload"] = {"users": [
+        {"user_id": "u1", "username": "Ann", "title": "CEO", "seniority_level": "csuite",
+         "country": None, "company": "Acme", "joined_at": None,
+         "detected_at": "2025-11-24T10:00:00+00:00"},
+        {"user_id": "u2", "username": "Bo", "title": "VP Sales", "seniority_level": "vp",
+         "country": "US", "company": None, "joined_at": "2024-01-02T03:04:05+00:00",
+         "detected_at": "2025-11-25T10:00:00+00:00"}
+    ]}
+    sender, _ = make_sender(monkeypatch, [], FakeAAClient())
+
+    trusted = sender._build_digest_payload(row)
+    monkeypatch.setattr(sender.settings, "digest_strict_validation", True)
+    strict = sender._build_digest_payload(row)
+
+    assert all(isinstance(u, DigestEntryRecord) for u in trusted.users)
+    assert [asdict(u) for u in trusted.users] == [u.model_dump() for u in strict.users]
+    assert trusted.total_count == strict.total_count == 2
@@ -0,0 +1,247 @@
+"""
+Tests for the LISTEN/NOTIFY event drainer and the inline-processing lease.
+
+Run with: python -m pytest test_event_drainer.py
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+
+import psycopg
+
+from app.models import WebhookEvent
+
+
+class FakeCursor:
+    """Returns canned results in the order the drainer reads them."""
+
+    def __init__(self, rows, backlog=0):
+        self.executed = []
+        self.rows = rows
+        self.backlog = backlog
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        query = self.executed[-1][0]
+        if "UPDATE events_raw" in query:
+            return [{"latency": 0.5} for _ in self.executed[-1][1][0]]
+        return self.rows
+
+    def fetchone(self):
+        return {"backlog": len(self.rows) + self.backlog}
+
+
+class FakeDb:
+    def __init__(self, cur, connect_seconds=0.0):
+        self.cur = cur
+        self.connect_seconds = connect_seconds
+
+    @contextmanager
+    def transaction(self):
+        time.sleep(self.connect_seconds)
+        yield self.cur
+
+
+class FakeProcessor:
+    """Fails classification for the users in fail_users."""
+
+    def __init__(self, fail_users=()):
+        self.fail_users = set(fail_users)
+        self.prefetched = []
+        self.processed = []
+        self.failures = []
+
+    async def prefetch_user_metadata(self, user_ids):
+        self.prefetched.extend(user_ids)
+
+    async def process_stored_event(self, event, timer=None):
+        if event.userId in self.fail_users:
+            raise RuntimeError("boom")
+        self.processed.append(event.userId)
+
+    def record_event_failure(self, event_id, error, cur=None):
+        self.failures.append((event_id, str(error), cur))
+        return "retry"
+
+
+def event_row(event_id, user_id, profile_field="Job Title"):
+    return {
+        "id": event_id, "user_id": user_id, "username": user_id,
+        "profile_field": profile_field, "value": "CEO", "old_value": None
+    }
+
+
+def make_drainer(cur=None, processor=None):
+    from app.services.event_drainer import EventDrainer
+
+    drainer = EventDrainer()
+    drainer.db = FakeDb(cur or FakeCursor([]))
+    drainer.processor = processor or FakeProcessor()
+    return drainer
+
+
+def test_drain_batch_claims_due_rows_and_records_failures():
+    """Claimed rows are processed under the claim; a failure is rescheduled in it."""
+    cur = FakeCursor([
+        event_row(1, "u1"),
+        event_row(2, "u2"),
+        event_row(3, "u3", profile_field="Country")
+    ])
+    processor = FakeProcessor(fail_users={"u2"})
+    drainer = make_drainer(cur, processor)
+
+    claimed = asyncio.run(drainer.drain_batch())
+
+    assert claimed == 3
+    claim_query = cur.executed[0][0]
+    assert "next_attempt_at <= NOW()" in claim_query
+    assert "FOR UPDATE SKIP LOCKED" in claim_query
+
+    # Only job-title events are prefetched and classified
+    assert processor.prefetched == ["u1", "u2"]
+    assert processor.processed == ["u1"]
+    assert processor.failures == [(2, "boom", cur)]
+
+    # The failed event is left to its retry schedule, the rest marked done
+    update_query, update_params = cur.executed[-1]
+    assert "SET processed = TRUE" in update_query
+    assert update_params == ([1, 3],)
+    assert drainer.processed == 2
+    assert drainer.failed == 1
+
+
+def test_connect_time_does_not_count_against_the_batch():
+    """A slow connection to a remote database does not shrink the claim."""
+    cur = FakeCursor([event_row(i, f"u{i}", profile_field="Country") for i in range(10)], backlog=500)
+    drainer = make_drainer(cur)
+    drainer.db.connect_seconds = 0.2
+    drainer.sizer.batch_size = 10
+
+    asyncio.run(drainer.drain_batch())
+
+    decision = drainer.sizer.stats()["last_decision"]
+    assert decision["reason"] == "backlog"
+    assert drainer.sizer.batch_size == 20
+    assert decision["latency_ms"] < 200
+    assert decision["claim_ms"] < 200
+
+
+def test_drain_batch_with_nothing_due_returns_zero():
+    cur = FakeCursor([])
+    drainer = make_drainer(cur)
+
+    assert asyncio.run(drainer.drain_batch()) == 0
+    assert len(cur.executed) == 1
+    assert drainer.batches == 0
+
+
+def test_run_sweeps_without_notifications(monkeypatch):
+    """With no NOTIFY, the drain loop still runs every sweep interval."""
+    drainer = make_drainer()
+    drainer.sweep_interval = 0.01
+    drains = []
+
+    async def idle_listen(stop):
+        await stop.wait()
+
+    async def counting_drain():
+        drains.append(drainer.sweeps)
+        return 0
+
+    monkeypatch.setattr(drainer, "_listen", idle_listen)
+    monkeypatch.setattr(drainer, "drain", counting_drain)
+
+    async def main():
+        stop = asyncio.Event()
+        runner = asyncio.create_task(drainer.run(stop))
+        while len(drains) < 3:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await runner
+
+    asyncio.run(main())
+
+    assert drainer.sweeps >= 3
+    assert drains[:3] == [1, 2, 3]
+
+
+class FakeListenConnection:
+    """Delivers a fixed number of notifications, then blocks."""
+
+    def __init__(self, notifications):
+        self.notifications = notifications
+        self.executed = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query):
+        self.executed.append(query)
+
+    async def notifies(self):
+        for _ in range(self.notifications):
+            yield object()
+        await asyncio.Event().wait()
+
+
+def test_listener_reconnects_after_connection_failure(monkeypatch):
+    """A failed connect is retried; once listening, each NOTIFY wakes the drainer."""
+    drainer = make_drainer()
+    monkeypatch.setattr(drainer.settings, "drain_reconnect_seconds", 0.01)
+    conn = FakeListenConnection(notifications=2)
+    attempts = []
+
+    async def connect(url, autocommit=False):
+        attempts.append(url)
+        if len(attempts) == 1:
+            raise psycopg.OperationalError("connection refused")
+        return conn
+
+    monkeypatch.setattr(psycopg.AsyncConnection, "connect", connect)
+
+    async def main():
+        stop = asyncio.Event()
+        listener = asyncio.create_task(drainer._listen(stop))
+        while drainer.notifications < 2:
+            await asyncio.sleep(0.01)
+        assert drainer.listening
+        assert drainer._wake.is_set()
+        stop.set()
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    asyncio.run(main())
+
+    assert len(attempts) == 2
+    assert conn.executed == ["LISTEN events_raw_inserted"]
+    assert not drainer.listening
+
+
+def test_process_event_stores_row_leased_to_inline_processing(monkeypatch):
+    """The webhook stores its event not yet due, so the drainer cannot claim it."""
+    from app.services.event_processor import EventProcessor
+
+    processor = EventProcessor()
+    monkeypatch.setattr(processor.settings, "inline_processing_lease_seconds", 45.0)
+    stored = []
+
+    async def processed(event, timer=None):
+        return {"status": "accepted"}
+
+    monkeypatch.setattr(
+        processor, "store_raw_event",
+        lambda event, key, lease_seconds=0.0: stored.append(lease_seconds) or None
+    )
+    monkeypatch.setattr(processor, "process_stored_event", processed)
+
+    event = WebhookEvent(userId="u1", username="A", profileField="Job Title", value="CEO")
+    result = asyncio.run(processor.process_event(event))
+
+    assert result["status"] == "duplicate"
+    assert stored == [45.0]
@@ -0,0 +1,70 @@
+"""
+Tests for retry bookkeeping on failed events.
+
+Run with: python -m pytest test_event_retries.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.models import WebhookEvent
+
+
+class FakeCursor:
+    """Records executed statements and returns a canned row."""
+
+    def __init__(self, row=None):
+        self.executed = []
+        self.row = row
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchone(self):
+        return self.row
+
+
+def test_record_event_failure_passes_retry_settings(monkeypatch):
+    """The failure is recorded with the configured retry policy."""
+    from app.config import get_settings
+    from app.services.event_processor import EventProcessor
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "max_retries", 5)
+    monkeypatch.setattr(settings, "retry_base_delay_seconds", 10.0)
+    monkeypatch.setattr(settings, "retry_max_delay_seconds", 600.0)
+
+    processor = EventProcessor()
+    cur = FakeCursor({"outcome": "dead_letter"})
+
+    outcome = processor.record_event_failure(42, ValueError("bad title"), cur)
+
+    assert outcome == "dead_letter"
+    query, params = cur.executed[0]
+    assert "record_event_failure" in query
+    assert params == (42, "ValueError: bad title", 5, 10.0, 600.0)
+
+
+def test_process_event_failure_is_recorded(monkeypatch):
+    """An exception after storing the event schedules a retry and re-raises."""
+    from app.services.event_processor import EventProcessor
+
+    processor = EventProcessor()
+    recorded = []
+
+    async def failing(event, timer=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(processor, "store_raw_event", lambda event, key, lease_seconds=0.0: 7)
+    monkeypatch.setattr(processor, "process_stored_event", failing)
+    monkeypatch.setattr(
+        processor, "record_event_failure",
+        lambda event_id, error, cur=None: recorded.append((event_id, str(error))) or "retry"
+    )
+
+    event = WebhookEvent(userId="u1", username="A", profileField="Job Title", value="CEO")
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.process_event(event))
+
+    assert recorded == [(7, "boom")]
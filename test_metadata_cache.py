@@ -0,0 +1,236 @@
+"""
+Tests for the user metadata cache.
+
+Run with: python -m pytest test_metadata_cache.py
+"""
+
+import asyncio
+
+from app.models import UserMetadata
+from app.services.metadata_cache import UserMetadataCache
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_expiry():
+    """Entries are served from cache until the TTL elapses."""
+    clock = FakeClock()
+    calls = []
+
+    async def loader(user_id):
+        calls.append(user_id)
+        return UserMetadata(user_id=user_id, country="US")
+
+    cache = UserMetadataCache(loader, ttl_seconds=60, clock=clock)
+
+    async def run():
+        await cache.get("u1")
+        await cache.get("u1")
+        clock.now = 61
+        await cache.get("u1")
+
+    asyncio.run(run())
+    assert calls == ["u1", "u1"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_negative_caching():
+    """Missing users are cached as None for the negative TTL."""
+    clock = FakeClock()
+    calls = []
+
+    async def loader(user_id):
+        calls.append(user_id)
+        return None
+
+    cache = UserMetadataCache(loader, ttl_seconds=60, negative_ttl_seconds=10, clock=clock)
+
+    async def run():
+        assert await cache.get("ghost") is None
+        assert await cache.get("ghost") is None
+        clock.now = 11
+        assert await cache.get("ghost") is None
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_errors_are_not_cached():
+    """Loader failures propagate and the next lookup retries."""
+    attempts = []
+
+    async def loader(user_id):
+        attempts.append(user_id)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return UserMetadata(user_id=user_id)
+
+    cache = UserMetadataCache(loader)
+
+    async def run():
+        try:
+            await cache.get("u1")
+            assert False, "expected failure"
+        except RuntimeError:
+            pass
+        return await cache.get("u1")
+
+    result = asyncio.run(run())
+    assert result.user_id == "u1"
+    assert result.joined_at is None
+    assert cache.stats()["load_errors"] == 1
+
+
+def test_single_flight():
+    """Concurrent lookups for one user share a single upstream call."""
+    calls = []
+
+    async def loader(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        return UserMetadata(user_id=user_id, company="Acme")
+
+    cache = UserMetadataCache(loader)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("u1") for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert calls == ["u1"]
+    assert all(r.company == "Acme" for r in results)
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_max_entries_eviction():
+    """The least recently used entry is evicted when full."""
+    async def loader(user_id):
+        return UserMetadata(user_id=user_id)
+
+    cache = UserMetadataCache(loader, max_entries=2)
+
+    async def run():
+        await cache.get("a")
+        await cache.get("b")
+        await cache.get("a")
+        await cache.get("c")
+
+    asyncio.run(run())
+    assert cache.contains("a")
+    assert not cache.contains("b")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_prefetch_skips_cached_and_bounds_concurrency(monkeypatch):
+    """Prefetch only loads uncached users, never exceeding the worker limit."""
+    from app.config import get_settings
+    from app.services.event_processor import EventProcessor
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "community_api_url", "http://community.test")
+    monkeypatch.setattr(settings, "metadata_prefetch_concurrency", 4)
+
+    processor = EventProcessor()
+    active = 0
+    peak = 0
+    loaded = []
+
+    async def loader(user_id):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.005)
+        active -= 1
+        loaded.append(user_id)
+        return UserMetadata(user_id=user_id)
+
+    processor.metadata_cache.loader = loader
+
+    async def run():
+        await processor.metadata_cache.get("cached")
+        return await processor.prefetch_user_metadata(
+            ["cached"] + [f"u{i}" for i in range(20)] + ["u0"]
+        )
+
+    results = asyncio.run(run())
+    assert results == {"requested": 20, "fetched": 20, "not_found": 0, "failed": 0}
+    assert loaded.count("cached") == 1
+    assert peak <= 4
+
+
+def test_prefetch_reports_missing_users_separately(monkeypatch):
+    """Users the API does not know are counted as not_found, not fetched."""
+    from app.config import get_settings
+    from app.services.event_processor import EventProcessor
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "community_api_url", "http://community.test")
+
+    processor = EventProcessor()
+
+    async def loader(user_id):
+        if user_id == "broken":
+            raise RuntimeError("upstream error")
+        return None if user_id.startswith("gone") else UserMetadata(user_id=user_id)
+
+    processor.metadata_cache.loader = loader
+
+    results = asyncio.run(processor.prefetch_user_metadata(["u1", "gone1", "gone2", "broken"]))
+    assert results == {"requested": 4, "fetched": 1, "not_found": 2, "failed": 1}
+
+
+def test_token_bucket_throttles():
+    """Acquiring beyond capacity waits for refill."""
+    import time
+    from app.utils.rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(15):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert elapsed >= 0.09
+    assert bucket.stats()["acquired"] == 15
+
+
+def test_token_bucket_serves_waiters_in_arrival_order():
+    """A caller arriving after a refill cannot take the token from an earlier waiter."""
+    from app.utils.rate_limit import TokenBucket
+
+    now = [0.0]
+    bucket = TokenBucket(rate=100, capacity=1, clock=lambda: now[0])
+    order = []
+
+    async def take(name):
+        await bucket.acquire()
+        order.append(name)
+
+    async def run():
+        await bucket.acquire()
+        first = asyncio.create_task(take("first"))
+        await asyncio.sleep(0)
+        # Refilled while the first waiter sleeps; a new caller arrives
+        now[0] += 0.01
+        second = asyncio.create_task(take("second"))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(first, 1.0)
+        assert order == ["first"]
+        now[0] += 0.01
+        await asyncio.wait_for(second, 1.0)
+
+    asyncio.run(run())
+    assert order == ["first", "second"]
+    assert bucket.stats()["throttled"] == 2
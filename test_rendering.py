@@ -0,0 +1,68 @@
+"""
+Tests for template rendering of digests and reports.
+
+Run with: python -m pytest test_rendering.py
+"""
+
+from datetime import datetime
+
+from app.models import DigestEntry, DigestPayload
+from app.services.aa_integration import AutomationAnywhereClient
+from app.utils.rendering import TemplateRenderer, escape_markdown
+
+
+def make_digest(title):
+    user = DigestEntry(
+        user_id="u1", username="ann_lee", title=title, seniority_level="csuite",
+        country=None, company="Acme", joined_at=None, detected_at=datetime(2025, 11, 24)
+    )
+    return DigestPayload(
+        week_start="2025-11-24", week_end="2025-11-30", channel="email",
+        users=[user], total_count=1
+    )
+
+
+def make_row(i, title="VP Sales"):
+    return {
+        "user_id": str(i), "username": f"user{i}", "title": title,
+        "seniority_level": "vp", "country": None, "company": "Acme",
+        "joined_at": None, "first_detected_at": datetime(2025, 11, 3, 9, 30)
+    }
+
+
+def test_email_html_escapes_user_fields():
+    html = AutomationAnywhereClient()._build_email_html(make_digest('<script>alert("x")</script>'))
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+    assert "<td>CSUITE</td>" in html
+    assert "<td>2025-11-24</td>" in html
+
+
+def test_teams_markdown_escapes_user_fields():
+    inputs = AutomationAnywhereClient()._prepare_teams_bot_inputs(make_digest("CEO **[click](x)**"))
+    text = inputs["messageText"]
+    assert "**ann\\_lee** - CEO \\*\\*\\[click\\](x)\\*\\* (CSUITE)" in text
+    assert "Acme | Country N/A" in text
+    assert escape_markdown("a_b") == "a\\_b"
+
+
+def test_report_html_rows_and_empty_report(tmp_path):
+    renderer = TemplateRenderer()
+    assert renderer.warm() == 3
+    context = dict(month_label="2025-11", generated_at=datetime(2025, 12, 1), total=2, csuite=0, vp=2)
+    context_rows = dict(context, has_rows=True)
+
+    html = renderer.render("report.html", rows=[make_row(1), make_row(2, "VP <R&D>")], **context_rows)
+    assert html.count('<span class="badge badge-vp">VP</span>') == 2
+    assert "VP &lt;R&amp;D&gt;" in html
+    assert "<td>N/A</td>" in html
+
+    empty = renderer.render("report.html", rows=[], has_rows=False, **context)
+    assert "No senior executives detected this month." in empty
+    assert "<table>" not in empty
+
+    # Streaming to a file produces the same document
+    path = tmp_path / "report.html"
+    written = renderer.render_to_file("report.html", path, rows=[make_row(1)], **context_rows)
+    assert path.read_text(encoding="utf-8") == renderer.render("report.html", rows=[make_row(1)], **context_rows)
+    assert written == len(path.read_text(encoding="utf-8"))
@@ -0,0 +1,88 @@
+"""
+Tests for historical event replay.
+
+Run with: python -m pytest test_replay.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.models import WebhookEvent
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.added = []
+
+    def add(self, item):
+        self.added.append(item)
+
+    def flush(self):
+        pass
+
+
+def make_processor(monkeypatch, fail_users=()):
+    """EventProcessor with events_raw kept in memory and classification stubbed."""
+    from app.services import event_processor
+
+    processor = event_processor.EventProcessor()
+    stored = {}
+    failures = []
+
+    def store_raw_event(event, key, lease_seconds=0.0):
+        if key in stored:
+            return None
+        stored[key] = len(stored) + 1
+        return stored[key]
+
+    async def process_stored_event(event, timer=None):
+        if event.userId in fail_users:
+            raise RuntimeError(f"bad event for {event.userId}")
+        return {"status": "accepted", "user_id": event.userId}
+
+    async def close():
+        pass
+
+    monkeypatch.setattr(processor, "store_raw_event", store_raw_event)
+    monkeypatch.setattr(processor, "process_stored_event", process_stored_event)
+    monkeypatch.setattr(
+        processor, "record_event_failure",
+        lambda event_id, error, cur=None: failures.append(event_id) or "retry"
+    )
+    monkeypatch.setattr(processor, "processed_batcher", FakeBatcher())
+    monkeypatch.setattr(processor, "close", close)
+    monkeypatch.setattr(event_processor, "get_event_processor", lambda: processor)
+    return processor, failures
+
+
+def job_title(user_id):
+    return WebhookEvent(userId=user_id, username=user_id, profileField="Job Title", value="VP of Sales")
+
+
+def test_failing_event_is_counted_and_rest_of_batch_processed(monkeypatch):
+    """A bad event is an error, not a duplicate, and its batch-mates are not re-run."""
+    from replay import replay
+
+    processor, failures = make_processor(monkeypatch, fail_users={"u2"})
+    events = [job_title("u1"), job_title("u2"), job_title("u3"), job_title("u4")]
+
+    report = asyncio.run(replay(iter(events), batch_size=10))
+
+    assert report["events"] == 4
+    assert report["errors"] == 1
+    assert report["statuses"] == {"accepted": 3}
+    assert failures == [2]
+    assert processor.processed_batcher.added == [1, 3, 4]
+
+
+def test_process_event_batch_raises_by_default(monkeypatch):
+    processor, _ = make_processor(monkeypatch, fail_users={"u1"})
+
+    async def main():
+        return await processor.process_event_batch([job_title("u1"), job_title("u2")])
+
+    with pytest.raises(RuntimeError, match="u1"):
+        asyncio.run(main())
+    # u2 was never reached
+    assert processor.processed_batcher.added == []
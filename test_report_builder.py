@@ -0,0 +1,263 @@
+"""
+Tests for streaming month-end report generation.
+
+Run with: python -m pytest test_report_builder.py
+"""
+
+import gzip
+import os
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import report_builder
+from app.services.report_builder import REPORT_DATA_QUERY, REPORT_TIMEZONE, ReportBuilder, month_range
+
+# A database with the migrations applied; the EXPLAIN test is skipped without one
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+class StreamingDb:
+    """Hands out connections whose named cursor generates count rows lazily."""
+
+    def __init__(self, count):
+        self.count = count
+        self.cursor_names = []
+        self.closed = 0
+        self.file_uris = {}
+        self.updated_at = datetime(2025, 11, 20)
+
+    @contextmanager
+    def get_cursor(self):
+        db = self
+
+        class Cursor:
+            def execute(self, query, params):
+                if query.lstrip().startswith("UPDATE reports"):
+                    for report_id in params[1]:
+                        db.file_uris[report_id] = params[0]
+
+            def fetchone(self):
+                return {
+                    "row_count": db.count, "max_last_seen_at": None,
+                    "max_updated_at": db.updated_at, "max_detection_id": db.count
+                }
+
+        yield Cursor()
+
+    def get_connection(self):
+        db = self
+
+        class Cursor:
+            itersize = None
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params):
+                assert params == {
+                    "month_start": datetime(2025, 11, 1, tzinfo=REPORT_TIMEZONE),
+                    "month_end": datetime(2025, 12, 1, tzinfo=REPORT_TIMEZONE)
+                }
+
+            def __iter__(self):
+                base = datetime(2025, 11, 1)
+                for i in range(db.count):
+                    yield {
+                        "user_id": str(i), "username": f"member_{i}", "title": "VP <Sales>",
+                        "seniority_level": "vp", "country": None, "company": "Acme",
+                        "joined_at": base, "first_detected_at": base + timedelta(seconds=i)
+                    }
+
+        class Connection:
+            def cursor(self, name=None):
+                db.cursor_names.append(name)
+                return Cursor()
+
+            def commit(self):
+                pass
+
+            def close(self):
+                db.closed += 1
+
+        return Connection()
+
+
+def make_builder(monkeypatch, tmp_path, count, compress=False):
+    monkeypatch.setattr(report_builder, "REPORTS_DIR", tmp_path)
+    builder = ReportBuilder()
+    builder.db = StreamingDb(count)
+    builder.settings = builder.settings.model_copy(update={"report_compress_csv": compress})
+    return builder
+
+
+def write_month(builder):
+    rows = builder.iter_report_data("2025-11")
+    try:
+        return builder.write_report_files(rows, "2025-11", {"total_detections": builder.db.count})
+    finally:
+        rows.close()
+
+
+def test_single_pass_writes_csv_and_html(monkeypatch, tmp_path):
+    builder = make_builder(monkeypatch, tmp_path, 3)
+    files = write_month(builder)
+
+    assert files["record_count"] == 3
+    assert builder.db.cursor_names == ["report_2025_11"]
+    assert builder.db.closed == 1
+    lines = (tmp_path / "report_2025-11.csv").read_text().splitlines()
+    assert lines[0].startswith("User ID,Username")
+    assert len(lines) == 4
+    html = (tmp_path / "report_2025-11.html").read_text()
+    assert html.count("VP &lt;Sales&gt;") == 3
+
+
+def test_empty_month_and_gzip_output(monkeypatch, tmp_path):
+    builder = make_builder(monkeypatch, tmp_path, 0, compress=True)
+    files = write_month(builder)
+
+    assert files["csv_uri"].endswith("report_2025-11.csv.gz")
+    with gzip.open(files["csv_uri"], "rt") as f:
+        assert f.read().strip() == "No data for this month"
+    assert "No senior executives detected this month." in (tmp_path / "report_2025-11.html").read_text()
+
+
+def test_month_range_is_half_open_in_new_york():
+    start, end = month_range("2025-03")
+    assert start.isoformat() == "2025-03-01T00:00:00-05:00"
+    # DST starts mid-March: April begins at UTC-4
+    assert end.isoformat() == "2025-04-01T00:00:00-04:00"
+
+    start, end = month_range("2025-12")
+    assert (start.year, end.year, end.month) == (2025, 2026, 1)
+
+    with pytest.raises(ValueError):
+        month_range("2025-13")
+
+
+def test_memory_stays_flat_as_month_grows(monkeypatch, tmp_path):
+    def peak(count):
+        builder = make_builder(monkeypatch, tmp_path, count, compress=True)
+        tracemalloc.start()
+        try:
+            assert write_month(builder)["record_count"] == count
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(1_000), peak(20_000)
+    # Twenty times the rows must not mean (anywhere near) fifty times the memory
+    assert large < small * 2 + 256 * 1024
+
+
+def pending(report_id, month_label):
+    return {"id": report_id, "month_label": month_label, "summary": {"total_detections": report_id}}
+
+
+def test_pending_reports_run_one_task_per_month(monkeypatch, tmp_path):
+    builder = make_builder(monkeypatch, tmp_path, 0)
+    reports = [pending(3, "2025-11"), pending(2, "2025-10"), pending(1, "2025-11")]
+    monkeypatch.setattr(builder, "get_pending_reports", lambda: reports)
+    calls = []
+
+    def fake_generate_report(report_id, month_label, summary, report_ids=None, rules_version=None, force=False):
+        calls.append((report_id, month_label, report_ids))
+        if month_label == "2025-10":
+            raise RuntimeError("disk full")
+        return {"record_count": 5, "csv_uri": "a.csv", "html_uri": "a.html", "fingerprint": "f" * 64, "cache_hit": True}
+
+    monkeypatch.setattr(builder, "generate_report", fake_generate_report)
+    results = builder.process_pending_reports(workers=1)
+
+    # Newest report of each month renders once; both November reports get its files
+    assert calls == [(3, "2025-11", [3, 1]), (2, "2025-10", [2])]
+    assert (results["total"], results["generated"], results["failed"]) == (3, 2, 1)
+    assert results["errors"] == ["Report 2: disk full"]
+    assert results["records"] == 5
+    assert [o["month_label"] for o in results["reports"]] == ["2025-10", "2025-11"]
+    assert results["month_latency"]["count"] == 2
+    assert results["cache"] == {"hits": 1, "misses": 0, "forced": False}
+
+
+def test_unchanged_month_reuses_cached_artifact(monkeypatch, tmp_path):
+    builder = make_builder(monkeypatch, tmp_path, 3)
+    summary = {"total_detections": 3}
+
+    first = builder.generate_report(1, "2025-11", summary, rules_version="v1")
+    second = builder.generate_report(2, "2025-11", summary, rules_version="v1")
+
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert second["csv_uri"] == first["csv_uri"]
+    assert builder.db.file_uris[2] == builder.db.file_uris[1]
+    # The hit never opened the report query
+    assert builder.db.cursor_names == ["report_2025_11"]
+
+    # Forced, new data or a rules change all regenerate
+    assert builder.generate_report(3, "2025-11", summary, rules_version="v1", force=True)["cache_hit"] is False
+    assert builder.generate_report(4, "2025-11", summary, rules_version="v2")["cache_hit"] is False
+    builder.db.count = 4
+    changed = builder.generate_report(5, "2025-11", summary, rules_version="v1")
+    assert changed["cache_hit"] is False
+    assert changed["fingerprint"] != first["fingerprint"]
+    assert changed["record_count"] == 4
+    assert len(builder.db.cursor_names) == 4
+
+
+def test_pool_worker_failures_are_reported(monkeypatch, tmp_path):
+    # Worker processes use the placeholder database URL, so every month fails
+    builder = make_builder(monkeypatch, tmp_path, 0)
+    monkeypatch.setattr(builder, "get_pending_reports", lambda: [pending(2, "2025-10"), pending(1, "2025-11")])
+
+    results = builder.process_pending_reports(workers=2)
+
+    assert results["workers"] == 2
+    assert (results["generated"], results["failed"]) == (0, 2)
+    assert {o["status"] for o in results["reports"]} == {"failed"}
+
+
+def test_enrichment_after_cached_build_is_a_cache_miss(monkeypatch, tmp_path):
+    builder = make_builder(monkeypatch, tmp_path, 3)
+    summary = {"total_detections": 3}
+    first = builder.generate_report(1, "2025-11", summary, rules_version="v1")
+    assert builder.generate_report(2, "2025-11", summary, rules_version="v1")["cache_hit"] is True
+
+    # Deferred enrichment fills in country/company: same rows, same last_seen_at,
+    # but the user_state trigger bumps updated_at
+    builder.db.updated_at = datetime(2025, 11, 21)
+    enriched = builder.generate_report(3, "2025-11", summary, rules_version="v1")
+
+    assert enriched["cache_hit"] is False
+    assert enriched["fingerprint"] != first["fingerprint"]
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_report_query_uses_month_index():
+    import psycopg
+
+    month_start, month_end = month_range("2025-11")
+    with psycopg.connect(TEST_DATABASE_URL) as conn:
+        # With sequential scans priced out, a non-sargable filter still has to scan
+        conn.execute("SET enable_seqscan = off")
+        cur = psycopg.ClientCursor(conn)
+        cur.execute(
+            "EXPLAIN (FORMAT JSON) " + REPORT_DATA_QUERY,
+            {"month_start": month_start, "month_end": month_end}
+        )
+        plan = cur.fetchone()[0][0]["Plan"]
+        conn.rollback()
+
+    nodes = list(plan_nodes(plan))
+    assert not [n for n in nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "user_state"]
+    assert "idx_user_state_report_month" in {n.get("Index Name") for n in nodes}
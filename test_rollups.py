@@ -0,0 +1,32 @@
+"""
+Tests for monthly rollup summaries.
+
+Run with: python -m pytest test_rollups.py
+"""
+
+from datetime import date
+
+from app.services.rollups import month_start, summarize_rollups
+
+
+def test_countries_are_summed_across_levels():
+    rows = [
+        {"seniority_level": "csuite", "country": "US", "detection_count": 3},
+        {"seniority_level": "vp", "country": "US", "detection_count": 5},
+        {"seniority_level": "vp", "country": "Unknown", "detection_count": 2},
+        # Emptied when enrichment moved a detection to a real country
+        {"seniority_level": "csuite", "country": "Unknown", "detection_count": 0},
+    ]
+    summary = summarize_rollups("2025-11", rows)
+
+    # A (level, country) object_agg would keep only one of the two "US" counts
+    assert summary["countries"] == {"US": 8, "Unknown": 2}
+    assert summary["total_detections"] == 10
+    assert (summary["csuite_count"], summary["vp_count"]) == (3, 7)
+
+
+def test_empty_month_and_month_start():
+    assert summarize_rollups("2025-11", []) == {
+        "month": "2025-11", "total_detections": 0, "csuite_count": 0, "vp_count": 0, "countries": {}
+    }
+    assert month_start("2025-11") == date(2025, 11, 1)
@@ -0,0 +1,129 @@
+"""
+Tests for the in-process seniority mirror and its use in classification writes.
+
+Run with: python -m pytest test_seniority_mirror.py
+"""
+
+from contextlib import contextmanager
+
+from app.services.seniority_mirror import SeniorityMirror
+
+
+class ScriptedCursor:
+    """Cursor returning scripted rowcounts / rows per statement."""
+
+    def __init__(self, rowcounts=None, rows=None):
+        self.statements = []
+        self.rowcounts = list(rowcounts or [])
+        self.rows = list(rows or [])
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.statements.append(" ".join(query.split()))
+        self.rowcount = self.rowcounts.pop(0) if self.rowcounts else 1
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+
+class FakeDb:
+    def __init__(self, cur):
+        self.cur = cur
+
+    @contextmanager
+    def transaction(self):
+        yield self.cur
+
+
+def make_processor(cur, mirror):
+    from app.services.event_processor import EventProcessor
+
+    processor = EventProcessor()
+    processor.db = FakeDb(cur)
+    processor.seniority_mirror = mirror
+    return processor
+
+
+def test_lookup_unknown_until_ready():
+    mirror = SeniorityMirror()
+    mirror.load([("u1", "vp")])
+    assert mirror.lookup("u1") == (False, None)
+
+    mirror.ready = True
+    assert mirror.lookup("u1") == (True, "vp")
+    assert mirror.lookup("u2") == (True, None)
+
+
+def test_slots_are_reused_after_discard():
+    mirror = SeniorityMirror()
+    mirror.set("a", "vp")
+    mirror.set("b", "csuite")
+    mirror.discard("a")
+    mirror.set("c", "vp")
+    assert len(mirror) == 2
+    assert len(mirror._levels) == 2
+
+
+def test_apply_notifications():
+    mirror = SeniorityMirror()
+    mirror.ready = True
+    mirror.apply_notification("U|vp|user|with|pipes")
+    assert mirror.lookup("user|with|pipes") == (True, "vp")
+    mirror.apply_notification("U|csuite|user|with|pipes")
+    assert mirror.lookup("user|with|pipes") == (True, "csuite")
+    mirror.apply_notification("D||user|with|pipes")
+    assert mirror.lookup("user|with|pipes") == (True, None)
+
+
+def test_warm_mirror_skips_select_for_new_user():
+    """Absent in the mirror: guarded insert, no SELECT."""
+    mirror = SeniorityMirror()
+    mirror.ready = True
+    cur = ScriptedCursor()
+    processor = make_processor(cur, mirror)
+
+    assert processor.process_classification(
+        "u1", "Ann", "CEO", None, None, None, classification=(True, "csuite")
+    ) == (True, "csuite")
+
+    assert not any(s.startswith("SELECT") for s in cur.statements)
+    assert "ON CONFLICT (user_id) DO NOTHING" in cur.statements[0]
+    assert cur.statements[1].startswith("INSERT INTO detections")
+    assert mirror.lookup("u1") == (True, "csuite")
+
+
+def test_warm_mirror_promotion_uses_guarded_update():
+    mirror = SeniorityMirror()
+    mirror.ready = True
+    mirror.set("u1", "vp")
+    cur = ScriptedCursor()
+    processor = make_processor(cur, mirror)
+
+    processor.process_classification(
+        "u1", "Ann", "CEO", None, None, None, classification=(True, "csuite")
+    )
+
+    assert cur.statements[0].startswith("UPDATE user_state")
+    assert "AND seniority_level = %s" in cur.statements[0]
+    assert cur.statements[1].startswith("INSERT INTO detections")
+    assert len(cur.statements) == 2
+
+
+def test_stale_mirror_falls_back_to_select():
+    """A guard miss reads the row and proceeds from the database state."""
+    mirror = SeniorityMirror()
+    mirror.ready = True
+    mirror.set("u1", "vp")
+    # Guarded UPDATE misses; the row is actually csuite already
+    cur = ScriptedCursor(rowcounts=[0], rows=[{"user_id": "u1", "seniority_level": "csuite", "first_detected_at": None}])
+    processor = make_processor(cur, mirror)
+
+    processor.process_classification(
+        "u1", "Ann", "CEO", None, None, None, classification=(True, "csuite")
+    )
+
+    assert cur.statements[1].startswith("SELECT")
+    assert cur.statements[2].startswith("UPDATE user_state")
+    # Same level as stored: no promotion detection
+    assert not any(s.startswith("INSERT INTO detections") for s in cur.statements)
+    assert mirror.stats()["stale"] == 1
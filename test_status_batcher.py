@@ -0,0 +1,172 @@
+"""
+Tests for write-behind status batching.
+
+Run with: python -m pytest test_status_batcher.py
+"""
+
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+
+from app.services.status_batcher import MARK_EVENTS_PROCESSED, StatusBatcher
+
+
+class RecordingDb:
+    """Records each flushed id list; optionally fails the next flush."""
+
+    def __init__(self):
+        self.flushed = []
+        self.fail_next = False
+
+    @contextmanager
+    def get_cursor(self):
+        db = self
+
+        class Cursor:
+            rowcount = 0
+
+            def execute(self, query, params):
+                if db.fail_next:
+                    db.fail_next = False
+                    raise RuntimeError("connection lost")
+                db.flushed.append(list(params[0]))
+                self.rowcount = len(params[0])
+
+        yield Cursor()
+
+
+def make_batcher(max_batch=3, max_delay=0.02):
+    db = RecordingDb()
+    return StatusBatcher("test", MARK_EVENTS_PROCESSED, max_batch, max_delay, db=db), db
+
+
+def test_flushes_on_size_threshold():
+    batcher, db = make_batcher(max_batch=3, max_delay=60)
+
+    async def run():
+        for item_id in [1, 2, 2, 3, 4]:
+            batcher.add(item_id)
+
+    asyncio.run(run())
+
+    # Duplicate ids are collapsed while pending
+    assert db.flushed == [[1, 2, 3]]
+    assert len(batcher) == 1
+    assert batcher.stats()["size_flushes"] == 1
+
+
+def test_flushes_on_time_threshold():
+    batcher, db = make_batcher(max_batch=100, max_delay=0.02)
+
+    async def run():
+        batcher.add(1)
+        batcher.add(2)
+        assert db.flushed == []
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert db.flushed == [[1, 2]]
+    stats = batcher.stats()
+    assert stats["timer_flushes"] == 1
+    assert stats["flush_latency"]["total_count"] == 1
+
+
+def test_failed_flush_keeps_ids_pending():
+    batcher, db = make_batcher()
+    batcher._pending.update({1: None, 2: None})
+    db.fail_next = True
+
+    with pytest.raises(RuntimeError):
+        batcher.flush()
+    assert len(batcher) == 2
+
+    assert batcher.flush() == 2
+    assert db.flushed == [[1, 2]]
+    assert batcher.stats()["flush_errors"] == 1
+
+
+def test_failed_size_flush_is_retried_not_raised():
+    """A size-triggered flush failure stays in the batcher and retries on the timer."""
+    batcher, db = make_batcher(max_batch=2, max_delay=0.02)
+    db.fail_next = True
+
+    async def run():
+        batcher.add(1)
+        batcher.add(2)
+        assert len(batcher) == 2
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert db.flushed == [[1, 2]]
+    stats = batcher.stats()
+    assert stats["flush_errors"] == 1
+    assert stats["timer_flushes"] == 1
+
+
+def test_writes_through_without_event_loop():
+    batcher, db = make_batcher(max_batch=100)
+    batcher.add(7)
+    assert db.flushed == [[7]]
+
+
+def test_process_event_defers_processed_update(monkeypatch):
+    from app.models import WebhookEvent
+    from app.services.event_processor import EventProcessor
+
+    processor = EventProcessor()
+    batcher, db = make_batcher(max_batch=100, max_delay=60)
+    processor.processed_batcher = batcher
+    monkeypatch.setattr(processor, "store_raw_event", lambda event, key, lease_seconds=0.0: 41)
+
+    async def fake_process_stored_event(event, timer=None):
+        return {"status": "processed", "user_id": event.userId}
+
+    monkeypatch.setattr(processor, "process_stored_event", fake_process_stored_event)
+    event = WebhookEvent(userId="u1", username="Ann", profileField="Job Title", value="CEO")
+
+    async def run():
+        result = await processor.process_event(event)
+        assert db.flushed == []
+        batcher.flush()
+        return result
+
+    assert asyncio.run(run())["event_id"] == 41
+    assert db.flushed == [[41]]
+
+
+def test_status_write_failure_does_not_fail_processed_event(monkeypatch):
+    """The event that fills the batch still succeeds if the batch write fails."""
+    from app.models import WebhookEvent
+    from app.services.event_processor import EventProcessor
+
+    processor = EventProcessor()
+    batcher, db = make_batcher(max_batch=1, max_delay=60)
+    db.fail_next = True
+    processor.processed_batcher = batcher
+    recorded = []
+    monkeypatch.setattr(processor, "store_raw_event", lambda event, key, lease_seconds=0.0: 41)
+    monkeypatch.setattr(
+        processor, "record_event_failure",
+        lambda event_id, error, cur=None: recorded.append(event_id)
+    )
+
+    async def fake_process_stored_event(event, timer=None):
+        return {"status": "processed", "user_id": event.userId}
+
+    monkeypatch.setattr(processor, "process_stored_event", fake_process_stored_event)
+    event = WebhookEvent(userId="u1", username="Ann", profileField="Job Title", value="CEO")
+
+    async def run():
+        result = await processor.process_event(event)
+        pending = len(batcher)
+        batcher.flush()
+        return result, pending
+
+    result, pending = asyncio.run(run())
+    assert result["event_id"] == 41
+    assert pending == 1
+    assert recorded == []
+    assert db.flushed == [[41]]
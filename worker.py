@@ -14,8 +14,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.config import get_settings
-from app.services.digest_builder import get_digest_sender
+from app.services.aa_integration import get_aa_client
+from app.services.digest_builder import get_digest_builder, get_digest_sender
+from app.services.event_processor import get_event_processor
 from app.services.report_builder import get_report_builder
+from app.services.status_batcher import flush_status_batchers
+from app.utils.rendering import get_renderer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +28,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def build_digests():
+    """Build this week's digests, packed by message size."""
+    logger.info("Starting weekly digest build...")
+    
+    try:
+        results = get_digest_builder().build_weekly_digest()
+        
+        logger.info(f"Digest build complete: {results}")
+        return results
+    except Exception as e:
+        logger.error(f"Error building digests: {e}", exc_info=True)
+        raise
+
+
 async def process_digests():
     """Process and send pending digests."""
     logger.info("Starting digest processing...")
@@ -39,13 +57,28 @@ async def process_digests():
         raise
 
 
-def process_reports():
-    """Process and generate pending reports."""
+async def process_deferred_metadata():
+    """Enrich users whose metadata fetch was deferred."""
+    logger.info("Starting deferred metadata enrichment...")
+    
+    try:
+        processor = get_event_processor()
+        results = await processor.enrich_deferred_metadata()
+        
+        logger.info(f"Deferred metadata enrichment complete: {results}")
+        return results
+    except Exception as e:
+        logger.error(f"Error enriching deferred metadata: {e}", exc_info=True)
+        raise
+
+
+def process_reports(force: bool = False):
+    """Process and generate pending reports (force: ignore the artifact cache)."""
     logger.info("Starting report processing...")
     
     try:
         builder = get_report_builder()
-        results = builder.process_pending_reports()
+        results = builder.process_pending_reports(force=force)
         
         logger.info(f"Report processing complete: {results}")
         return results
@@ -54,25 +87,48 @@ def process_reports():
         raise
 
 
-async def main():
-    """Main worker entry point."""
+async def main(force_reports: bool = False, weekly_digest: bool = False):
+    """
+    Main worker entry point.
+    
+    weekly_digest: build this week's digests before sending (the weekly
+    run; see scripts/setup_pg_cron.sql).
+    """
     settings = get_settings()
     logger.info(f"Worker started")
+    get_renderer().warm()
+    
+    # Enrich metadata first so digests and reports include it
+    metadata_results = await process_deferred_metadata()
+    
+    # Build the week's digests, then send them in the same run
+    build_results = build_digests() if weekly_digest else None
     
     # Process digests
     digest_results = await process_digests()
     
     # Process reports
-    report_results = process_reports()
+    report_results = process_reports(force=force_reports)
+    
+    flush_status_batchers()
+    await get_event_processor().close()
+    await get_aa_client().close()
     
     logger.info("Worker completed successfully")
     
     return {
+        "metadata": metadata_results,
+        "digest_build": build_results,
         "digests": digest_results,
         "reports": report_results
     }
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # --force-reports regenerates reports even if a cached artifact matches;
+    # --build-digests builds the week's digests first (Fridays 5 PM ET)
+    asyncio.run(main(
+        force_reports="--force-reports" in sys.argv[1:],
+        weekly_digest="--build-digests" in sys.argv[1:]
+    ))
 